@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compares the JSON decoders available to GraphAPI on feed pages.
+
+Usage: python benchmarks/bench_json.py [--items N] [--repeat N]
+
+The baseline is what GraphAPI did before decoders were pluggable:
+requests' Response.json(), which decodes the body to text before parsing
+it with the json module.
+"""
+
+import argparse
+import importlib
+import json
+import timeit
+
+import requests
+
+import facebook
+
+
+def feed_page(items):
+    """Returns the body of a representative page of a feed, as bytes."""
+    data = []
+    for i in range(items):
+        data.append(
+            {
+                "id": "10150146071791729_{0}".format(i),
+                "created_time": "2018-07-05T14:23:07+0000",
+                "from": {"name": "Jöhn Doé", "id": "10150146071791729"},
+                "message": "Post number {0} ☃ with a link: "
+                "https://example.com/?a=1&b=2".format(i),
+                "type": "link",
+                "likes": {
+                    "data": [{"id": str(n), "name": "User"} for n in range(5)],
+                    "summary": {"total_count": 5, "can_like": True},
+                },
+                "attachments": {"data": [{"media": {"width": 720}}]},
+            }
+        )
+    page = {
+        "data": data,
+        "paging": {
+            "cursors": {"before": "QVFIUk1", "after": "QVFIUjZA"},
+            "next": "https://graph.facebook.com/v3.1/me/feed?after=QVFIUjZA",
+        },
+    }
+    return json.dumps(page).encode("utf-8")
+
+
+def response_json(data):
+    response = requests.Response()
+    response._content = data
+    return response.json()
+
+
+def decoders():
+    """Returns the decoders to compare, by name."""
+    found = {
+        "Response.json": response_json,
+        "json": facebook._stdlib_json_loads,
+    }
+    for name in ("ujson", "orjson"):
+        try:
+            found[name] = importlib.import_module(name).loads
+        except ImportError:
+            pass
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    options = parser.parse_args()
+
+    body = feed_page(options.items)
+    print(
+        "{0} byte page of {1} items, default decoder: {2}".format(
+            len(body), options.items, facebook.DEFAULT_JSON_LOADS.__module__
+        )
+    )
+    baseline = None
+    for name, loads in decoders().items():
+        seconds = min(
+            timeit.repeat(lambda: loads(body), number=options.repeat, repeat=5)
+        )
+        per_page = seconds / options.repeat
+        baseline = baseline or per_page
+        print(
+            "{0:<14} {1:8.1f} us/page {2:6.2f}x".format(
+                name, per_page * 1e6, baseline / per_page
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""A local stand-in for the Graph API, for benchmarks.
+
+FakeGraphServer answers the requests made by the SDK with canned data
+of realistic shape, so that the SDK's own overhead can be measured
+without network access or test users:
+
+* GET /{version}/{id} returns an object, and GET /{version}/?ids=...
+  a map of objects.
+* GET /{version}/{id}/{connection} returns pages of page_size items,
+  with paging links for pages pages.
+* POST /{version}/ with a batch argument answers each request of the
+  batch.
+* POST /{version}/{id}/photos reads the uploaded body and returns IDs.
+
+Every response waits latency seconds and fails with a temporary error
+(code 2, HTTP 500) with probability error_rate. usage, if given, is
+sent in the X-App-Usage header.
+
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlencode, urlparse
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def fake_object(id):
+    return {
+        "id": id,
+        "name": "Object {0}".format(id),
+        "created_time": "2018-07-05T14:23:07+0000",
+        "from": {"name": "Jöhn Doé", "id": "10150146071791729"},
+        "message": "A message with some text ☃ and a link: "
+        "https://example.com/?a=1&b=2",
+    }
+
+
+class FakeGraphServer(object):
+    """Serves a fake Graph API on a local port, in a background thread.
+
+    Use it as a context manager, or call start() and stop(). url is the
+    base URL to use instead of facebook.FACEBOOK_GRAPH_URL.
+    """
+
+    def __init__(
+        self,
+        latency=0,
+        page_size=25,
+        pages=4,
+        error_rate=0,
+        usage=None,
+        seed=0,
+    ):
+        self.latency = latency
+        self.page_size = page_size
+        self.pages = pages
+        self.error_rate = error_rate
+        self.usage = usage
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        self._thread = None
+        self.url = "http://127.0.0.1:{0}/".format(self._server.server_port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def fails(self):
+        """Returns whether the current request should fail."""
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def connection_page(self, path, args):
+        """Returns a page of a connection, as the Graph API would."""
+        page = int(args.get("after", ["0"])[0])
+        size = int(args.get("limit", [self.page_size])[0])
+        parent = path.strip("/").split("/")[-2]
+        data = [
+            fake_object("{0}_{1}".format(parent, page * size + i))
+            for i in range(size)
+        ]
+        result = {"data": data, "paging": {"cursors": {"after": str(page)}}}
+        if page + 1 < self.pages:
+            query = dict((k, v[0]) for k, v in args.items())
+            query["after"] = str(page + 1)
+            result["paging"]["next"] = "{0}{1}?{2}".format(
+                self.url, path.lstrip("/"), urlencode(query)
+            )
+        return result
+
+    def get(self, path, args):
+        segments = path.strip("/").split("/")[1:]
+        if not segments:
+            ids = args["ids"][0].split(",")
+            return {id: fake_object(id) for id in ids}
+        if len(segments) == 1:
+            return fake_object(segments[0])
+        return self.connection_page(path, args)
+
+    def post(self, path, args):
+        segments = path.strip("/").split("/")[1:]
+        if not segments:
+            results = []
+            for request in json.loads(args["batch"][0]):
+                url = urlparse("/v0/" + request["relative_url"])
+                body = self.get(url.path, parse_qs(url.query))
+                results.append({"code": 200, "body": json.dumps(body)})
+            return results
+        return {"id": "1", "post_id": segments[0] + "_1"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, so Nagle's algorithm
+    # would delay every response by the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self, method):
+        fake = self.server.fake
+        url = urlparse(self.path)
+        args = parse_qs(url.query)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("application/x-www-form-urlencoded"):
+            args.update(parse_qs(body.decode("utf-8")))
+        if fake.latency:
+            time.sleep(fake.latency)
+
+        status = 200
+        if fake.fails():
+            status = 500
+            result = {
+                "error": {
+                    "message": "An unexpected error has occurred.",
+                    "type": "OAuthException",
+                    "code": 2,
+                    "is_transient": True,
+                }
+            }
+        elif method == "GET":
+            result = fake.get(url.path, args)
+        else:
+            result = fake.post(url.path, args)
+
+        data = json.dumps(result).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        if fake.usage is not None:
+            self.send_header("X-App-Usage", json.dumps(fake.usage))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._respond("GET")
+
+    def do_POST(self):
+        self._respond("POST")
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Measures the SDK's throughput and latency against a fake Graph API.
+
+Usage: PYTHONPATH=. python benchmarks/run.py [--iterations N]
+           [--latency SECONDS] [--page-size N] [--pages N]
+           [--error-rate RATE] [--only NAME] [--save] [--compare FILE]
+
+Each benchmark is run iterations times, one call after another, against
+a FakeGraphServer. For each one, calls per second and the 50th and 99th
+percentile latencies are printed. With --save, the results are written
+to benchmarks/results/<version>.json, so that a later run can be
+compared with them using --compare.
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+from fakegraph import FakeGraphServer
+
+import facebook
+
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(__file__), "results")
+
+
+def signed_request(secret):
+    """Returns a signed request, as sent by Facebook, and its secret."""
+    payload = base64.urlsafe_b64encode(
+        json.dumps(
+            {
+                "algorithm": "HMAC-SHA256",
+                "issued_at": 1500000000,
+                "user_id": "10150146071791729",
+                "oauth_token": "A" * 180,
+                "expires": 1600000000,
+            }
+        ).encode("utf-8")
+    ).rstrip(b"=")
+    signature = base64.urlsafe_b64encode(
+        hmac.new(secret.encode("ascii"), payload, hashlib.sha256).digest()
+    ).rstrip(b"=")
+    return (signature + b"." + payload).decode("ascii")
+
+
+def benchmarks(graph, options):
+    """Returns the benchmarks, as functions of the iteration number."""
+    image = os.urandom(256 * 1024)
+    secret = "0123456789abcdef0123456789abcdef"
+    request = signed_request(secret)
+    batch = [{"method": "GET", "relative_url": str(i)} for i in range(50)]
+    return [
+        ("get_object", lambda i: graph.get_object(str(i))),
+        (
+            "get_objects",
+            lambda i: graph.get_objects([str(i * 50 + n) for n in range(50)]),
+        ),
+        (
+            "get_all_connections",
+            lambda i: list(graph.get_all_connections(str(i), "feed")),
+        ),
+        ("put_photo", lambda i: graph.put_photo(io.BytesIO(image))),
+        (
+            "parse_signed_request",
+            lambda i: facebook.parse_signed_request(request, secret),
+        ),
+        ("execute_batch", lambda i: graph.execute_batch(batch)),
+    ]
+
+
+def percentile(values, fraction):
+    """Returns the given percentile of sorted values (nearest rank)."""
+    index = max(0, int(round(fraction * len(values))) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+def measure(function, iterations, warmup=5):
+    """Runs function and returns statistics about its durations."""
+    for i in range(warmup):
+        try:
+            function(i)
+        except facebook.GraphAPIError:
+            pass
+    durations = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        try:
+            function(i)
+        except facebook.GraphAPIError:
+            errors += 1
+        durations.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    durations.sort()
+    return {
+        "iterations": iterations,
+        "errors": errors,
+        "calls_per_second": iterations / elapsed,
+        "p50_ms": percentile(durations, 0.5) * 1000,
+        "p99_ms": percentile(durations, 0.99) * 1000,
+    }
+
+
+def compare(results, path):
+    """Prints the change of each result since the results saved in path."""
+    with open(path) as f:
+        previous = json.load(f)
+    print("\nCompared with {0} ({1}):".format(path, previous["version"]))
+    for name, result in results.items():
+        before = previous["results"].get(name)
+        if before is None:
+            continue
+        changes = [
+            (result[key] / before[key] - 1) * 100
+            for key in ("calls_per_second", "p50_ms", "p99_ms")
+        ]
+        print(
+            "{0:<22} calls/s {1:+7.1f}%   p50 {2:+7.1f}%   "
+            "p99 {3:+7.1f}%".format(name, *changes)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--page-size", type=int, default=25)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--only", action="append", help="benchmark to run")
+    parser.add_argument("--save", action="store_true")
+    parser.add_argument("--compare", help="results file to compare with")
+    options = parser.parse_args()
+
+    server = FakeGraphServer(
+        latency=options.latency,
+        page_size=options.page_size,
+        pages=options.pages,
+        error_rate=options.error_rate,
+        usage={"call_count": 10, "total_cputime": 5, "total_time": 5},
+    )
+    results = {}
+    with server:
+        # Send all requests to the fake server instead of Facebook.
+        facebook.FACEBOOK_GRAPH_URL = server.url
+        retry = None
+        if options.error_rate:
+            retry = facebook.RetryPolicy(
+                max_retries=5, backoff=0.001, jitter=False
+            )
+        graph = facebook.GraphAPI("token", version="3.1", retry=retry)
+        for name, function in benchmarks(graph, options):
+            if options.only and name not in options.only:
+                continue
+            results[name] = result = measure(function, options.iterations)
+            print(
+                "{0:<22} {1:9.1f} calls/s   p50 {2:8.3f} ms   "
+                "p99 {3:8.3f} ms   {4} errors".format(
+                    name,
+                    result["calls_per_second"],
+                    result["p50_ms"],
+                    result["p99_ms"],
+                    result["errors"],
+                )
+            )
+
+    if options.compare:
+        compare(results, options.compare)
+    if options.save:
+        if not os.path.isdir(RESULTS_DIRECTORY):
+            os.makedirs(RESULTS_DIRECTORY)
+        path = os.path.join(
+            RESULTS_DIRECTORY, "{0}.json".format(facebook.__version__)
+        )
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "version": facebook.__version__,
+                    "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": sys.version.split()[0],
+                    "platform": platform.platform(),
+                    "options": vars(options),
+                    "results": results,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+        print("\nSaved to " + path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from facebook import get_user_from_cookie, GraphAPI
+from facebook import get_user_from_cookie, GraphAPI, MemoryCache
 from flask import g, render_template, redirect, request, session, url_for
 
 from app import app, db
@@ -9,6 +9,9 @@ FB_APP_ID = ""
 FB_APP_NAME = ""
 FB_APP_SECRET = ""
 
+# Cookies that have already been exchanged for an access token.
+COOKIE_CACHE = MemoryCache(maxsize=10000)
+
 
 @app.route("/")
 def index():
@@ -55,7 +58,10 @@ def get_current_user():
 
     # Attempt to get the short term access token for the current user.
     result = get_user_from_cookie(
-        cookies=request.cookies, app_id=FB_APP_ID, app_secret=FB_APP_SECRET
+        cookies=request.cookies,
+        app_id=FB_APP_ID,
+        app_secret=FB_APP_SECRET,
+        cache=COOKIE_CACHE,
     )
 
     # If there is no result, we assume the user is not logged in.
@@ -38,13 +38,20 @@ define("mysql_user", help="MySQL database user")
 define("mysql_password", help="MySQL database password")
 
 
+# Cookies that have already been exchanged for an access token.
+cookie_cache = facebook.MemoryCache(maxsize=10000)
+
+
 class BaseHandler(tornado.web.RequestHandler):
     """Implements authentication via the Facebook JavaScript SDK cookie."""
 
     def get_current_user(self):
         cookies = dict((n, self.cookies[n].value) for n in self.cookies.keys())
         cookie = facebook.get_user_from_cookie(
-            cookies, options.facebook_app_id, options.facebook_app_secret
+            cookies,
+            options.facebook_app_id,
+            options.facebook_app_secret,
+            cache=cookie_cache,
         )
         if not cookie:
             return None
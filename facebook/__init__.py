@@ -26,23 +26,53 @@ https://developers.facebook.com/docs/graph-api.
 
 import hashlib
 import hmac
+import importlib
 import binascii
 import base64
+import copy
+import functools
 import requests
+import requests.adapters
 import json
+import os
+import queue
 import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from urllib.parse import parse_qs, urlencode, urlparse
 
 from . import version
+from .cache import MemoryCache, ResponseCache, SQLiteCache  # noqa: F401
+from .cache import PermissionCache  # noqa: F401
+from .cache import token_identity
+from .export import ArrowSink, CSVSink, ParquetSink, Sink  # noqa: F401
+from .export import DEFAULT_BATCH_SIZE, export_items, query_fields
+from .metrics import HOOK_EVENTS, RequestInfo
+from .metrics import OpenTelemetryHooks, PrometheusMetrics  # noqa: F401
+from .models import Model  # noqa: F401
+from .multipart import MultipartEncoder
+from .ratelimit import RateLimiter, UsageStats  # noqa: F401
+from .retry import RetryPolicy  # noqa: F401
+from .streaming import StreamingPage
 
 
 __version__ = version.__version__
 
 FACEBOOK_GRAPH_URL = "https://graph.facebook.com/"
+FACEBOOK_GRAPH_VIDEO_URL = "https://graph-video.facebook.com/"
 FACEBOOK_WWW_URL = "https://www.facebook.com/"
 FACEBOOK_OAUTH_DIALOG_PATH = "dialog/oauth?"
 VALID_API_VERSIONS = ["3.1", "3.2", "3.3", "4.0", "5.0", "6.0", "7.0", "8.0"]
 VALID_SEARCH_TYPES = ["place", "placetopic"]
+BATCH_MAX_REQUESTS = 50
+GET_OBJECTS_MAX_IDS = 50
+GET_OBJECTS_MAX_LENGTH = 2000
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_COOKIE_CACHE_TTL = 3600
+DEFAULT_DEBUG_TOKEN_CACHE_TTL = 300
 
 
 class GraphAPI(object):
@@ -82,61 +112,203 @@ class GraphAPI(object):
         proxies=None,
         session=None,
         app_secret=None,
+        coalesce_window=None,
+        cache=None,
+        rate_limiter=None,
+        retry=None,
+        pool_maxsize=None,
+        pool_block=False,
+        keep_alive=True,
+        connect_timeout=None,
+        read_timeout=None,
+        json_loads=None,
+        hooks=None,
+        permissions_cache=None,
     ):
         # The default version is only used if the version kwarg does not exist.
         default_version = VALID_API_VERSIONS[0]
 
         self.access_token = access_token
         self.timeout = timeout
+        if connect_timeout is not None or read_timeout is not None:
+            self.timeout = (
+                connect_timeout if connect_timeout is not None else timeout,
+                read_timeout if read_timeout is not None else timeout,
+            )
         self.proxies = proxies
+        if session is None and (pool_maxsize or pool_block or not keep_alive):
+            session = create_session(
+                pool_maxsize=pool_maxsize or DEFAULT_POOL_MAXSIZE,
+                pool_block=pool_block,
+                keep_alive=keep_alive,
+            )
         self.session = session or requests.Session()
+        self.cache = cache
+        self.permissions_cache = permissions_cache
+        self.rate_limiter = rate_limiter
+        self.retry = retry
+        self.json_loads = json_loads or DEFAULT_JSON_LOADS
+        self.usage = UsageStats()
+        self.hooks = {event: [] for event in HOOK_EVENTS}
+        for event, hook in (hooks or {}).items():
+            self.add_hook(event, hook)
         self.app_secret_hmac = None
 
         if version:
-            version_regex = re.compile(r"^\d\.\d{1,2}$")
-            match = version_regex.search(str(version))
-            if match is not None:
-                if str(version) not in VALID_API_VERSIONS:
-                    raise GraphAPIError(
-                        "Valid API versions are "
-                        + str(VALID_API_VERSIONS).strip("[]")
-                    )
-                else:
-                    self.version = "v" + str(version)
-            else:
-                raise GraphAPIError(
-                    "Version number should be in the"
-                    " following format: #.# (e.g. 2.0)."
-                )
+            self.version = _parse_version(version)
         else:
             self.version = "v" + default_version
 
         if app_secret and access_token:
-            self.app_secret_hmac = hmac.new(
-                app_secret.encode("ascii"),
-                msg=access_token.encode("ascii"),
-                digestmod=hashlib.sha256,
-            ).hexdigest()
+            self.app_secret_hmac = _appsecret_proof(app_secret, access_token)
+
+        self.coalescer = None
+        if coalesce_window is not None:
+            self.coalescer = Coalescer(self, window=coalesce_window)
+
+    def add_hook(self, event, hook):
+        """Registers a function called at the given event of requests.
+
+        event is "before_request", "after_response" or "on_error". See
+        facebook.metrics for the arguments hooks are called with.
+        """
+        if event not in self.hooks:
+            raise ValueError("Valid events are: %s" % ", ".join(HOOK_EVENTS))
+        self.hooks[event].append(hook)
+
+    def _run_hooks(self, event, *args):
+        for hook in self.hooks[event]:
+            hook(*args)
+
+    def _request_slot(self):
+        """Returns a context manager held while a request is in flight.
+
+        It does nothing here; PooledGraphAPI uses it to limit the
+        number of concurrent requests per token.
+        """
+        return _NO_SLOT
 
     def get_permissions(self, user_id):
-        """Fetches the permissions object from the graph."""
-        response = self.request(
-            "{0}/{1}/permissions".format(self.version, user_id), {}
-        )["data"]
-        return {x["permission"] for x in response if x["status"] == "granted"}
+        """Fetches the permissions object from the graph.
+
+        If the GraphAPI object has a permissions_cache, the permissions
+        are read from it when possible.
+        """
+        cache = self.permissions_cache
+        if cache is not None:
+            permissions = cache.get(user_id, self.access_token)
+            if permissions is not None:
+                return set(permissions)
+        path, args = self._permissions_request(user_id)
+        response = self.request(self.version + "/" + path, args)
+        return set(self._store_permissions(user_id, response))
+
+    def get_users_permissions(self, user_ids, max_workers=4):
+        """Fetches the permissions of many users in batch requests.
+
+        Returns a dict mapping each user ID to a frozenset of the
+        permissions they granted, or to a GraphAPIError if their request
+        failed. Permissions found in the permissions_cache are not
+        requested again.
+        """
+        cache = self.permissions_cache
+        results = OrderedDict((str(id), None) for id in user_ids)
+        missing = []
+        for user_id in results:
+            if cache is not None:
+                results[user_id] = cache.get(user_id, self.access_token)
+            if results[user_id] is None:
+                missing.append(user_id)
+
+        batch = []
+        for user_id in missing:
+            path, args = self._permissions_request(user_id)
+            if args:
+                path += "?" + urlencode(args)
+            batch.append({"method": "GET", "relative_url": path})
+        responses = self.execute_batch(batch, max_workers=max_workers)
+        for user_id, response in zip(missing, responses):
+            if isinstance(response, GraphAPIError):
+                results[user_id] = response
+            else:
+                results[user_id] = self._store_permissions(user_id, response)
+        return dict(results)
+
+    def _permissions_request(self, user_id):
+        """Returns the path and arguments to read permissions with."""
+        if str(user_id) == "me" and self.permissions_cache is not None:
+            # The ID of the user is needed to cache their permissions.
+            return "me", {"fields": "id,permissions"}
+        return "{0}/permissions".format(user_id), {}
+
+    def _store_permissions(self, user_id, response):
+        """Returns the granted permissions in a response, caching them."""
+        cache = self.permissions_cache
+        if "data" not in response:
+            # The response to "me?fields=id,permissions".
+            user_id = response["id"]
+            cache.set_user(self.access_token, user_id)
+            response = response.get("permissions") or {"data": []}
+        permissions = frozenset(_granted_permissions(response))
+        if cache is not None:
+            cache.set(user_id, permissions, self.access_token)
+        return permissions
 
     def get_object(self, id, **args):
         """Fetches the given object from the graph."""
+        if self.coalescer is not None:
+            return self.coalescer.submit_object(id, **args).result()
         return self.request("{0}/{1}".format(self.version, id), args)
 
-    def get_objects(self, ids, **args):
+    def get_objects(self, ids, return_errors=False, max_workers=4, **args):
         """Fetches all of the given object from the graph.
 
         We return a map from ID to object. If any of the IDs are
         invalid, we raise an exception.
+
+        Long lists of IDs are split into requests of at most
+        GET_OBJECTS_MAX_IDS IDs, which are sent concurrently on up to
+        max_workers threads.
+
+        If return_errors is true, we instead return a tuple of the map
+        from ID to object and a map from ID to GraphAPIError for the IDs
+        that could not be fetched.
         """
-        args["ids"] = ",".join(ids)
-        return self.request(self.version + "/", args)
+        chunks = _chunk_ids(OrderedDict.fromkeys(ids))
+        query = "?" + urlencode(args, doseq=True) if args else ""
+        objects = {}
+        errors = {}
+
+        def fetch(chunk):
+            chunk_args = dict(args, ids=",".join(chunk))
+            try:
+                return self.request(self.version + "/", chunk_args), {}
+            except GraphAPIError:
+                if not return_errors:
+                    raise
+            # An invalid ID fails the whole request, so look the IDs up
+            # separately to find out which ones are at fault.
+            results = self.execute_batch(
+                [{"method": "GET", "relative_url": id + query} for id in chunk]
+            )
+            chunk_objects = {}
+            chunk_errors = {}
+            for id, result in zip(chunk, results):
+                if isinstance(result, GraphAPIError):
+                    chunk_errors[id] = result
+                else:
+                    chunk_objects[id] = result
+            return chunk_objects, chunk_errors
+
+        for chunk_objects, chunk_errors in _map_chunks(
+            fetch, chunks, max_workers
+        ):
+            objects.update(chunk_objects)
+            errors.update(chunk_errors)
+
+        if return_errors:
+            return objects, errors
+        return objects
 
     def search(self, type, **args):
         """https://developers.facebook.com/docs/places/search"""
@@ -150,6 +322,10 @@ class GraphAPI(object):
 
     def get_connections(self, id, connection_name, **args):
         """Fetches the connections for given object."""
+        if self.coalescer is not None:
+            return self.coalescer.submit_connections(
+                id, connection_name, **args
+            ).result()
         return self.request(
             "{0}/{1}/{2}".format(self.version, id, connection_name), args
         )
@@ -164,11 +340,245 @@ class GraphAPI(object):
             page = self.get_connections(id, connection_name, **args)
             for post in page["data"]:
                 yield post
-            next = page.get("paging", {}).get("next")
-            if not next:
+            args = _next_page_args(page)
+            if args is None:
                 return
-            args = parse_qs(urlparse(next).query)
-            del args["access_token"]
+
+    def prefetch_all_connections(
+        self, id, connection_name, prefetch=2, checkpoint=None, **args
+    ):
+        """Like get_all_connections, but fetches pages in the background.
+
+        Up to prefetch pages are requested ahead of the page being
+        consumed, by a background thread, so that network latency
+        overlaps with processing. Only prefetch pages are held in memory
+        at any time.
+
+        If a checkpoint (e.g. a FileCheckpoint) is given, the arguments
+        for the next page are saved to it each time a page has been
+        fully consumed, and an interrupted iteration started again with
+        the same checkpoint resumes from the last saved page. The
+        checkpoint is cleared once the last page has been consumed.
+        """
+        if checkpoint is not None:
+            saved = checkpoint.load()
+            if saved:
+                args = saved
+
+        pages = queue.Queue(maxsize=max(prefetch, 1))
+        stop = threading.Event()
+
+        def put(item):
+            # Gives up when the consumer has gone away.
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def fetch(args):
+            try:
+                while args is not None:
+                    page = self.get_connections(id, connection_name, **args)
+                    args = _next_page_args(page)
+                    if not put((page, args)):
+                        return
+            except Exception as e:
+                put(e)
+            else:
+                put(None)
+
+        fetcher = threading.Thread(target=fetch, args=(args,), daemon=True)
+        fetcher.start()
+        try:
+            while True:
+                item = pages.get()
+                if item is None:
+                    if checkpoint is not None:
+                        checkpoint.clear()
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                page, next_args = item
+                for post in page["data"]:
+                    yield post
+                if checkpoint is not None and next_args is not None:
+                    checkpoint.save(next_args)
+        finally:
+            stop.set()
+
+    def stream_all_connections(
+        self, id, connection_name, chunk_size=65536, **args
+    ):
+        """Like get_all_connections, but decodes pages while they download.
+
+        Items are yielded as soon as they have been decoded from the
+        response, so memory use is bounded by the size of one item
+        rather than one page, even with a large "limit". Requests are
+        not retried, since some items may already have been yielded.
+
+        Hooks are called for every page, with the page's fields other
+        than "data" as the result passed to after_response once all of
+        its items have been read.
+        """
+        path = "{0}/{1}/{2}".format(self.version, id, connection_name)
+        hooked = any(self.hooks.values())
+        while True:
+            self._add_credentials(args, None)
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(self.usage)
+            info = None
+            if hooked:
+                info = RequestInfo("GET", path, args)
+                self._run_hooks("before_request", info)
+                info.start()
+            try:
+                # The slot is only held until the headers have arrived,
+                # so that the caller can make requests between items.
+                with self._request_slot():
+                    response = self._send(
+                        "GET", path, args, None, None, {"stream": True}
+                    )
+                if info is not None:
+                    info.received(response, stream=True)
+                try:
+                    status = response.status_code
+                    if status >= 400 or "json" not in response.headers.get(
+                        "content-type", ""
+                    ):
+                        # Errors are small, so decode them the usual way.
+                        self._parse_response(response)
+                        raise GraphAPIError(
+                            "Unexpected response", http_status=status
+                        )
+                    page = StreamingPage(response.iter_content(chunk_size))
+                    for item in page:
+                        yield item
+                finally:
+                    response.close()
+                if page.fields.get("error"):
+                    raise GraphAPIError(page.fields)
+            except (GraphAPIError, requests.RequestException) as e:
+                if info is not None:
+                    info.finished(e)
+                    self._run_hooks("on_error", info, e)
+                raise
+            except GeneratorExit:
+                # The caller stopped reading, but the request itself did
+                # not fail.
+                if info is not None:
+                    info.finished()
+                    self._run_hooks("after_response", info, None)
+                raise
+            if info is not None:
+                info.finished()
+                self._run_hooks("after_response", info, page.fields)
+            args = _next_page_args(page.fields)
+            if args is None:
+                return
+
+    def crawl_connections(
+        self, ids, connection_name, workers=8, on_error=None, **args
+    ):
+        """Fetches all pages of a connection for many objects concurrently.
+
+        Each of up to workers threads paginates through the connection
+        of one object at a time (so at most workers requests are in
+        flight), and we yield (id, item) tuples as they arrive. Items of
+        different objects are interleaved, but the items of one object
+        keep their order.
+
+        A failure for one object does not stop the others. on_error, if
+        given, is called with the ID and the exception; otherwise the
+        first error is raised once every other object has been crawled.
+        """
+        ids = iter(ids)
+        ids_lock = threading.Lock()
+        results = queue.Queue(maxsize=workers * 100)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def crawl():
+            try:
+                while not stop.is_set():
+                    with ids_lock:
+                        id = next(ids, done)
+                    if id is done:
+                        break
+                    try:
+                        for item in self.get_all_connections(
+                            id, connection_name, **dict(args)
+                        ):
+                            if not put((id, item, None)):
+                                return
+                    except Exception as e:
+                        put((id, None, e))
+            finally:
+                # The consumer waits for every worker to finish.
+                put(done)
+
+        threads = [
+            threading.Thread(target=crawl, daemon=True) for _ in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        errors = []
+        running = len(threads)
+        try:
+            while running:
+                result = results.get()
+                if result is done:
+                    running -= 1
+                    continue
+                id, item, error = result
+                if error is None:
+                    yield id, item
+                elif on_error is not None:
+                    on_error(id, error)
+                else:
+                    errors.append(error)
+        finally:
+            stop.set()
+        if errors:
+            raise errors[0]
+
+    def export_connections(
+        self,
+        id,
+        connection_name,
+        fields,
+        sink,
+        batch_size=DEFAULT_BATCH_SIZE,
+        stream=False,
+        **args
+    ):
+        """Writes the given fields of all connections of an object to sink.
+
+        fields is a list of paths such as "from.name", which are
+        requested with the fields argument and written as columns, in
+        batches of batch_size rows, to sink (e.g. a CSVSink or a
+        ParquetSink). If stream is true, pages are decoded while they
+        download, as with stream_all_connections. Returns the number of
+        rows written.
+        """
+        args["fields"] = query_fields(fields)
+        if stream:
+            items = self.stream_all_connections(id, connection_name, **args)
+        else:
+            items = self.get_all_connections(id, connection_name, **args)
+        return export_items(items, fields, sink, batch_size)
 
     def put_object(self, parent_object, connection_name, **data):
         """Writes the given object to the graph, connected to the given parent.
@@ -221,16 +631,77 @@ class GraphAPI(object):
         Upload an image using multipart/form-data.
 
         image - A file object representing the image to be uploaded.
+            Bytes, memoryview and mmap objects are accepted too.
         album_path - A path representing where the image should be uploaded.
 
+        The image is streamed in chunks rather than read into memory.
+
         """
+        # The credentials are sent as form fields, to keep them out of
+        # the URL (and so out of access logs).
+        fields = {}
+        self._add_credentials(fields, None)
+        fields.update(kwargs)
         return self.request(
             "{0}/{1}".format(self.version, album_path),
-            post_args=kwargs,
-            files={"source": image},
+            post_args=MultipartEncoder(fields, {"source": image}),
             method="POST",
         )
 
+    def put_photos(
+        self, images, album_path="me/photos", concurrency=4, **kwargs
+    ):
+        """Uploads many images concurrently, yielding results in order.
+
+        images - An iterable of images, as accepted by put_photo, or of
+            (image, fields) tuples to send other fields for some images.
+        concurrency - The number of uploads in flight at any time. It
+            should not exceed the pool_maxsize of the GraphAPI object.
+
+        Other arguments are sent with every image. Images are read from
+        the iterable as uploads complete, so it may be a generator over
+        many files. For each image, the result of put_photo is yielded,
+        or the error it raised: a GraphAPIError, or a requests exception
+        if the upload could not be sent.
+        """
+
+        def upload(item):
+            fields = kwargs
+            if isinstance(item, tuple):
+                item, extra = item
+                fields = dict(kwargs, **extra)
+            try:
+                return self.put_photo(item, album_path, **fields)
+            except (GraphAPIError, requests.RequestException) as e:
+                return e
+
+        images = iter(images)
+        pending = []
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for image in images:
+                pending.append(executor.submit(upload, image))
+                if len(pending) >= concurrency:
+                    yield pending.pop(0).result()
+            for future in pending:
+                yield future.result()
+
+    def put_video(self, path, target="me", checkpoint=None, **kwargs):
+        """Uploads a video file in chunks, resuming from checkpoint.
+
+        path - The path of the video file to upload.
+        target - The ID of the user, page or group to upload it to.
+        checkpoint - An optional FileCheckpoint used to resume an
+            interrupted upload.
+
+        Other arguments (e.g. title, description) are sent with the
+        request that publishes the video. See facebook.upload for
+        details.
+        """
+        from .upload import ResumableUpload
+
+        upload = ResumableUpload(self, path, target, checkpoint)
+        return upload.upload(**kwargs)
+
     def get_version(self):
         """Fetches the current version number of the Graph API being used."""
         args = {"access_token": self.access_token}
@@ -254,13 +725,26 @@ class GraphAPI(object):
             raise GraphAPIError("API version number not available")
 
     def request(
-        self, path, args=None, post_args=None, files=None, method=None
+        self,
+        path,
+        args=None,
+        post_args=None,
+        files=None,
+        method=None,
+        retry_method=None,
     ):
         """Fetches the given path in the Graph API.
 
         We translate args to a valid query string. If post_args is
         given, we send a POST request to the given path with the given
-        arguments.
+        arguments. The path may also be a full URL, e.g. one starting
+        with FACEBOOK_GRAPH_VIDEO_URL. post_args may be a
+        MultipartEncoder to send a streamed multipart body, in which
+        case it must already include the access token.
+
+        retry_method is the method whose rules the retry policy applies,
+        if they differ from those of the method sent, e.g. "GET" for a
+        Batch API POST that only reads.
 
         """
         if args is None:
@@ -268,6 +752,83 @@ class GraphAPI(object):
         if post_args is not None:
             method = "POST"
 
+        # Only send headers when needed, to leave the session's defaults.
+        extra = {}
+        if isinstance(post_args, MultipartEncoder):
+            extra["headers"] = {"Content-Type": post_args.content_type}
+        else:
+            self._add_credentials(args, post_args)
+        cache_key = cached = None
+        if self.cache is not None and method in (None, "GET") and not files:
+            cache_key = self.cache.key(path, args)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                result, etag, fresh = cached
+                if fresh:
+                    return result
+                extra["headers"] = {"If-None-Match": etag}
+
+        hooked = any(self.hooks.values())
+        info = None
+        attempt = 0
+        started = time.time()
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(self.usage)
+            if hooked:
+                info = RequestInfo(method or "GET", path, args, attempt)
+                self._run_hooks("before_request", info)
+                info.start()
+            try:
+                response = self._send(
+                    method or "GET", path, args, post_args, files, extra
+                )
+                if info is not None:
+                    info.received(response)
+                revalidated = (
+                    cached is not None and response.status_code == 304
+                )
+                if revalidated:
+                    self.cache.set(cache_key, path, cached[0], cached[1])
+                    result = cached[0]
+                else:
+                    result = self._parse_response(response)
+                if info is not None:
+                    info.finished()
+                    self._run_hooks("after_response", info, result)
+                if revalidated:
+                    return result
+                break
+            except (GraphAPIError, requests.RequestException) as e:
+                if info is not None:
+                    info.finished(e)
+                    self._run_hooks("on_error", info, e)
+                permissions = self.permissions_cache
+                if permissions is not None and _is_permission_error(e):
+                    # Permissions read with this token are out of date.
+                    permissions.invalidate_token(self.access_token or "")
+                delay = None
+                if self.retry is not None:
+                    delay = self.retry.delay(
+                        e, attempt, retry_method or method or "GET", started
+                    )
+                if delay is None:
+                    raise
+            attempt += 1
+            time.sleep(delay)
+            # Uploaded files have to be sent from the start again.
+            for file in (files or {}).values():
+                if hasattr(file, "seek"):
+                    file.seek(0)
+
+        headers = response.headers
+        if cache_key is not None and "json" in headers["content-type"]:
+            self.cache.set(cache_key, path, result, headers.get("etag"))
+        return result
+
+    def _add_credentials(self, args, post_args):
+        """Adds the access token and app secret proof to a request."""
+
         # Add `access_token` and app secret proof (`app_secret_hmac`) to
         # post_args or args if they exist and have not already been included.
         def _add_to_post_args_or_args(arg_name, arg_value):
@@ -283,23 +844,34 @@ class GraphAPI(object):
         if self.app_secret_hmac:
             _add_to_post_args_or_args("appsecret_proof", self.app_secret_hmac)
 
+    def _send(self, method, path, args, post_args, files, extra):
+        """Sends a request and records the usage headers of its response."""
         try:
+            if "://" not in path:
+                path = FACEBOOK_GRAPH_URL + path
             response = self.session.request(
-                method or "GET",
-                FACEBOOK_GRAPH_URL + path,
+                method,
+                path,
                 timeout=self.timeout,
                 params=args,
                 data=post_args,
                 proxies=self.proxies,
                 files=files,
+                **extra
             )
         except requests.HTTPError as e:
             response = json.loads(e.read())
             raise GraphAPIError(response)
 
+        self.usage.update(response.headers)
+        return response
+
+    def _parse_response(self, response):
+        """Decodes a response, raising GraphAPIError if it is an error."""
         headers = response.headers
+        status = response.status_code
         if "json" in headers["content-type"]:
-            result = response.json()
+            result = self.json_loads(response.content)
         elif "image/" in headers["content-type"]:
             mimetype = headers["content-type"]
             result = {
@@ -314,12 +886,17 @@ class GraphAPI(object):
                 if "expires" in query_str:
                     result["expires"] = query_str["expires"][0]
             else:
-                raise GraphAPIError(response.json())
+                raise GraphAPIError(
+                    self.json_loads(response.content), http_status=status
+                )
         else:
-            raise GraphAPIError("Maintype was not text, image, or querystring")
+            raise GraphAPIError(
+                "Maintype was not text, image, or querystring",
+                http_status=status,
+            )
 
         if result and isinstance(result, dict) and result.get("error"):
-            raise GraphAPIError(result)
+            raise GraphAPIError(result, http_status=status)
         return result
 
     def get_app_access_token(self, app_id, app_secret, offline=False):
@@ -381,7 +958,14 @@ class GraphAPI(object):
             "{0}/oauth/access_token".format(self.version), args=args
         )
 
-    def debug_access_token(self, token, app_id, app_secret):
+    def debug_access_token(
+        self,
+        token,
+        app_id,
+        app_secret,
+        cache=None,
+        cache_ttl=DEFAULT_DEBUG_TOKEN_CACHE_TTL,
+    ):
         """
         Gets information about a user access token issued by an app. See
         <https://developers.facebook.com/docs/facebook-login/
@@ -391,12 +975,102 @@ class GraphAPI(object):
         id and secret: <https://developers.facebook.com/docs/
         facebook-login/access-tokens#apptokens>
 
+        If cache (a CacheBackend, such as a MemoryCache) is given, the
+        result is stored in it for cache_ttl seconds, or until the token
+        expires if sooner. Results for invalid tokens are stored too, so
+        that checking a bad token again does not need a request either.
+
         """
+        cache_key = None
+        if cache is not None:
+            cache_key = _debug_token_cache_key(app_id, token)
+            result = cache.get(cache_key)
+            if result is not None:
+                return copy.deepcopy(result)
+
         args = {
             "input_token": token,
             "access_token": "{0}|{1}".format(app_id, app_secret),
         }
-        return self.request(self.version + "/" + "debug_token", args=args)
+        result = self.request(self.version + "/" + "debug_token", args=args)
+        if cache_key is not None:
+            _cache_debug_token(cache, cache_key, result, cache_ttl)
+        return result
+
+    def debug_access_tokens(
+        self,
+        tokens,
+        app_id,
+        app_secret,
+        cache=None,
+        cache_ttl=DEFAULT_DEBUG_TOKEN_CACHE_TTL,
+        max_workers=4,
+    ):
+        """Gets information about many access tokens in batch requests.
+
+        Returns a dict mapping each token to what debug_access_token
+        would return for it, or to the error its lookup failed with: a
+        GraphAPIError, or a requests exception if the batch request
+        carrying it could not be sent. Tokens found in cache (see
+        debug_access_token) are not requested again; the others are
+        sent BATCH_MAX_REQUESTS at a time, on up to max_workers threads.
+        """
+        results = OrderedDict((token, None) for token in tokens)
+        missing = []
+        for token in results:
+            if cache is not None:
+                cached = cache.get(_debug_token_cache_key(app_id, token))
+                if cached is not None:
+                    results[token] = copy.deepcopy(cached)
+                    continue
+            missing.append(token)
+
+        app_token = "{0}|{1}".format(app_id, app_secret)
+
+        def debug_chunk(chunk):
+            batch = [
+                {
+                    "method": "GET",
+                    "relative_url": "debug_token?"
+                    + urlencode({"input_token": token}),
+                }
+                for token in chunk
+            ]
+            try:
+                response = self.request(
+                    self.version + "/",
+                    post_args={
+                        "batch": json.dumps(batch),
+                        "include_headers": "false",
+                        # Sent explicitly so that the token and proof of
+                        # this GraphAPI object are not used instead.
+                        "access_token": app_token,
+                        "appsecret_proof": _appsecret_proof(
+                            app_secret, app_token
+                        ),
+                    },
+                )
+            except (GraphAPIError, requests.RequestException) as e:
+                for token in chunk:
+                    results[token] = e
+                return
+            for token, item in zip(chunk, response):
+                result = _parse_batch_response(item, self.json_loads)
+                results[token] = result
+                if cache is not None and isinstance(result, dict):
+                    _cache_debug_token(
+                        cache,
+                        _debug_token_cache_key(app_id, token),
+                        result,
+                        cache_ttl,
+                    )
+
+        chunks = []
+        for start in range(0, len(missing), BATCH_MAX_REQUESTS):
+            end = start + BATCH_MAX_REQUESTS
+            chunks.append(missing[start:end])
+        _map_chunks(debug_chunk, chunks, max_workers)
+        return dict(results)
 
     def get_auth_url(self, app_id, canvas_url, perms=None, **kwargs):
         """Build a URL to create an OAuth dialog."""
@@ -410,12 +1084,357 @@ class GraphAPI(object):
         args.update(kwargs)
         return url + urlencode(args)
 
+    def batch(self, max_workers=4):
+        """Returns a Batch that queues requests for a single round trip.
+
+        Used as a context manager, the batch is executed on exit:
+
+            with graph.batch() as batch:
+                me = batch.get_object("me")
+                feed = batch.get_connections("me", "feed")
+            print(me.result()["name"])
+
+        """
+        return Batch(self, max_workers=max_workers)
+
+    def execute_batch(self, batch_requests, max_workers=4):
+        """Sends the given requests through the Graph API's Batch API.
+
+        batch_requests is a list of dicts in the format described at
+        https://developers.facebook.com/docs/graph-api/batch-requests
+        (i.e. with "method" and "relative_url", and optionally "body",
+        "name" and "depends_on" keys). A "body" given as a dict is
+        URL-encoded for you.
+
+        Requests are sent BATCH_MAX_REQUESTS at a time. Requests linked
+        by "depends_on" or by JSONPath result references always go in
+        the same chunk; independent chunks are sent concurrently on up
+        to max_workers threads.
+
+        A chunk made only of GET requests is retried (see RetryPolicy)
+        like a GET request, although it is sent as a POST.
+
+        We return a list with one entry per request, in the same order:
+        the decoded response body, or a GraphAPIError if that request
+        failed or was not executed.
+        """
+        batch_requests = [_prepare_batch_request(r) for r in batch_requests]
+        chunks = _batch_chunks(batch_requests)
+        results = [None] * len(batch_requests)
+
+        def execute_chunk(chunk):
+            chunk_requests = [batch_requests[i] for i in chunk]
+            reads = all(
+                r.get("method", "GET").upper() in ("GET", "HEAD")
+                for r in chunk_requests
+            )
+            response = self.request(
+                self.version + "/",
+                post_args={
+                    "batch": json.dumps(chunk_requests),
+                    "include_headers": "false",
+                },
+                # A batch of reads can be retried like a GET request.
+                retry_method="GET" if reads else None,
+            )
+            for index, item in zip(chunk, response):
+                results[index] = _parse_batch_response(item, self.json_loads)
+
+        _map_chunks(execute_chunk, chunks, max_workers)
+        return results
+
+
+class Batch(object):
+    """Collects Graph API requests to send through GraphAPI.execute_batch.
+
+    Each method queues a request and returns a BatchItem, whose result
+    becomes available once the batch has been executed.
+    """
+
+    def __init__(self, graph, max_workers=4):
+        self.graph = graph
+        self.max_workers = max_workers
+        self.items = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+
+    def add(
+        self,
+        method,
+        relative_url,
+        args=None,
+        body=None,
+        name=None,
+        depends_on=None,
+    ):
+        """Queues a request for the given path relative to the version.
+
+        name and depends_on can be used to refer to the result of
+        another request in the same batch, e.g. with a relative_url of
+        "?ids={result=friends:$.data.*.id}".
+        """
+        if args:
+            relative_url += "?" + urlencode(args, doseq=True)
+        request = {"method": method, "relative_url": relative_url}
+        if body is not None:
+            request["body"] = body
+        if name is not None:
+            request["name"] = name
+            # Named requests have their responses omitted by default,
+            # which would make them indistinguishable from failures.
+            request["omit_response_on_success"] = False
+        if depends_on is not None:
+            request["depends_on"] = depends_on
+        item = BatchItem(request)
+        self.items.append(item)
+        return item
+
+    def get_object(self, id, **args):
+        """Queues a get_object call."""
+        return self.add("GET", str(id), args)
+
+    def get_connections(self, id, connection_name, **args):
+        """Queues a get_connections call."""
+        return self.add("GET", "{0}/{1}".format(id, connection_name), args)
+
+    def put_object(self, parent_object, connection_name, **data):
+        """Queues a put_object call."""
+        return self.add(
+            "POST", "{0}/{1}".format(parent_object, connection_name), body=data
+        )
+
+    def delete_object(self, id):
+        """Queues a delete_object call."""
+        return self.add("DELETE", str(id))
+
+    def execute(self):
+        """Executes the queued requests and fills in the BatchItems."""
+        items, self.items = self.items, []
+        results = self.graph.execute_batch(
+            [item.request for item in items], max_workers=self.max_workers
+        )
+        for item, result in zip(items, results):
+            item._set(result)
+        return results
+
+
+class BatchItem(object):
+    """The pending result of a request queued on a Batch."""
+
+    def __init__(self, request):
+        self.request = request
+        self.done = False
+        self.value = None
+        self.error = None
+
+    def _set(self, result):
+        if isinstance(result, GraphAPIError):
+            self.error = result
+        else:
+            self.value = result
+        self.done = True
+
+    def result(self):
+        """Returns the response, raising a GraphAPIError if it failed."""
+        if not self.done:
+            raise GraphAPIError("Batch has not been executed yet")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class FileCheckpoint(object):
+    """Stores pagination progress for prefetch_all_connections in a file.
+
+    The arguments for the next page to fetch are saved as JSON, so that
+    a long pagination can resume from its last page after a crash.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """Returns the saved page arguments, or None."""
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def save(self, args):
+        """Saves the arguments for the next page."""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(args, f)
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        """Removes the checkpoint once pagination has finished."""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class Coalescer(object):
+    """Merges get_object and get_connections calls into fewer requests.
+
+    Calls submitted within window seconds of each other (typically from
+    many threads) are sent together: get_object calls sharing the same
+    arguments become a single get_objects request, and get_connections
+    calls go through the Batch API. A call sent on its own is made as a
+    plain GET request, so that it can be cached. Each submit method
+    returns a concurrent.futures.Future for its own result.
+
+    GraphAPI uses a Coalescer for get_object and get_connections when
+    it is created with the coalesce_window argument.
+    """
+
+    def __init__(self, graph, window=0.005, max_batch=BATCH_MAX_REQUESTS):
+        self.graph = graph
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+
+    def submit_object(self, id, **args):
+        """Queues a get_object call and returns a Future for its result."""
+        return self._submit(("object", str(id), None, args))
+
+    def submit_connections(self, id, connection_name, **args):
+        """Queues a get_connections call and returns a Future."""
+        return self._submit(("connections", str(id), connection_name, args))
+
+    def _submit(self, call):
+        future = Future()
+        with self._lock:
+            self._pending.append((call, future))
+            if len(self._pending) >= self.max_batch:
+                pending = self._take_pending()
+            else:
+                pending = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.window, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if pending:
+            self._execute(pending)
+        return future
+
+    def _take_pending(self):
+        # Must be called with the lock held.
+        pending, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return pending
+
+    def flush(self):
+        """Sends all queued calls immediately."""
+        with self._lock:
+            pending = self._take_pending()
+        if pending:
+            self._execute(pending)
+
+    def _execute(self, pending):
+        try:
+            objects = {}
+            batched = []
+            for call, future in pending:
+                kind, id, connection_name, args = call
+                if kind == "object":
+                    # Arguments may be unhashable (e.g. lists of fields).
+                    key = json.dumps(sorted(args.items()), default=str)
+                    objects.setdefault(key, (args, []))[1].append((id, future))
+                else:
+                    batched.append((call, future))
+
+            for args, calls in objects.values():
+                batched.extend(self._fetch_objects(args, calls))
+            if batched:
+                self._fetch_batch(batched)
+        except Exception as e:
+            for call, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _fetch_objects(self, args, calls):
+        """Resolves get_object calls through one get_objects request.
+
+        We return the calls that could not be resolved this way (e.g.
+        because one of the IDs is invalid, which fails the whole
+        request), to be retried individually through the Batch API.
+        """
+        ids = list(OrderedDict.fromkeys(id for id, future in calls))
+        if len(ids) == 1:
+            try:
+                result = self.graph.request(
+                    "{0}/{1}".format(self.graph.version, ids[0]), dict(args)
+                )
+            except GraphAPIError as e:
+                for id, future in calls:
+                    future.set_exception(e)
+            else:
+                for id, future in calls:
+                    future.set_result(result)
+            return []
+
+        try:
+            result = self.graph.request(
+                self.graph.version + "/", dict(args, ids=",".join(ids))
+            )
+        except GraphAPIError:
+            result = {}
+        remaining = []
+        for id, future in calls:
+            if id in result:
+                future.set_result(result[id])
+            else:
+                remaining.append((("object", id, None, args), future))
+        return remaining
+
+    def _fetch_batch(self, batched):
+        if len(batched) == 1:
+            # A single call is sent as a plain GET request, which can be
+            # cached.
+            (kind, id, connection_name, args), future = batched[0]
+            path = id if kind == "object" else id + "/" + connection_name
+            try:
+                result = self.graph.request(
+                    "{0}/{1}".format(self.graph.version, path), dict(args)
+                )
+            except GraphAPIError as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            return
+
+        batch_requests = []
+        for (kind, id, connection_name, args), future in batched:
+            path = id if kind == "object" else id + "/" + connection_name
+            if args:
+                path += "?" + urlencode(args, doseq=True)
+            batch_requests.append({"method": "GET", "relative_url": path})
+        results = self.graph.execute_batch(batch_requests)
+        for (call, future), result in zip(batched, results):
+            if isinstance(result, GraphAPIError):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
 
 class GraphAPIError(Exception):
-    def __init__(self, result):
+    def __init__(self, result, http_status=None):
         self.result = result
         self.code = None
         self.error_subcode = None
+        self.http_status = http_status
 
         try:
             self.type = result["error_code"]
@@ -443,7 +1462,354 @@ class GraphAPIError(Exception):
         Exception.__init__(self, self.message)
 
 
-def get_user_from_cookie(cookies, app_id, app_secret):
+class SignedRequestVerifier(object):
+    """Verifies and decodes signed requests.
+
+    secrets - The app secret, or a list of app secrets, that signed
+        requests may be signed with. Listing both the old and the new
+        secret lets signed requests made before a secret was rotated
+        still be verified.
+    json_loads - The function used to decode JSON; see GraphAPI.
+
+    The HMAC of each secret is keyed once, when the verifier is created,
+    and the signature is checked, in constant time, before the payload
+    is decoded.
+    """
+
+    def __init__(self, secrets, json_loads=None):
+        if isinstance(secrets, str):
+            secrets = [secrets]
+        # HMAC can only handle ascii (byte) strings
+        # https://bugs.python.org/issue5285
+        self._hmacs = [
+            hmac.new(secret.encode("ascii"), digestmod=hashlib.sha256)
+            for secret in secrets
+        ]
+        self.json_loads = json_loads or DEFAULT_JSON_LOADS
+
+    def verify(self, signed_request):
+        """Returns the data of signed_request, or False if it is invalid.
+
+        False is returned if the signed request is malformed, or if it
+        was not signed with one of the secrets.
+        """
+        try:
+            if isinstance(signed_request, bytes):
+                signed_request = signed_request.decode("ascii")
+            encoded_sig, payload = signed_request.split(".", 1)
+            sig = base64.urlsafe_b64decode(
+                encoded_sig + "=" * (-len(encoded_sig) % 4)
+            )
+            payload = payload.encode("ascii")
+        except (AttributeError, ValueError, TypeError, binascii.Error):
+            # Signed request was malformed.
+            return False
+
+        for key in self._hmacs:
+            mac = key.copy()
+            mac.update(payload)
+            if hmac.compare_digest(mac.digest(), sig):
+                break
+        else:
+            return False
+
+        try:
+            data = self.json_loads(
+                base64.urlsafe_b64decode(payload + b"=" * (-len(payload) % 4))
+            )
+        except (ValueError, TypeError, binascii.Error):
+            # Signed request had a corrupted payload.
+            return False
+        if not isinstance(data, dict):
+            return False
+        if str(data.get("algorithm", "")).upper() != "HMAC-SHA256":
+            return False
+        return data
+
+    def verify_many(self, signed_requests):
+        """Verifies many signed requests, e.g. when reprocessing logs.
+
+        Returns a list with the result of verify for each signed request.
+        Repeated signed requests are only verified once, and share the
+        same result.
+        """
+        results = {}
+        verify = self.verify
+        output = []
+        for signed_request in signed_requests:
+            try:
+                result = results[signed_request]
+            except KeyError:
+                result = results[signed_request] = verify(signed_request)
+            output.append(result)
+        return output
+
+
+def _stdlib_json_loads(data):
+    """Decodes JSON from bytes or text with the json module."""
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    return json.loads(data)
+
+
+def _find_json_loads():
+    """Returns the fastest available function that decodes JSON bytes."""
+    for name in ("orjson", "ujson"):
+        try:
+            return importlib.import_module(name).loads
+        except ImportError:
+            pass
+    return _stdlib_json_loads
+
+
+DEFAULT_JSON_LOADS = _find_json_loads()
+
+
+def create_session(
+    pool_connections=DEFAULT_POOL_CONNECTIONS,
+    pool_maxsize=DEFAULT_POOL_MAXSIZE,
+    pool_block=False,
+    keep_alive=True,
+):
+    """Creates a requests Session with a tuned connection pool.
+
+    pool_connections - The number of hosts to keep connection pools for.
+    pool_maxsize - The maximum number of connections kept open per host.
+        This should be at least the number of threads sending requests.
+    pool_block - If true, requests wait for a free connection when the
+        pool is exhausted instead of opening throwaway connections.
+    keep_alive - If false, connections are closed after every request.
+
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+_shared_sessions = {}
+_shared_sessions_lock = threading.Lock()
+
+
+def shared_session(**options):
+    """Returns a process-wide Session for the given create_session options.
+
+    Pass it as the session of many GraphAPI objects (e.g. one per access
+    token) so that they share one connection pool.
+    """
+    key = tuple(sorted(options.items()))
+    with _shared_sessions_lock:
+        if key not in _shared_sessions:
+            _shared_sessions[key] = create_session(**options)
+        return _shared_sessions[key]
+
+
+class _NoSlot(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SLOT = _NoSlot()
+
+
+def _parse_version(version):
+    """Validates a Graph API version number and returns it as "v#.#"."""
+    version_regex = re.compile(r"^\d\.\d{1,2}$")
+    match = version_regex.search(str(version))
+    if match is None:
+        raise GraphAPIError(
+            "Version number should be in the"
+            " following format: #.# (e.g. 2.0)."
+        )
+    if str(version) not in VALID_API_VERSIONS:
+        raise GraphAPIError(
+            "Valid API versions are " + str(VALID_API_VERSIONS).strip("[]")
+        )
+    return "v" + str(version)
+
+
+def _next_page_args(page):
+    """Returns the query arguments for the page following the given one.
+
+    None is returned if the given page is the last one.
+    """
+    next = page.get("paging", {}).get("next")
+    if not next:
+        return None
+    args = parse_qs(urlparse(next).query)
+    args.pop("access_token", None)
+    return args
+
+
+def _appsecret_proof(app_secret, access_token):
+    """Computes the appsecret_proof sent alongside an access token."""
+    return hmac.new(
+        app_secret.encode("ascii"),
+        msg=access_token.encode("ascii"),
+        digestmod=hashlib.sha256,
+    ).hexdigest()
+
+
+def _granted_permissions(response):
+    """Returns the permissions granted in a /{user}/permissions result."""
+    return {
+        x["permission"] for x in response["data"] if x["status"] == "granted"
+    }
+
+
+def _is_permission_error(error):
+    """Returns whether error means the app lacks a permission."""
+    code = getattr(error, "code", None)
+    return code == 10 or (code is not None and 200 <= code < 300)
+
+
+def _debug_token_cache_key(app_id, token):
+    # Tokens are credentials, so only a digest of them is stored.
+    return "debug_token:" + token_identity("{0}:{1}".format(app_id, token))
+
+
+def _cache_debug_token(cache, key, result, ttl):
+    """Stores a debug_token result, for no longer than the token lasts."""
+    data = result.get("data") or {}
+    expires_at = data.get("expires_at")
+    if data.get("is_valid") and expires_at:
+        ttl = min(ttl, expires_at - time.time())
+    if ttl > 0:
+        cache.set(key, copy.deepcopy(result), ttl)
+
+
+def _chunk_ids(ids):
+    """Splits IDs into lists small enough for one get_objects request."""
+    chunks = []
+    current = []
+    length = 0
+    for id in ids:
+        id = str(id)
+        if current and (
+            len(current) == GET_OBJECTS_MAX_IDS
+            or length + len(id) + 1 > GET_OBJECTS_MAX_LENGTH
+        ):
+            chunks.append(current)
+            current = []
+            length = 0
+        current.append(id)
+        length += len(id) + 1
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _map_chunks(function, chunks, max_workers):
+    """Calls function on each chunk, on up to max_workers threads.
+
+    We return the results in the order of the chunks. Once every call
+    has finished, the first exception raised by one of them is raised.
+    """
+    if len(chunks) > 1 and max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(function, chunks))
+    return [function(chunk) for chunk in chunks]
+
+
+def _prepare_batch_request(request):
+    """Returns a copy of a batch request with its body URL-encoded."""
+    request = dict(request)
+    if isinstance(request.get("body"), dict):
+        request["body"] = urlencode(request["body"], doseq=True)
+    return request
+
+
+_BATCH_REFERENCE_REGEX = re.compile(r"{result=([^:}]+):")
+
+
+def _batch_chunks(requests):
+    """Splits batch requests into chunks that can be sent independently.
+
+    Requests that depend on each other (through "depends_on" or JSONPath
+    result references) are kept in the same chunk. We return a list of
+    lists of indices into requests.
+    """
+    parents = list(range(len(requests)))
+
+    def find(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    names = {r["name"]: i for i, r in enumerate(requests) if "name" in r}
+    for index, request in enumerate(requests):
+        referenced = set(
+            _BATCH_REFERENCE_REGEX.findall(
+                request.get("relative_url", "") + str(request.get("body", ""))
+            )
+        )
+        if "depends_on" in request:
+            referenced.add(request["depends_on"])
+        for name in referenced:
+            if name not in names:
+                raise GraphAPIError(
+                    "Batch request depends on unknown request " + name
+                )
+            parents[find(index)] = find(names[name])
+
+    groups = {}
+    for index in range(len(requests)):
+        groups.setdefault(find(index), []).append(index)
+
+    chunks = []
+    current = []
+    for group in groups.values():
+        if len(group) > BATCH_MAX_REQUESTS:
+            raise GraphAPIError(
+                "Dependent batch requests cannot exceed %d per batch"
+                % BATCH_MAX_REQUESTS
+            )
+        if len(current) + len(group) > BATCH_MAX_REQUESTS:
+            chunks.append(current)
+            current = []
+        current.extend(group)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _parse_batch_response(response, json_loads=json.loads):
+    """Converts one Batch API sub-response into a result or an error."""
+    if response is None:
+        return GraphAPIError(
+            "Batched request was not executed because a request it "
+            "depends on failed"
+        )
+    try:
+        body = json_loads(response.get("body") or "null")
+    except ValueError:
+        body = response.get("body")
+    if isinstance(body, dict) and body.get("error"):
+        return GraphAPIError(body)
+    if response.get("code", 200) >= 400:
+        return GraphAPIError(body)
+    return body
+
+
+def get_user_from_cookie(
+    cookies,
+    app_id,
+    app_secret,
+    json_loads=None,
+    cache=None,
+    cache_ttl=DEFAULT_COOKIE_CACHE_TTL,
+):
     """Parses the cookie set by the official Facebook JavaScript SDK.
 
     cookies should be a dictionary-like object mapping cookie names to
@@ -458,24 +1824,54 @@ def get_user_from_cookie(cookies, app_id, app_secret):
     Read more about Facebook authentication at
     https://developers.facebook.com/docs/facebook-login.
 
+    json_loads is the function used to decode JSON; see GraphAPI.
+
+    Exchanging the code in the cookie for an access token requires a
+    request to Facebook. If cache (a CacheBackend, such as a MemoryCache,
+    or one shared between processes) is given, the result is stored in
+    it for cache_ttl seconds (or until the access token expires, if
+    sooner), so that later requests with the same cookie do not need
+    one.
+
     """
     cookie = cookies.get("fbsr_" + app_id, "")
     if not cookie:
         return None
-    parsed_request = parse_signed_request(cookie, app_secret)
+    parsed_request = parse_signed_request(cookie, app_secret, json_loads)
     if not parsed_request:
         return None
+
+    cache_key = None
+    if cache is not None:
+        # The code is a credential, so only a digest of it is stored.
+        cache_key = "fbsr:" + token_identity(
+            "{0}:{1}:{2}".format(
+                app_id, parsed_request["code"], parsed_request.get("issued_at")
+            )
+        )
+        result = cache.get(cache_key)
+        if result is not None:
+            return dict(result)
+
     try:
-        result = GraphAPI().get_access_token_from_code(
+        result = GraphAPI(json_loads=json_loads).get_access_token_from_code(
             parsed_request["code"], "", app_id, app_secret
         )
     except GraphAPIError:
         return None
     result["uid"] = parsed_request["user_id"]
+
+    if cache_key is not None:
+        ttl = cache_ttl
+        try:
+            ttl = min(ttl, int(result["expires_in"]))
+        except (KeyError, TypeError, ValueError):
+            pass
+        cache.set(cache_key, dict(result), ttl)
     return result
 
 
-def parse_signed_request(signed_request, app_secret):
+def parse_signed_request(signed_request, app_secret, json_loads=None):
     """Return dictionary with signed request data.
 
     We return a dictionary containing the information in the
@@ -484,39 +1880,17 @@ def parse_signed_request(signed_request, app_secret):
 
     If the signed_request is malformed or corrupted, False is returned.
 
-    """
-    try:
-        encoded_sig, payload = map(str, signed_request.split(".", 1))
-
-        sig = base64.urlsafe_b64decode(
-            encoded_sig + "=" * ((4 - len(encoded_sig) % 4) % 4)
-        )
-        data = base64.urlsafe_b64decode(
-            payload + "=" * ((4 - len(payload) % 4) % 4)
-        )
-    except IndexError:
-        # Signed request was malformed.
-        return False
-    except TypeError:
-        # Signed request had a corrupted payload.
-        return False
-    except binascii.Error:
-        # Signed request had a corrupted payload.
-        return False
-
-    data = json.loads(data.decode("ascii"))
-    if data.get("algorithm", "").upper() != "HMAC-SHA256":
-        return False
+    json_loads is the function used to decode JSON; see GraphAPI.
+    Verifiers are reused between calls with the same app_secret; use a
+    SignedRequestVerifier directly for several (e.g. rotating) secrets.
 
-    # HMAC can only handle ascii (byte) strings
-    # https://bugs.python.org/issue5285
-    app_secret = app_secret.encode("ascii")
-    payload = payload.encode("ascii")
+    """
+    return _signed_request_verifier(app_secret, json_loads).verify(
+        signed_request
+    )
 
-    expected_sig = hmac.new(
-        app_secret, msg=payload, digestmod=hashlib.sha256
-    ).digest()
-    if sig != expected_sig:
-        return False
 
-    return data
+@functools.lru_cache(maxsize=32)
+def _signed_request_verifier(app_secret, json_loads):
+    """Returns a SignedRequestVerifier, reusing it for the same secret."""
+    return SignedRequestVerifier(app_secret, json_loads)
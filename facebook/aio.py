@@ -0,0 +1,511 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""asyncio client for the Facebook Graph API.
+
+AsyncGraphAPI mirrors facebook.GraphAPI, but every method that talks to
+Facebook is a coroutine, so it can be used from aiohttp, Tornado or any
+other asyncio based application without blocking the event loop:
+
+    transport = facebook.aio.AiohttpTransport(limit=500)
+    graph = facebook.aio.AsyncGraphAPI(access_token, transport=transport)
+    user = await graph.get_object("me")
+
+The HTTP layer is pluggable. Any object implementing the AsyncTransport
+interface can be passed as the transport; AiohttpTransport (which
+requires the aiohttp package) is used by default. Share one transport
+between many AsyncGraphAPI instances to share its connection pool.
+
+"""
+
+import copy
+from urllib.parse import parse_qs, urlencode
+
+from requests.structures import CaseInsensitiveDict
+
+from . import (
+    DEFAULT_DEBUG_TOKEN_CACHE_TTL,
+    DEFAULT_JSON_LOADS,
+    FACEBOOK_GRAPH_URL,
+    FACEBOOK_OAUTH_DIALOG_PATH,
+    FACEBOOK_WWW_URL,
+    VALID_API_VERSIONS,
+    VALID_SEARCH_TYPES,
+    GraphAPIError,
+    _appsecret_proof,
+    _cache_debug_token,
+    _debug_token_cache_key,
+    _next_page_args,
+    _parse_version,
+)
+
+
+def _form_value(value):
+    """Converts an argument to the string sent for it.
+
+    Booleans are sent as "true" and "false", as the Graph API expects.
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+class TransportResponse(object):
+    """The parts of an HTTP response that AsyncGraphAPI looks at."""
+
+    __slots__ = ("status", "headers", "content", "url")
+
+    def __init__(self, status, headers, content, url):
+        self.status = status
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.url = url
+
+
+class AsyncTransport(object):
+    """Interface for the HTTP layer used by AsyncGraphAPI."""
+
+    async def request(
+        self, method, url, params=None, data=None, files=None, timeout=None
+    ):
+        """Performs an HTTP request and returns a TransportResponse."""
+        raise NotImplementedError
+
+    async def close(self):
+        """Releases the connections held by the transport."""
+
+
+class AiohttpTransport(AsyncTransport):
+    """An AsyncTransport backed by an aiohttp ClientSession.
+
+    limit - The maximum number of simultaneous connections in the pool.
+    limit_per_host - The maximum number of simultaneous connections to a
+        single host (0 means no limit).
+    session - An existing aiohttp.ClientSession to use. It will not be
+        closed by close().
+    proxy - The URL of an HTTP proxy to send requests through.
+
+    """
+
+    def __init__(self, limit=100, limit_per_host=0, session=None, proxy=None):
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError(
+                "AiohttpTransport requires the aiohttp package. Install it "
+                "or pass another AsyncTransport to AsyncGraphAPI."
+            )
+        self._aiohttp = aiohttp
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._session = session
+        self._owns_session = session is None
+        self.proxy = proxy
+
+    def _get_session(self):
+        # The session is created lazily so that the transport can be
+        # built outside of a running event loop.
+        if self._session is None:
+            connector = self._aiohttp.TCPConnector(
+                limit=self._limit, limit_per_host=self._limit_per_host
+            )
+            self._session = self._aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def request(
+        self, method, url, params=None, data=None, files=None, timeout=None
+    ):
+        # Like requests, leave out arguments whose value is None.
+        fields = [
+            (key, _form_value(value))
+            for key, value in (data or {}).items()
+            if value is not None
+        ]
+        if files:
+            form = self._aiohttp.FormData()
+            for key, value in fields:
+                form.add_field(key, value)
+            for key, value in files.items():
+                form.add_field(key, value)
+            data = form
+        elif data:
+            data = dict(fields)
+        if timeout is not None:
+            timeout = self._aiohttp.ClientTimeout(total=timeout)
+        # aiohttp only accepts strings as query values, while the
+        # arguments parsed from paging URLs are lists.
+        query = []
+        for key, value in (params or {}).items():
+            values = value if isinstance(value, (list, tuple)) else [value]
+            query.extend(
+                (key, _form_value(v)) for v in values if v is not None
+            )
+        async with self._get_session().request(
+            method,
+            url,
+            params=query,
+            data=data,
+            timeout=timeout,
+            proxy=self.proxy,
+        ) as response:
+            content = await response.read()
+            return TransportResponse(
+                response.status, response.headers, content, str(response.url)
+            )
+
+    async def close(self):
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+        self._session = None
+
+
+class _AllConnections(object):
+    """The asynchronous iterator returned by get_all_connections.
+
+    It is a class rather than an asynchronous generator, which Python
+    3.5 does not support.
+    """
+
+    def __init__(self, graph, id, connection_name, args):
+        self.graph = graph
+        self.id = id
+        self.connection_name = connection_name
+        self.args = args
+        self.items = iter(())
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            try:
+                return next(self.items)
+            except StopIteration:
+                pass
+            if self.args is None:
+                raise StopAsyncIteration
+            page = await self.graph.get_connections(
+                self.id, self.connection_name, **self.args
+            )
+            self.items = iter(page["data"])
+            self.args = _next_page_args(page)
+
+
+class AsyncGraphAPI(object):
+    """An asyncio client for the Facebook Graph API.
+
+    Takes the same arguments as facebook.GraphAPI, except that a
+    transport (an AsyncTransport instance) replaces the requests session
+    and proxies. If no transport is given, an AiohttpTransport is
+    created and closed along with the client.
+
+    """
+
+    def __init__(
+        self,
+        access_token=None,
+        timeout=None,
+        version=None,
+        transport=None,
+        app_secret=None,
+        json_loads=None,
+    ):
+        self.access_token = access_token
+        self.timeout = timeout
+        self.json_loads = json_loads or DEFAULT_JSON_LOADS
+        self.app_secret_hmac = None
+        self._owns_transport = transport is None
+        self.transport = transport or AiohttpTransport()
+
+        if version:
+            self.version = _parse_version(version)
+        else:
+            self.version = "v" + VALID_API_VERSIONS[0]
+
+        if app_secret and access_token:
+            self.app_secret_hmac = _appsecret_proof(app_secret, access_token)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Closes the transport if it was created by this client."""
+        if self._owns_transport:
+            await self.transport.close()
+
+    async def get_permissions(self, user_id):
+        """Fetches the permissions object from the graph."""
+        response = await self.request(
+            "{0}/{1}/permissions".format(self.version, user_id), {}
+        )
+        return {
+            x["permission"]
+            for x in response["data"]
+            if x["status"] == "granted"
+        }
+
+    async def get_object(self, id, **args):
+        """Fetches the given object from the graph."""
+        return await self.request("{0}/{1}".format(self.version, id), args)
+
+    async def get_objects(self, ids, **args):
+        """Fetches all of the given object from the graph.
+
+        We return a map from ID to object. If any of the IDs are
+        invalid, we raise an exception.
+        """
+        args["ids"] = ",".join(ids)
+        return await self.request(self.version + "/", args)
+
+    async def search(self, type, **args):
+        """https://developers.facebook.com/docs/places/search"""
+        if type not in VALID_SEARCH_TYPES:
+            raise GraphAPIError(
+                "Valid types are: %s" % ", ".join(VALID_SEARCH_TYPES)
+            )
+
+        args["type"] = type
+        return await self.request(self.version + "/search/", args)
+
+    async def get_connections(self, id, connection_name, **args):
+        """Fetches the connections for given object."""
+        return await self.request(
+            "{0}/{1}/{2}".format(self.version, id, connection_name), args
+        )
+
+    def get_all_connections(self, id, connection_name, **args):
+        """Get all pages from a get_connections call
+
+        This returns an asynchronous iterator that will iterate over all
+        pages returned by a get_connections call and yield the
+        individual items.
+        """
+        return _AllConnections(self, id, connection_name, args)
+
+    async def put_object(self, parent_object, connection_name, **data):
+        """Writes the given object to the graph, connected to the given parent.
+
+        See GraphAPI.put_object for details.
+
+        """
+        assert self.access_token, "Write operations require an access token"
+        return await self.request(
+            "{0}/{1}/{2}".format(self.version, parent_object, connection_name),
+            post_args=data,
+            method="POST",
+        )
+
+    async def put_comment(self, object_id, message):
+        """Writes the given comment on the given post."""
+        return await self.put_object(object_id, "comments", message=message)
+
+    async def put_like(self, object_id):
+        """Likes the given post."""
+        return await self.put_object(object_id, "likes")
+
+    async def delete_object(self, id):
+        """Deletes the object with the given ID from the graph."""
+        return await self.request(
+            "{0}/{1}".format(self.version, id), method="DELETE"
+        )
+
+    async def delete_request(self, user_id, request_id):
+        """Deletes the Request with the given ID for the given user."""
+        return await self.request(
+            "{0}_{1}".format(request_id, user_id), method="DELETE"
+        )
+
+    async def put_photo(self, image, album_path="me/photos", **kwargs):
+        """
+        Upload an image using multipart/form-data.
+
+        image - A file object representing the image to be uploaded.
+        album_path - A path representing where the image should be uploaded.
+
+        """
+        return await self.request(
+            "{0}/{1}".format(self.version, album_path),
+            post_args=kwargs,
+            files={"source": image},
+            method="POST",
+        )
+
+    async def get_version(self):
+        """Fetches the current version number of the Graph API being used."""
+        response = await self.transport.request(
+            "GET",
+            FACEBOOK_GRAPH_URL + self.version + "/me",
+            params={"access_token": self.access_token},
+            timeout=self.timeout,
+        )
+        try:
+            return str(
+                response.headers["facebook-api-version"].replace("v", "")
+            )
+        except Exception:
+            raise GraphAPIError("API version number not available")
+
+    async def request(
+        self, path, args=None, post_args=None, files=None, method=None
+    ):
+        """Fetches the given path in the Graph API.
+
+        We translate args to a valid query string. If post_args is
+        given, we send a POST request to the given path with the given
+        arguments.
+
+        """
+        if args is None:
+            args = dict()
+        if post_args is not None:
+            method = "POST"
+
+        def _add_to_post_args_or_args(arg_name, arg_value):
+            if post_args and arg_name not in post_args:
+                post_args[arg_name] = arg_value
+            elif arg_name not in args:
+                args[arg_name] = arg_value
+
+        if self.access_token:
+            _add_to_post_args_or_args("access_token", self.access_token)
+        if self.app_secret_hmac:
+            _add_to_post_args_or_args("appsecret_proof", self.app_secret_hmac)
+
+        response = await self.transport.request(
+            method or "GET",
+            FACEBOOK_GRAPH_URL + path,
+            params=args,
+            data=post_args,
+            files=files,
+            timeout=self.timeout,
+        )
+
+        content_type = response.headers.get("content-type", "")
+        if "json" in content_type:
+            result = self.json_loads(response.content)
+        elif "image/" in content_type:
+            result = {
+                "data": response.content,
+                "mime-type": content_type,
+                "url": response.url,
+            }
+        else:
+            query_str = parse_qs(response.content.decode("utf-8"))
+            if "access_token" not in query_str:
+                raise GraphAPIError(
+                    "Maintype was not text, image, or querystring"
+                )
+            result = {"access_token": query_str["access_token"][0]}
+            if "expires" in query_str:
+                result["expires"] = query_str["expires"][0]
+
+        if result and isinstance(result, dict) and result.get("error"):
+            raise GraphAPIError(result)
+        return result
+
+    async def get_app_access_token(self, app_id, app_secret, offline=False):
+        """
+        Get the application's access token as a string.
+        If offline=True, use the concatenated app ID and secret
+        instead of making an API call.
+        """
+        if offline:
+            return "{0}|{1}".format(app_id, app_secret)
+        args = {
+            "grant_type": "client_credentials",
+            "client_id": app_id,
+            "client_secret": app_secret,
+        }
+        result = await self.request(
+            "{0}/oauth/access_token".format(self.version), args=args
+        )
+        return result["access_token"]
+
+    async def get_access_token_from_code(
+        self, code, redirect_uri, app_id, app_secret
+    ):
+        """Get an access token from the "code" returned from an OAuth dialog.
+
+        Returns a dict containing the user-specific access token and its
+        expiration date (if applicable).
+
+        """
+        args = {
+            "code": code,
+            "redirect_uri": redirect_uri,
+            "client_id": app_id,
+            "client_secret": app_secret,
+        }
+        return await self.request(
+            "{0}/oauth/access_token".format(self.version), args
+        )
+
+    async def extend_access_token(self, app_id, app_secret):
+        """Extends the expiration time of a valid OAuth access token."""
+        args = {
+            "client_id": app_id,
+            "client_secret": app_secret,
+            "grant_type": "fb_exchange_token",
+            "fb_exchange_token": self.access_token,
+        }
+        return await self.request(
+            "{0}/oauth/access_token".format(self.version), args=args
+        )
+
+    async def debug_access_token(
+        self,
+        token,
+        app_id,
+        app_secret,
+        cache=None,
+        cache_ttl=DEFAULT_DEBUG_TOKEN_CACHE_TTL,
+    ):
+        """Gets information about a user access token issued by an app.
+
+        cache and cache_ttl are as for GraphAPI.debug_access_token.
+        """
+        cache_key = None
+        if cache is not None:
+            cache_key = _debug_token_cache_key(app_id, token)
+            result = cache.get(cache_key)
+            if result is not None:
+                return copy.deepcopy(result)
+
+        args = {
+            "input_token": token,
+            "access_token": "{0}|{1}".format(app_id, app_secret),
+        }
+        result = await self.request(
+            self.version + "/" + "debug_token", args=args
+        )
+        if cache_key is not None:
+            _cache_debug_token(cache, cache_key, result, cache_ttl)
+        return result
+
+    def get_auth_url(self, app_id, canvas_url, perms=None, **kwargs):
+        """Build a URL to create an OAuth dialog."""
+        url = "{0}{1}/{2}".format(
+            FACEBOOK_WWW_URL, self.version, FACEBOOK_OAUTH_DIALOG_PATH
+        )
+
+        args = {"client_id": app_id, "redirect_uri": canvas_url}
+        if perms:
+            args["scope"] = ",".join(perms)
+        args.update(kwargs)
+        return url + urlencode(args)
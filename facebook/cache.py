@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Caching of Graph API responses.
+
+A ResponseCache passed to GraphAPI stores the results of GET requests,
+so that repeated reads of the same object are answered locally:
+
+    cache = facebook.ResponseCache(ttl=60, ttls={r"/insights": 3600})
+    graph = facebook.GraphAPI(access_token, cache=cache)
+
+A PermissionCache passed to GraphAPI stores the permissions returned by
+get_permissions until they are invalidated by an error or a webhook.
+
+Entries are stored in a cache backend: MemoryCache (an in-process LRU
+cache) is used by default and SQLiteCache can be shared by several
+processes on the same machine. Any object with the get, set, delete and
+clear methods of CacheBackend can be used instead.
+
+"""
+
+import copy
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Arguments that authenticate a request rather than select its result.
+IGNORED_ARGS = ("access_token", "appsecret_proof")
+
+
+class CacheBackend(object):
+    """Interface for the storage used by ResponseCache.
+
+    Values must be JSON serializable if the backend stores them outside
+    of the current process.
+    """
+
+    def get(self, key):
+        """Returns the value stored for key, or None."""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        """Stores value for key, for at most ttl seconds if given."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Removes the value stored for key, if any."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Removes all values."""
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """A thread-safe in-memory cache that evicts least recently used keys.
+
+    maxsize - The maximum number of keys to keep.
+
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value, expires = self._data[key]
+            except KeyError:
+                return None
+            if expires is not None and expires <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """A cache stored in an SQLite database file.
+
+    The file can be shared by several processes. Values are stored as
+    JSON.
+
+    path - The path of the database file.
+    maxsize - The maximum number of keys to keep. The least recently
+        used keys are evicted first.
+
+    """
+
+    def __init__(self, path, maxsize=100000):
+        self.path = path
+        self.maxsize = maxsize
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, "
+                "value TEXT, expires REAL, accessed REAL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)"
+            )
+
+    def _connection(self):
+        # SQLite connections cannot be shared between threads.
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        now = time.time()
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT value, expires FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and row[1] <= now:
+                connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            connection.execute(
+                "UPDATE cache SET accessed = ? WHERE key = ?", (now, key)
+            )
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires = now + ttl if ttl is not None else None
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires, now),
+            )
+            connection.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                "ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def delete(self, key):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM cache")
+
+
+def token_identity(access_token):
+    """Returns a digest identifying an access token without revealing it."""
+    return hashlib.sha256(access_token.encode("utf-8")).hexdigest()[:32]
+
+
+class ResponseCache(object):
+    """Caches the JSON results of Graph API GET requests.
+
+    backend - The CacheBackend storing the entries. Defaults to a
+        MemoryCache.
+    ttl - The number of seconds a result is used without asking Facebook
+        again.
+    ttls - A dict mapping regular expressions to TTLs, for paths that
+        need a different TTL. The first expression that matches the
+        path (without the version prefix) is used.
+    stale_ttl - The number of seconds expired entries with an ETag are
+        kept for revalidation. A revalidated entry is served from the
+        cache when Facebook answers "304 Not Modified".
+
+    Cache keys are built from the path, the query arguments except the
+    access token and app secret proof, and a digest of the access token,
+    so results are never shared between tokens.
+    """
+
+    def __init__(self, backend=None, ttl=300, ttls=None, stale_ttl=86400):
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttl = ttl
+        self.ttls = [
+            (re.compile(pattern), value)
+            for pattern, value in (ttls or {}).items()
+        ]
+        self.stale_ttl = stale_ttl
+
+    def key(self, path, args):
+        """Returns the cache key for a request."""
+        normalized = sorted(
+            (name, value if isinstance(value, list) else [value])
+            for name, value in args.items()
+            if name not in IGNORED_ARGS
+        )
+        token = args.get("access_token")
+        return json.dumps(
+            [path, normalized, token_identity(token) if token else None],
+            default=str,
+            separators=(",", ":"),
+        )
+
+    def ttl_for(self, path):
+        """Returns the TTL for results of the given path."""
+        endpoint = re.sub(r"^v\d+\.\d+/", "/", path)
+        for pattern, ttl in self.ttls:
+            if pattern.search(endpoint):
+                return ttl
+        return self.ttl
+
+    def get(self, key):
+        """Returns a tuple of (result, etag, fresh) or None on a miss."""
+        entry = self.backend.get(key)
+        if entry is None:
+            return None
+        fresh = entry["expires"] > time.time()
+        if not fresh and not entry.get("etag"):
+            return None
+        return copy.deepcopy(entry["result"]), entry.get("etag"), fresh
+
+    def set(self, key, path, result, etag=None):
+        """Stores the result of a request."""
+        ttl = self.ttl_for(path)
+        if ttl <= 0:
+            return
+        entry = {
+            "result": copy.deepcopy(result),
+            "etag": etag,
+            "expires": time.time() + ttl,
+        }
+        self.backend.set(key, entry, ttl + self.stale_ttl if etag else ttl)
+
+
+class PermissionCache(object):
+    """Caches the permissions users have granted to the app.
+
+    backend - The CacheBackend storing the permissions. Defaults to a
+        MemoryCache of maxsize users.
+    ttl - The number of seconds permissions are used without asking
+        Facebook again.
+
+    GraphAPI invalidates the permissions read with a token when a
+    request made with it fails with a permission error. Permissions
+    changed by the user are invalidated by passing the entries of the
+    "permissions" webhook to handle_webhook.
+
+    Permissions are stored under the ID of the user. For "me", the ID of
+    the user a token belongs to is recorded with set_user, so that a
+    webhook about that user also invalidates the permissions read as
+    "me".
+    """
+
+    def __init__(self, backend=None, ttl=3600, maxsize=10000):
+        self.backend = (
+            backend if backend is not None else MemoryCache(maxsize=maxsize)
+        )
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # The users whose permissions were read with each token.
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, user_id, access_token=None):
+        """Returns the cache key for the permissions of a user.
+
+        The key for "me" holds the ID of the user access_token belongs
+        to rather than permissions.
+        """
+        user_id = str(user_id)
+        if user_id == "me":
+            return "permissions:me:" + token_identity(access_token or "")
+        return "permissions:" + user_id
+
+    def set_user(self, access_token, user_id):
+        """Records the ID of the user access_token belongs to."""
+        self.backend.set(self.key("me", access_token), str(user_id), self.ttl)
+
+    def _resolve(self, user_id, access_token):
+        # Returns the ID of the user, or None if "me" is not known.
+        if str(user_id) == "me":
+            return self.backend.get(self.key("me", access_token))
+        return str(user_id)
+
+    def get(self, user_id, access_token=None):
+        """Returns the permissions of a user as a frozenset, or None."""
+        user_id = self._resolve(user_id, access_token)
+        if user_id is None:
+            return None
+        permissions = self.backend.get(self.key(user_id))
+        if permissions is None:
+            return None
+        return frozenset(permissions)
+
+    def set(self, user_id, permissions, access_token=None):
+        """Stores the permissions of a user, read with access_token.
+
+        For "me", the ID of the user must have been recorded with
+        set_user; otherwise the permissions are not stored.
+        """
+        user_id = self._resolve(user_id, access_token)
+        if user_id is None:
+            return
+        self.backend.set(self.key(user_id), sorted(permissions), self.ttl)
+        if access_token:
+            identity = token_identity(access_token)
+            with self._lock:
+                self._users.setdefault(identity, set()).add(user_id)
+                self._users.move_to_end(identity)
+                while len(self._users) > self.maxsize:
+                    self._users.popitem(last=False)
+
+    def invalidate(self, user_id, access_token=None):
+        """Forgets the permissions of a user."""
+        user_id = self._resolve(user_id, access_token)
+        if user_id is not None:
+            self.backend.delete(self.key(user_id))
+
+    def invalidate_token(self, access_token):
+        """Forgets the permissions read with access_token."""
+        with self._lock:
+            users = self._users.pop(token_identity(access_token), ())
+        for user_id in users:
+            self.invalidate(user_id)
+
+    def handle_webhook(self, entries):
+        """Forgets the permissions of the users in webhook entries.
+
+        entries is the "entry" list of a webhook payload sent for the
+        "permissions" object, or for the "permissions" field of the
+        "user" object.
+        """
+        for entry in entries:
+            user_id = entry.get("uid") or entry.get("id")
+            if user_id:
+                self.invalidate(user_id)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Bulk export of Graph API objects to columnar files.
+
+Objects are collected into batches of columns, one list per field, and
+each batch is written to a sink as soon as it is full, so the memory
+used does not grow with the number of objects exported:
+
+    with facebook.ParquetSink("posts.parquet") as sink:
+        graph.export_connections(
+            "me", "posts", ["id", "message", "from.name"], sink
+        )
+
+Fields are given as paths, with dots separating the names of nested
+fields. ParquetSink and ArrowSink require the pyarrow package.
+
+"""
+
+import csv
+import json
+from collections import OrderedDict
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+def query_fields(paths):
+    """Returns the value of the fields argument for the given paths."""
+    tree = OrderedDict()
+    for path in paths:
+        node = tree
+        for name in path.split("."):
+            node = node.setdefault(name, OrderedDict())
+
+    def join(node):
+        return ",".join(
+            name + ("{" + join(child) + "}" if child else "")
+            for name, child in node.items()
+        )
+
+    return join(tree)
+
+
+def _getter(path):
+    """Returns a function extracting the field at path from an object."""
+    names = path.split(".")
+    if len(names) == 1:
+        name = names[0]
+        return lambda item: item.get(name)
+
+    def get(item):
+        for name in names:
+            if not isinstance(item, dict):
+                return None
+            item = item.get(name)
+        return item
+
+    return get
+
+
+def export_items(items, fields, sink, batch_size=DEFAULT_BATCH_SIZE):
+    """Writes the given fields of the objects in items to sink.
+
+    Objects are written in batches of batch_size rows. Returns the number
+    of rows written.
+    """
+    getters = [(path, _getter(path)) for path in fields]
+    columns = OrderedDict((path, []) for path in fields)
+    count = 0
+    for item in items:
+        for path, get in getters:
+            columns[path].append(get(item))
+        count += 1
+        if count % batch_size == 0:
+            sink.write(columns)
+            columns = OrderedDict((path, []) for path in fields)
+    if count % batch_size or not count:
+        sink.write(columns)
+    return count
+
+
+class Sink(object):
+    """Interface of the destinations of export_items.
+
+    write() is called with an OrderedDict mapping each field to a list
+    of values, all of the same length.
+    """
+
+    def write(self, columns):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CSVSink(Sink):
+    """Writes rows to a CSV file, with the field paths as header.
+
+    Objects and lists are written as JSON and missing values as empty
+    strings. file is a path or a file object opened in text mode.
+    """
+
+    def __init__(self, file, **fmtparams):
+        self._owns_file = isinstance(file, str)
+        self._file = (
+            open(file, "w", newline="", encoding="utf-8")
+            if self._owns_file
+            else file
+        )
+        self._writer = csv.writer(self._file, **fmtparams)
+        self._header = False
+
+    def write(self, columns):
+        if not self._header:
+            self._writer.writerow(list(columns))
+            self._header = True
+        values = [
+            [
+                json.dumps(value) if isinstance(value, (dict, list)) else value
+                for value in column
+            ]
+            for column in columns.values()
+        ]
+        self._writer.writerows(zip(*values))
+
+    def close(self):
+        if self._owns_file:
+            self._file.close()
+
+
+class ArrowSink(Sink):
+    """Writes record batches to an Arrow IPC file.
+
+    schema is a pyarrow.Schema. If it is not given, it is inferred from
+    the first batch (with string columns for fields that are always
+    missing in it), and later batches are converted to it.
+    """
+
+    def __init__(self, path, schema=None):
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError(
+                "{0} requires the pyarrow package.".format(type(self).__name__)
+            )
+        self._pyarrow = pyarrow
+        self.path = path
+        self.schema = schema
+        self._writer = None
+
+    def _open(self):
+        return self._pyarrow.ipc.new_file(self.path, self.schema)
+
+    def write(self, columns):
+        pa = self._pyarrow
+        if self.schema is None:
+            schema = pa.Table.from_pydict(columns).schema
+            for index, field in enumerate(schema):
+                if pa.types.is_null(field.type):
+                    schema = schema.set(index, field.with_type(pa.string()))
+            self.schema = schema
+        table = pa.Table.from_pydict(columns, schema=self.schema)
+        if self._writer is None:
+            self._writer = self._open()
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class ParquetSink(ArrowSink):
+    """Writes one row group per batch to a Parquet file.
+
+    Takes the same arguments as ArrowSink, and the compression codec.
+    """
+
+    def __init__(self, path, schema=None, compression="snappy"):
+        super(ParquetSink, self).__init__(path, schema)
+        self.compression = compression
+
+    def _open(self):
+        import pyarrow.parquet
+
+        return pyarrow.parquet.ParquetWriter(
+            self.path, self.schema, compression=self.compression
+        )
@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Instrumentation of Graph API requests.
+
+GraphAPI calls hooks registered with add_hook at three points of every
+attempt of a request, passing them a RequestInfo describing it:
+
+* before_request(info) - before the request is sent.
+* after_response(info, result) - once the response has been decoded.
+* on_error(info, error) - when the attempt failed with a GraphAPIError
+  or a requests exception. It may be retried afterwards.
+
+PrometheusMetrics and OpenTelemetryHooks are ready-made sets of hooks:
+
+    metrics = facebook.PrometheusMetrics()
+    metrics.install(graph)
+    ...
+    print(metrics.render())
+
+"""
+
+import bisect
+import datetime
+import re
+import threading
+import time
+from collections import defaultdict
+
+HOOK_EVENTS = ("before_request", "after_response", "on_error")
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_ID_REGEX = re.compile(r"^(act_)?\d+(_\d+)*$")
+_VERSION_REGEX = re.compile(r"^v\d+\.\d+$")
+
+
+def endpoint_label(path):
+    """Returns path without its version and IDs, e.g. "{id}/comments".
+
+    Labels group requests to the same endpoint, whatever the objects
+    they are for.
+    """
+    path = path.split("?", 1)[0]
+    if "://" in path:
+        path = path.split("/", 3)[3] if path.count("/") > 2 else ""
+    segments = []
+    for segment in path.split("/"):
+        if not segment or _VERSION_REGEX.match(segment):
+            continue
+        match = _ID_REGEX.match(segment)
+        if match:
+            segment = (match.group(1) or "") + "{id}"
+        segments.append(segment)
+    return "/".join(segments) or "/"
+
+
+class RequestInfo(object):
+    """Describes one attempt of a request, for hooks.
+
+    method, path, args and attempt (the number of retries made before
+    this attempt) are set when it is created. endpoint is the path as
+    returned by endpoint_label. status, size (of the response body, in
+    bytes) and error are set once they are known.
+
+    timings maps the phases of the attempt to their duration in seconds:
+    "ttfb" (until the response headers arrived, including connecting),
+    "download" (reading the body), "decode" (decoding it) and "total".
+    Connection setup is not timed separately, since requests does not
+    report it.
+
+    context is a dict in which hooks can keep their own state.
+    """
+
+    def __init__(self, method, path, args, attempt=0):
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint_label(path)
+        self.args = args
+        self.attempt = attempt
+        self.status = None
+        self.size = None
+        self.error = None
+        self.timings = {}
+        self.context = {}
+        self._started = self._received = None
+
+    def start(self):
+        """Records that the request is being sent."""
+        self._started = time.perf_counter()
+
+    def received(self, response, stream=False):
+        """Records the arrival of response.
+
+        If stream is true, the body is read later, so its size is not
+        recorded (reading it here would load it into memory).
+        """
+        self._received = time.perf_counter()
+        self.status = response.status_code
+        content = None if stream else getattr(response, "content", None)
+        if isinstance(content, bytes):
+            self.size = len(content)
+        elapsed = getattr(response, "elapsed", None)
+        duration = self._received - self._started
+        if isinstance(elapsed, datetime.timedelta):
+            ttfb = min(elapsed.total_seconds(), duration)
+            self.timings["ttfb"] = ttfb
+            self.timings["download"] = duration - ttfb
+
+    def finished(self, error=None):
+        """Records the end of the attempt, with the error if it failed."""
+        now = time.perf_counter()
+        if self._received is not None:
+            self.timings["decode"] = now - self._received
+        if self._started is not None:
+            self.timings["total"] = now - self._started
+        self.error = error
+
+
+def _format_labels(labels):
+    return ",".join(
+        '{0}="{1}"'.format(
+            name,
+            str(value)
+            .replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n"),
+        )
+        for name, value in labels
+    )
+
+
+class PrometheusMetrics(object):
+    """Counts requests and their durations, by endpoint.
+
+    buckets - The upper bounds (in seconds) of the buckets of the
+        request duration histograms.
+    prefix - The prefix of the names of the metrics.
+
+    render() returns the metrics in the Prometheus text exposition
+    format, to be served on a /metrics page or pushed to a gateway.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix="facebook_graph"):
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self.requests = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.response_bytes = defaultdict(int)
+        self._durations = {}
+        self._phases = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def install(self, graph):
+        """Registers the hooks of these metrics with a GraphAPI object."""
+        graph.add_hook("after_response", self.after_response)
+        graph.add_hook("on_error", self.on_error)
+
+    def _observe(self, info, outcome):
+        labels = (info.method, info.endpoint)
+        with self._lock:
+            self.requests[labels + (str(info.status or outcome),)] += 1
+            if info.size is not None:
+                self.response_bytes[labels] += info.size
+            total = info.timings.get("total")
+            if total is not None:
+                histogram = self._durations.get(labels)
+                if histogram is None:
+                    histogram = self._durations[labels] = [
+                        [0] * (len(self.buckets) + 1),
+                        0.0,
+                    ]
+                histogram[0][bisect.bisect_left(self.buckets, total)] += 1
+                histogram[1] += total
+            for phase, duration in info.timings.items():
+                self._phases[labels + (phase,)] += duration
+
+    def after_response(self, info, result):
+        self._observe(info, "ok")
+
+    def on_error(self, info, error):
+        code = getattr(error, "code", None)
+        with self._lock:
+            self.errors[
+                (info.method, info.endpoint, str(code or type(error).__name__))
+            ] += 1
+        self._observe(info, "error")
+
+    def render(self):
+        """Returns the metrics in the Prometheus text format."""
+        name = self.prefix
+        lines = []
+
+        def metric(suffix, kind, description, samples):
+            lines.append(
+                "# HELP {0}_{1} {2}".format(name, suffix, description)
+            )
+            lines.append("# TYPE {0}_{1} {2}".format(name, suffix, kind))
+            for sample_suffix, labels, value in samples:
+                lines.append(
+                    "{0}_{1}{2}{{{3}}} {4}".format(
+                        name,
+                        suffix,
+                        sample_suffix,
+                        _format_labels(labels),
+                        value,
+                    )
+                )
+
+        with self._lock:
+            metric(
+                "requests_total",
+                "counter",
+                "Graph API requests, by response status.",
+                [
+                    ("", zip(("method", "endpoint", "status"), key), value)
+                    for key, value in sorted(self.requests.items())
+                ],
+            )
+            metric(
+                "errors_total",
+                "counter",
+                "Failed Graph API requests, by error code.",
+                [
+                    ("", zip(("method", "endpoint", "code"), key), value)
+                    for key, value in sorted(self.errors.items())
+                ],
+            )
+            metric(
+                "response_bytes_total",
+                "counter",
+                "Size of Graph API response bodies.",
+                [
+                    ("", zip(("method", "endpoint"), key), value)
+                    for key, value in sorted(self.response_bytes.items())
+                ],
+            )
+            metric(
+                "phase_seconds_total",
+                "counter",
+                "Time spent in each phase of Graph API requests.",
+                [
+                    ("", zip(("method", "endpoint", "phase"), key), value)
+                    for key, value in sorted(self._phases.items())
+                ],
+            )
+            samples = []
+            for key, (counts, total) in sorted(self._durations.items()):
+                labels = list(zip(("method", "endpoint"), key))
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    samples.append(
+                        ("_bucket", labels + [("le", bound)], cumulative)
+                    )
+                samples.append(("_sum", labels, total))
+                samples.append(("_count", labels, cumulative))
+            metric(
+                "request_duration_seconds",
+                "histogram",
+                "Duration of Graph API requests.",
+                samples,
+            )
+        return "\n".join(lines) + "\n"
+
+
+class OpenTelemetryHooks(object):
+    """Records every request attempt as an OpenTelemetry span.
+
+    tracer - The opentelemetry.trace.Tracer to create spans with. By
+        default, one is obtained from the global tracer provider, which
+        requires the opentelemetry-api package.
+    """
+
+    def __init__(self, tracer=None):
+        if tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                raise ImportError(
+                    "OpenTelemetryHooks requires the opentelemetry-api "
+                    "package, or a tracer."
+                )
+            tracer = trace.get_tracer(__name__)
+        self.tracer = tracer
+
+    def install(self, graph):
+        """Registers these hooks with a GraphAPI object."""
+        graph.add_hook("before_request", self.before_request)
+        graph.add_hook("after_response", self.after_response)
+        graph.add_hook("on_error", self.on_error)
+
+    def before_request(self, info):
+        span = self.tracer.start_span(
+            "{0} {1}".format(info.method, info.endpoint),
+            attributes={
+                "http.method": info.method,
+                "facebook.endpoint": info.endpoint,
+                "facebook.attempt": info.attempt,
+            },
+        )
+        info.context["span"] = span
+
+    def _end(self, info):
+        span = info.context.pop("span", None)
+        if span is None:
+            return None
+        if info.status is not None:
+            span.set_attribute("http.status_code", info.status)
+        if info.size is not None:
+            span.set_attribute("http.response_content_length", info.size)
+        for phase, duration in info.timings.items():
+            span.set_attribute("facebook.timing." + phase, duration)
+        return span
+
+    def after_response(self, info, result):
+        span = self._end(info)
+        if span is not None:
+            span.end()
+
+    def on_error(self, info, error):
+        span = self._end(info)
+        if span is not None:
+            span.record_exception(error)
+            code = getattr(error, "code", None)
+            if code is not None:
+                span.set_attribute("facebook.error_code", code)
+            try:
+                from opentelemetry.trace import Status, StatusCode
+
+                span.set_status(Status(StatusCode.ERROR, str(error)))
+            except ImportError:
+                pass
+            span.end()
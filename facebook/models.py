@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Typed, compact objects for Graph API results.
+
+A model declares the fields it needs. They are requested with the fields
+argument and decoded into an object that stores them in __slots__, which
+uses much less memory than the dict the Graph API returns:
+
+    class User(facebook.Model):
+        fields = ("id", "name")
+
+    class Post(facebook.Model):
+        fields = ("id", "message", "created_time", ("from", User))
+
+    for post in Post.iter_all(graph, "me", "feed"):
+        print(post.from_.name, post.message)
+
+A field is either a name or a (name, model) tuple for fields holding
+objects or lists of objects. Fields named after Python keywords (such as
+"from") are available as attributes with a trailing underscore, and
+fields missing from a result are None.
+
+"""
+
+import keyword
+
+
+class ModelMeta(type):
+    """Turns the fields declared by a model into __slots__."""
+
+    def __new__(mcs, name, bases, namespace):
+        specs = []
+        for base in bases:
+            specs.extend(getattr(base, "_specs", ()))
+        slots = []
+        for field in namespace.get("fields", ()):
+            if isinstance(field, tuple):
+                field, model = field
+            else:
+                model = None
+            attribute = field + "_" if keyword.iskeyword(field) else field
+            specs.append((field, attribute, model))
+            slots.append(attribute)
+        namespace["__slots__"] = tuple(slots)
+        namespace["_specs"] = tuple(specs)
+        return type.__new__(mcs, name, bases, namespace)
+
+
+class Model(object, metaclass=ModelMeta):
+    """Base class of typed Graph API objects."""
+
+    fields = ()
+
+    def __init__(self, **values):
+        for _, attribute, _ in self._specs:
+            setattr(self, attribute, values.get(attribute))
+
+    @classmethod
+    def query_fields(cls):
+        """Returns the value of the fields argument for this model."""
+        fields = []
+        for field, _, model in cls._specs:
+            if model is not None:
+                field += "{" + model.query_fields() + "}"
+            fields.append(field)
+        return ",".join(fields)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Creates an object from a Graph API result."""
+        self = cls.__new__(cls)
+        for field, attribute, model in cls._specs:
+            value = data.get(field)
+            if model is not None and value is not None:
+                value = model._decode(value)
+            setattr(self, attribute, value)
+        return self
+
+    @classmethod
+    def _decode(cls, value):
+        """Decodes an object, a list of objects or a connection."""
+        if isinstance(value, dict) and isinstance(value.get("data"), list):
+            value = value["data"]
+        if isinstance(value, list):
+            return tuple(cls.from_dict(item) for item in value)
+        return cls.from_dict(value)
+
+    @classmethod
+    def get(cls, graph, id, **args):
+        """Fetches the given object from the graph."""
+        args["fields"] = cls.query_fields()
+        return cls.from_dict(graph.get_object(id, **args))
+
+    @classmethod
+    def get_many(cls, graph, ids, **args):
+        """Fetches the given objects; returns a map from ID to object."""
+        args["fields"] = cls.query_fields()
+        return {
+            id: cls.from_dict(data)
+            for id, data in graph.get_objects(ids, **args).items()
+        }
+
+    @classmethod
+    def iter_all(cls, graph, id, connection_name, **args):
+        """Yields all of the connections of the given object."""
+        args["fields"] = cls.query_fields()
+        for data in graph.get_all_connections(id, connection_name, **args):
+            yield cls.from_dict(data)
+
+    def to_dict(self):
+        """Returns the fields that are set, as a Graph API result."""
+        result = {}
+        for field, attribute, model in self._specs:
+            value = getattr(self, attribute)
+            if value is None:
+                continue
+            if isinstance(value, tuple):
+                value = {"data": [item.to_dict() for item in value]}
+            elif model is not None:
+                value = value.to_dict()
+            result[field] = value
+        return result
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+        return all(
+            getattr(self, attribute) == getattr(other, attribute)
+            for _, attribute, _ in self._specs
+        )
+
+    def __repr__(self):
+        return "{0}({1})".format(
+            type(self).__name__,
+            ", ".join(
+                "{0}={1!r}".format(attribute, getattr(self, attribute))
+                for _, attribute, _ in self._specs
+            ),
+        )
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Streaming multipart/form-data request bodies.
+
+Given a file object, requests reads the whole file into memory to build
+a multipart body. MultipartEncoder instead produces the body in chunks
+while it is being sent, reading files chunk_size bytes at a time and
+slicing bytes, memoryview and mmap objects without copying them. Since
+its length is known in advance, requests sends it with a Content-Length
+header rather than chunked transfer encoding.
+
+"""
+
+import binascii
+import os
+
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def _encode(value):
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode("utf-8")
+
+
+def _quote(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+class MultipartEncoder(object):
+    """A multipart/form-data body that is read from its sources lazily.
+
+    fields - A dict of form fields.
+    files - A dict mapping field names to file objects, bytes-like
+        objects (bytes, memoryview, mmap), or (filename, source) or
+        (filename, source, content_type) tuples.
+    chunk_size - The number of bytes read from files at a time.
+
+    Iterating over the encoder yields the body, and can be repeated
+    (e.g. when a request is retried): file objects are seeked back to
+    where they were when the encoder was created. content_type is the
+    value of the Content-Type header to send with the body.
+    """
+
+    def __init__(self, fields=None, files=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.boundary = binascii.hexlify(os.urandom(16)).decode("ascii")
+        self.content_type = "multipart/form-data; boundary=" + self.boundary
+        self.chunk_size = chunk_size
+        self._parts = []
+        for name, value in (fields or {}).items():
+            header = 'Content-Disposition: form-data; name="{0}"'.format(
+                _quote(name)
+            )
+            value = _encode(value)
+            self._parts.append((self._header(header), value, len(value)))
+        for name, value in (files or {}).items():
+            self._parts.append(self._file_part(name, value))
+        self._end = "--{0}--\r\n".format(self.boundary).encode("ascii")
+
+    def _header(self, *lines):
+        return "--{0}\r\n{1}\r\n\r\n".format(
+            self.boundary, "\r\n".join(lines)
+        ).encode("utf-8")
+
+    def _file_part(self, name, value):
+        content_type = "application/octet-stream"
+        if isinstance(value, tuple):
+            if len(value) == 3:
+                filename, value, content_type = value
+            else:
+                filename, value = value
+        else:
+            filename = os.path.basename(getattr(value, "name", None) or name)
+        if hasattr(value, "read"):
+            start = value.tell()
+            length = value.seek(0, os.SEEK_END) - start
+            value.seek(start)
+            source = (value, start)
+        else:
+            source = memoryview(value).cast("B")
+            length = len(source)
+        disposition = 'form-data; name="{0}"; filename="{1}"'.format(
+            _quote(name), _quote(str(filename))
+        )
+        header = self._header(
+            "Content-Disposition: " + disposition,
+            "Content-Type: " + content_type,
+        )
+        return header, source, length
+
+    def __len__(self):
+        return sum(
+            len(header) + length + 2 for header, _, length in self._parts
+        ) + len(self._end)
+
+    def __iter__(self):
+        size = self.chunk_size
+        for header, source, length in self._parts:
+            yield header
+            if isinstance(source, tuple):
+                file, start = source
+                file.seek(start)
+                remaining = length
+                while remaining > 0:
+                    chunk = file.read(min(size, remaining))
+                    if not chunk:
+                        raise IOError("File shrank while being uploaded")
+                    remaining -= len(chunk)
+                    yield chunk
+            else:
+                for start in range(0, length, size):
+                    end = start + size
+                    yield source[start:end]
+            yield b"\r\n"
+        yield self._end
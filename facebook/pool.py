@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Clients for many access tokens sharing one connection pool.
+
+Applications acting on behalf of many pages or users need one GraphAPI
+object per access token. GraphAPIPool creates them on demand, all using
+the same requests session, and keeps the most recently used ones along
+with their appsecret_proof. It can also limit the number of concurrent
+requests and the request rate of each token, so that the work of one
+token cannot use up the connections and rate limits shared with the
+others:
+
+    pool = GraphAPIPool(app_secret, concurrency=4, rate=10)
+    page = pool.client(page_token).get_object("me")
+
+"""
+
+import hashlib
+import hmac
+import threading
+
+from . import DEFAULT_POOL_MAXSIZE, GraphAPI, RateLimiter, create_session
+from .cache import MemoryCache
+
+DEFAULT_MAX_CLIENTS = 10000
+
+
+class PooledGraphAPI(GraphAPI):
+    """A GraphAPI object handed out by a GraphAPIPool.
+
+    At most concurrency requests are sent at once when it is set.
+    """
+
+    def __init__(self, access_token, concurrency=None, **kwargs):
+        super(PooledGraphAPI, self).__init__(access_token, **kwargs)
+        self._semaphore = None
+        if concurrency is not None:
+            self._semaphore = threading.BoundedSemaphore(concurrency)
+
+    def _request_slot(self):
+        if self._semaphore is None:
+            return super(PooledGraphAPI, self)._request_slot()
+        return self._semaphore
+
+    def request(self, *args, **kwargs):
+        with self._request_slot():
+            return super(PooledGraphAPI, self).request(*args, **kwargs)
+
+
+class GraphAPIPool(object):
+    """Creates and keeps GraphAPI objects for many access tokens.
+
+    app_secret - The app secret. The appsecret_proof of each token is
+        computed once, with an HMAC keyed when the pool is created.
+    session - The requests session shared by all clients. By default,
+        one with a blocking pool of pool_maxsize connections is created.
+    max_clients - The number of clients, and proofs, kept. The least
+        recently used are dropped first.
+    concurrency - The maximum number of concurrent requests per token.
+    rate, burst - If rate is set, the requests of each token are limited
+        by a RateLimiter with this rate and burst.
+
+    Other arguments (e.g. timeout, version, retry, cache) are passed to
+    every GraphAPI object.
+    """
+
+    def __init__(
+        self,
+        app_secret=None,
+        session=None,
+        pool_maxsize=DEFAULT_POOL_MAXSIZE,
+        max_clients=DEFAULT_MAX_CLIENTS,
+        concurrency=None,
+        rate=None,
+        burst=None,
+        **options
+    ):
+        self.session = session or create_session(
+            pool_maxsize=pool_maxsize, pool_block=True
+        )
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.options = options
+        self._hmac = None
+        if app_secret:
+            self._hmac = hmac.new(
+                app_secret.encode("ascii"), digestmod=hashlib.sha256
+            )
+        self._clients = MemoryCache(maxsize=max_clients)
+        self._proofs = MemoryCache(maxsize=max_clients)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._clients)
+
+    def appsecret_proof(self, access_token):
+        """Returns the appsecret_proof of access_token, or None."""
+        if self._hmac is None:
+            return None
+        proof = self._proofs.get(access_token)
+        if proof is None:
+            mac = self._hmac.copy()
+            mac.update(access_token.encode("ascii"))
+            proof = mac.hexdigest()
+            self._proofs.set(access_token, proof)
+        return proof
+
+    def client(self, access_token):
+        """Returns the GraphAPI object for access_token."""
+        client = self._clients.get(access_token)
+        if client is not None:
+            return client
+        with self._lock:
+            # Another thread may have created it in the meantime.
+            client = self._clients.get(access_token)
+            if client is None:
+                client = PooledGraphAPI(
+                    access_token,
+                    concurrency=self.concurrency,
+                    session=self.session,
+                    rate_limiter=(
+                        RateLimiter(rate=self.rate, burst=self.burst)
+                        if self.rate
+                        else None
+                    ),
+                    **self.options
+                )
+                client.app_secret_hmac = self.appsecret_proof(access_token)
+                self._clients.set(access_token, client)
+        return client
+
+    def request(self, access_token, path, *args, **kwargs):
+        """Calls GraphAPI.request with the client for access_token."""
+        return self.client(access_token).request(path, *args, **kwargs)
+
+    def remove(self, access_token):
+        """Forgets the client of access_token, e.g. once it is revoked."""
+        self._clients.delete(access_token)
+        self._proofs.delete(access_token)
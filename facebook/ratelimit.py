@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Tracking of Graph API rate limit usage.
+
+Facebook reports how close an app is to its rate limits in the
+X-App-Usage, X-Page-Usage, X-Ad-Account-Usage and
+X-Business-Use-Case-Usage response headers. See
+https://developers.facebook.com/docs/graph-api/overview/rate-limiting.
+
+Every GraphAPI object records the latest values in its usage attribute
+(a UsageStats object). A RateLimiter passed to GraphAPI uses them to
+slow requests down before the limits are reached.
+
+"""
+
+import json
+import threading
+import time
+
+USAGE_HEADERS = {
+    "app": "x-app-usage",
+    "page": "x-page-usage",
+    "ad_account": "x-ad-account-usage",
+    "business": "x-business-use-case-usage",
+}
+
+
+# The fields of usage headers that are percentages. Others are not, e.g.
+# reset_time_duration (in seconds) of X-Ad-Account-Usage.
+PERCENTAGE_KEYS = (
+    "call_count",
+    "total_cputime",
+    "total_time",
+    "acc_id_util_pct",
+)
+
+
+def _percentages(usage):
+    """Yields the usage percentages found in a usage header value."""
+    if isinstance(usage, dict):
+        for key, value in usage.items():
+            if key in PERCENTAGE_KEYS:
+                if isinstance(value, (int, float)):
+                    yield value
+            else:
+                yield from _percentages(value)
+    elif isinstance(usage, list):
+        for value in usage:
+            yield from _percentages(value)
+
+
+def _regain_minutes(usage):
+    """Yields the estimated_time_to_regain_access values in a header."""
+    if isinstance(usage, dict):
+        for key, value in usage.items():
+            if key == "estimated_time_to_regain_access":
+                yield value
+            else:
+                yield from _regain_minutes(value)
+    elif isinstance(usage, list):
+        for value in usage:
+            yield from _regain_minutes(value)
+
+
+class UsageStats(object):
+    """The latest rate limit usage reported by the Graph API.
+
+    The app, page, ad_account and business attributes contain the
+    decoded headers (or None if they have not been received yet), and
+    updated is the time at which any of them last changed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.app = None
+        self.page = None
+        self.ad_account = None
+        self.business = None
+        self.updated = None
+
+    def update(self, headers):
+        """Records the usage headers of a response, if there are any."""
+        values = {}
+        for name, header in USAGE_HEADERS.items():
+            value = headers.get(header)
+            if value:
+                try:
+                    values[name] = json.loads(value)
+                except ValueError:
+                    pass
+        if values:
+            with self._lock:
+                for name, value in values.items():
+                    setattr(self, name, value)
+                self.updated = time.time()
+        return bool(values)
+
+    def as_dict(self):
+        """Returns the current usage as a dict."""
+        with self._lock:
+            return {name: getattr(self, name) for name in USAGE_HEADERS}
+
+    def max_usage(self):
+        """Returns the highest usage percentage across all headers."""
+        return max(_percentages(list(self.as_dict().values())), default=0)
+
+    def regain_access_seconds(self):
+        """Returns Facebook's estimate of when a throttled app can resume."""
+        minutes = list(_regain_minutes(list(self.as_dict().values())))
+        return max(minutes, default=0) * 60
+
+
+class RateLimiter(object):
+    """A token bucket that adapts its rate to the reported usage.
+
+    rate - The maximum number of requests per second.
+    burst - The number of requests that can be sent at once after a
+        quiet period. Defaults to rate.
+    threshold - The usage percentage above which the rate is reduced.
+        Between threshold and 100% the rate decreases linearly, down to
+        min_rate_factor * rate.
+    pause - The number of seconds to stop sending requests for once the
+        usage has reached 100%, unless Facebook gives its own estimate.
+
+    The same RateLimiter can be shared by several GraphAPI objects that
+    use the same app.
+    """
+
+    def __init__(
+        self,
+        rate=50.0,
+        burst=None,
+        threshold=75,
+        min_rate_factor=0.05,
+        pause=60,
+    ):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else rate)
+        self.threshold = threshold
+        self.min_rate_factor = min_rate_factor
+        self.pause = pause
+        self._tokens = self.burst
+        self._last = time.time()
+        self._lock = threading.Lock()
+
+    def current_rate(self, usage):
+        """Returns the allowed requests per second for the given usage."""
+        percent = usage.max_usage() if usage is not None else 0
+        if percent < self.threshold:
+            return self.rate
+        factor = (100.0 - percent) / (100.0 - self.threshold)
+        return self.rate * max(factor, self.min_rate_factor)
+
+    def try_acquire(self, usage=None):
+        """Takes a token if one is available.
+
+        Returns 0 on success, or the number of seconds to wait before
+        trying again.
+        """
+        now = time.time()
+        if usage is not None and usage.updated is not None:
+            if usage.max_usage() >= 100:
+                pause = usage.regain_access_seconds() or self.pause
+                remaining = usage.updated + pause - now
+                if remaining > 0:
+                    return remaining
+        rate = self.current_rate(usage)
+        with self._lock:
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last) * rate
+            )
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / rate
+
+    def acquire(self, usage=None):
+        """Blocks until a request may be sent."""
+        while True:
+            wait = self.try_acquire(usage)
+            if wait <= 0:
+                return
+            time.sleep(wait)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Retrying of failed Graph API requests.
+
+A RetryPolicy passed to GraphAPI retries requests that failed for
+reasons that are likely to go away, using the error codes described at
+https://developers.facebook.com/docs/graph-api/using-graph-api/error-handling:
+
+    graph = facebook.GraphAPI(access_token, retry=facebook.RetryPolicy())
+
+"""
+
+import random
+import threading
+import time
+
+import requests
+
+RETRYABLE = "retryable"
+THROTTLED = "throttled"
+FATAL = "fatal"
+
+# Temporary errors on Facebook's side.
+RETRYABLE_CODES = frozenset([1, 2])
+# Application, user, page and ad account level rate limiting.
+THROTTLED_CODES = frozenset([4, 17, 32, 341, 613]) | frozenset(
+    range(80000, 80015)
+)
+
+
+def classify(error):
+    """Returns RETRYABLE, THROTTLED or FATAL for the given exception."""
+    if isinstance(error, requests.RequestException):
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return RETRYABLE
+        return FATAL
+    code = getattr(error, "code", None)
+    if code in THROTTLED_CODES:
+        return THROTTLED
+    if code in RETRYABLE_CODES:
+        return RETRYABLE
+    result = getattr(error, "result", None)
+    if isinstance(result, dict) and isinstance(result.get("error"), dict):
+        if result["error"].get("is_transient"):
+            return RETRYABLE
+    status = getattr(error, "http_status", None)
+    if isinstance(status, int) and status >= 500:
+        return RETRYABLE
+    return FATAL
+
+
+class RetryPolicy(object):
+    """Decides whether, and when, a failed request is retried.
+
+    max_retries - The maximum number of retries of a single request.
+    backoff - The delay (in seconds) before the first retry. It doubles
+        with every retry, up to max_backoff.
+    throttled_backoff - The delay before the first retry of a request
+        that failed because of rate limiting.
+    jitter - If true, each delay is randomized between zero and its
+        computed value, so that clients do not retry in lockstep.
+    deadline - The maximum number of seconds spent on a request,
+        including all of its retries.
+    retry_writes - If true, POST and DELETE requests are retried too.
+        They are not by default, since they may have succeeded even
+        though an error was returned.
+
+    The stats attribute counts the retries made, by classification.
+    """
+
+    def __init__(
+        self,
+        max_retries=3,
+        backoff=0.5,
+        max_backoff=30,
+        throttled_backoff=5,
+        jitter=True,
+        deadline=60,
+        retry_writes=False,
+    ):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.throttled_backoff = throttled_backoff
+        self.jitter = jitter
+        self.deadline = deadline
+        self.retry_writes = retry_writes
+        self.stats = {RETRYABLE: 0, THROTTLED: 0}
+        self._lock = threading.Lock()
+
+    def delay(self, error, attempt, method, started):
+        """Returns the seconds to wait before retrying, or None to give up.
+
+        attempt is the number of retries already made and started is the
+        time at which the first attempt was made.
+        """
+        if attempt >= self.max_retries:
+            return None
+        if method not in ("GET", "HEAD") and not self.retry_writes:
+            return None
+        kind = classify(error)
+        if kind == FATAL:
+            return None
+
+        base = self.throttled_backoff if kind == THROTTLED else self.backoff
+        delay = min(base * 2**attempt, self.max_backoff)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        if time.time() + delay - started > self.deadline:
+            return None
+
+        with self._lock:
+            self.stats[kind] += 1
+        return delay
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Incremental decoding of Graph API connection pages.
+
+A page of a connection is a JSON object whose "data" key holds a list of
+items. StreamingPage decodes such an object from an iterable of byte
+chunks (e.g. the iter_content() of a streamed requests response) and
+yields the items of the list one at a time, so only one item needs to be
+held in memory instead of the whole page.
+
+"""
+
+import codecs
+import json
+import re
+
+_WHITESPACE = " \t\n\r"
+_PARTIAL_NUMBER = re.compile(r"[0-9.eE+-]*$")
+
+
+class StreamingPage(object):
+    """Iterates over the items of a JSON object's list while decoding it.
+
+    chunks - An iterable of bytes making up the JSON object.
+    key - The key of the list to stream.
+
+    Iterating over the page yields the items of the list. The other keys
+    of the object (e.g. "paging") are available in the fields attribute
+    once iteration has finished. A ValueError is raised if the document
+    is not valid JSON.
+    """
+
+    def __init__(self, chunks, key="data"):
+        self.key = key
+        self.fields = {}
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _read(self):
+        """Appends the next chunk to the buffer; returns False at the end."""
+        if self._eof:
+            return False
+        # Drop what has been consumed already, so the buffer only holds
+        # the item being decoded.
+        consumed, self._pos = self._pos, 0
+        self._buffer = self._buffer[consumed:]
+        for chunk in self._chunks:
+            if chunk:
+                self._buffer += self._decoder.decode(chunk)
+                return True
+        self._buffer += self._decoder.decode(b"", final=True)
+        self._eof = True
+        return False
+
+    def _peek(self):
+        """Skips whitespace and returns the next character ("" at the end)."""
+        while True:
+            while (
+                self._pos < len(self._buffer)
+                and self._buffer[self._pos] in _WHITESPACE
+            ):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                return ""
+
+    def _expect(self, characters):
+        character = self._peek()
+        if character == "" or character not in characters:
+            raise ValueError(
+                "Expected one of %r at position %d" % (characters, self._pos)
+            )
+        self._pos += 1
+        return character
+
+    def _value(self):
+        """Decodes the next JSON value, reading more input as needed."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except ValueError:
+                if not self._read():
+                    raise
+                continue
+            # A number at the end of the buffer may not be complete yet,
+            # e.g. "1" of "1.5" or "1e" of "1e5" when the chunk ended there.
+            if (
+                isinstance(value, (int, float))
+                and _PARTIAL_NUMBER.match(self._buffer, end)
+                and self._read()
+            ):
+                continue
+            self._pos = end
+            return value
+
+    def __iter__(self):
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            name = self._value()
+            self._expect(":")
+            if name == self.key and self._peek() == "[":
+                self._pos += 1
+                if self._peek() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._value()
+                        if self._expect(",]") == "]":
+                            break
+            else:
+                self.fields[name] = self._value()
+            if self._expect(",}") == "}":
+                return
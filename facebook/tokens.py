@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Access tokens that are extended before they expire.
+
+A TokenManager holds an access token and the time it expires at, as
+returned by get_access_token_from_code, extend_access_token or
+debug_access_token. It exchanges the token for a new one with
+extend_access_token refresh_margin seconds before it expires, in a
+background thread once started. GraphAPI objects returned by its client
+method always send the current token, so that requests do not fail with
+an expired token only to be retried:
+
+    manager = TokenManager(app_id, app_secret)
+    manager.update(graph.get_access_token_from_code(code, uri, ...))
+    with manager:
+        profile = manager.client().get_object("me")
+
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+import requests
+
+from . import GraphAPI, GraphAPIError, _appsecret_proof
+
+DEFAULT_REFRESH_MARGIN = 24 * 3600
+DEFAULT_RETRY_INTERVAL = 60
+
+logger = logging.getLogger(__name__)
+
+
+class TokenManager(object):
+    """Keeps an access token valid by extending it before it expires.
+
+    app_id, app_secret - The app the token was issued by.
+    access_token, expires_at - The initial token and the Unix time it
+        expires at (None if unknown or if it does not expire).
+    refresh_margin - How many seconds before it expires the token is
+        extended.
+    retry_interval - How many seconds to wait after a failed refresh
+        before trying again, and the minimum time between refreshes.
+    on_refresh - A function called with the result of every refresh,
+        e.g. to save the new token.
+
+    Other arguments (e.g. version, timeout, session) are passed to the
+    GraphAPI objects used to refresh the token and to those returned by
+    client().
+    """
+
+    def __init__(
+        self,
+        app_id,
+        app_secret,
+        access_token=None,
+        expires_at=None,
+        refresh_margin=DEFAULT_REFRESH_MARGIN,
+        retry_interval=DEFAULT_RETRY_INTERVAL,
+        on_refresh=None,
+        **options
+    ):
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.on_refresh = on_refresh
+        self.options = options
+        if "session" not in options:
+            options["session"] = requests.Session()
+        self._condition = threading.Condition()
+        self._state = None
+        self._refreshing = None
+        self._refreshed_at = None
+        self._thread = None
+        self._stopped = False
+        if access_token:
+            self.set(access_token, expires_at)
+
+    @property
+    def access_token(self):
+        """The current token, without refreshing it."""
+        state = self._state
+        return state[0] if state else None
+
+    @property
+    def expires_at(self):
+        """The Unix time the current token expires at, or None."""
+        state = self._state
+        return state[1] if state else None
+
+    def set(self, access_token, expires_at=None):
+        """Replaces the token."""
+        proof = _appsecret_proof(self.app_secret, access_token)
+        with self._condition:
+            self._state = (access_token, expires_at, proof)
+            # Wake the background thread up to schedule the new token.
+            self._condition.notify_all()
+
+    def update(self, result):
+        """Records the token and expiry returned by the Graph API.
+
+        result is the dict returned by get_access_token_from_code or
+        extend_access_token, or by debug_access_token for the current
+        token. In the latter case only the expiry is updated.
+        """
+        now = time.time()
+        if "data" in result:
+            if self.access_token is None:
+                raise GraphAPIError(
+                    "A debug_token result can only update the expiry of "
+                    "the current token, and there is none"
+                )
+            data = result["data"]
+            if not data.get("is_valid", True):
+                raise GraphAPIError(
+                    {"error": data["error"]} if "error" in data else data
+                )
+            # expires_at is 0 for tokens that do not expire.
+            expires_at = data.get("expires_at") or None
+            self.set(self.access_token, expires_at)
+            return
+        expires_in = result.get("expires_in", result.get("expires"))
+        expires_at = None
+        if expires_in:
+            expires_at = now + int(expires_in)
+        self.set(result["access_token"], expires_at)
+
+    def inspect(self):
+        """Records the expiry of the current token from debug_token."""
+        graph = GraphAPI(**self.options)
+        result = graph.debug_access_token(
+            self.access_token, self.app_id, self.app_secret
+        )
+        self.update(result)
+        return result
+
+    def _due(self):
+        """Returns the Unix time the token should be refreshed at."""
+        state = self._state
+        if state is None or state[1] is None:
+            return None
+        due = state[1] - self.refresh_margin
+        if self._refreshed_at is not None:
+            due = max(due, self._refreshed_at + self.retry_interval)
+        return due
+
+    def refresh(self):
+        """Exchanges the current token for a new one, and returns it.
+
+        Concurrent calls make one request: the others wait for it and
+        return its result, or raise its error.
+        """
+        with self._condition:
+            future = self._refreshing
+            owner = future is None
+            if owner:
+                future = self._refreshing = Future()
+                token = self.access_token
+        if not owner:
+            return future.result()
+
+        try:
+            graph = GraphAPI(token, **self.options)
+            result = graph.extend_access_token(self.app_id, self.app_secret)
+            self.update(result)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(self.access_token)
+            if self.on_refresh is not None:
+                self.on_refresh(result)
+        finally:
+            with self._condition:
+                self._refreshing = None
+                self._refreshed_at = time.time()
+        return self.access_token
+
+    def get(self):
+        """Returns a valid token, refreshing it first if it is due.
+
+        When the background thread is running, it refreshes the token
+        and this returns immediately. Otherwise, the caller refreshes
+        it; if that fails, the current token is returned until it has
+        expired.
+        """
+        due = self._due()
+        if due is None or time.time() < due or self.running:
+            return self.access_token
+        try:
+            return self.refresh()
+        except (GraphAPIError, requests.RequestException):
+            expires_at = self.expires_at
+            if expires_at is not None and expires_at <= time.time():
+                raise
+            return self.access_token
+
+    def credentials(self):
+        """Returns a valid token and its appsecret_proof."""
+        self.get()
+        state = self._state
+        if state is None:
+            return None, None
+        return state[0], state[2]
+
+    def client(self, **options):
+        """Returns a GraphAPI object that always uses the current token.
+
+        options override those given to the manager.
+        """
+        kwargs = dict(self.options)
+        kwargs.update(options)
+        return ManagedGraphAPI(self, **kwargs)
+
+    @property
+    def running(self):
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def start(self):
+        """Starts refreshing the token in a background thread."""
+        with self._condition:
+            if self.running:
+                return self
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the background thread."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    now = time.time()
+                    due = self._due()
+                    if due is not None and due <= now:
+                        break
+                    self._condition.wait(None if due is None else due - now)
+                if self._stopped:
+                    return
+            # Whatever the error, _due waits retry_interval after the
+            # failed attempt.
+            try:
+                self.refresh()
+            except (GraphAPIError, requests.RequestException):
+                pass
+            except Exception:
+                # Keep the thread alive, e.g. after a malformed response.
+                logger.exception("Refreshing the access token failed")
+
+
+class ManagedGraphAPI(GraphAPI):
+    """A GraphAPI object using the current token of a TokenManager."""
+
+    def __init__(self, manager, **kwargs):
+        self.manager = manager
+        super(ManagedGraphAPI, self).__init__(**kwargs)
+
+    @property
+    def access_token(self):
+        return self.manager.get()
+
+    @access_token.setter
+    def access_token(self, value):
+        if value is not None:
+            self.manager.set(value)
+
+    def _add_credentials(self, args, post_args):
+        # The token and its proof are read together, so that a refresh
+        # in another thread cannot mix an old token with a new proof.
+        token, proof = self.manager.credentials()
+        credentials = (("access_token", token), ("appsecret_proof", proof))
+        for name, value in credentials:
+            if not value:
+                continue
+            if post_args and name not in post_args:
+                post_args[name] = value
+            elif name not in args:
+                args[name] = value
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Resumable uploads of large videos.
+
+ResumableUpload implements the chunked upload protocol of the Graph API
+(https://developers.facebook.com/docs/video-api/guides/publishing): a
+start request opens an upload session, the file is sent in the chunks
+requested by Facebook in transfer requests, and a finish request
+publishes the video.
+
+The file is memory-mapped, so only the chunk being sent is read. Failed
+chunks are retried, and if a checkpoint is given the session is saved
+after each chunk, so that an upload interrupted by a crash continues
+where it stopped when it is run again:
+
+    upload = ResumableUpload(
+        graph, "movie.mp4", target=page_id,
+        checkpoint=facebook.FileCheckpoint("movie.upload"),
+    )
+    video = upload.upload(title="Movie")
+
+"""
+
+import mmap
+import os
+import time
+
+import requests
+
+from . import FACEBOOK_GRAPH_VIDEO_URL, GraphAPIError, RetryPolicy
+
+
+class ResumableUpload(object):
+    """Uploads a video file in chunks through an upload session.
+
+    graph - The GraphAPI object to send requests with.
+    path - The path of the file to upload.
+    target - The ID of the user, page or group to upload the video to.
+    checkpoint - An object with the load, save and clear methods of
+        FileCheckpoint, where the upload session is saved.
+    retry - The RetryPolicy deciding whether failed chunks are retried.
+        By default, chunks are retried up to 5 times.
+
+    The session_id, video_id, start_offset and end_offset attributes
+    describe the upload session once it has started.
+    """
+
+    def __init__(self, graph, path, target="me", checkpoint=None, retry=None):
+        self.graph = graph
+        self.path = path
+        self.target = target
+        self.checkpoint = checkpoint
+        self.retry = retry or RetryPolicy(
+            max_retries=5, retry_writes=True, deadline=600
+        )
+        stat = os.stat(path)
+        self.file_size = stat.st_size
+        self._mtime = stat.st_mtime
+        self.session_id = self.video_id = None
+        self.start_offset = self.end_offset = 0
+
+    @property
+    def _url(self):
+        return "{0}{1}/{2}/videos".format(
+            FACEBOOK_GRAPH_VIDEO_URL, self.graph.version, self.target
+        )
+
+    def _post(self, post_args, files=None):
+        """Sends a request of the upload protocol, retrying failures."""
+        attempt = 0
+        started = time.time()
+        while True:
+            try:
+                return self.graph.request(
+                    self._url, post_args=dict(post_args), files=files
+                )
+            except (GraphAPIError, requests.RequestException) as e:
+                delay = self.retry.delay(e, attempt, "POST", started)
+                if delay is None:
+                    raise
+            attempt += 1
+            time.sleep(delay)
+
+    def _save(self):
+        if self.checkpoint is not None:
+            self.checkpoint.save(
+                {
+                    "path": self.path,
+                    "file_size": self.file_size,
+                    "mtime": self._mtime,
+                    "session_id": self.session_id,
+                    "video_id": self.video_id,
+                    "start_offset": self.start_offset,
+                    "end_offset": self.end_offset,
+                }
+            )
+
+    def _update(self, result):
+        self.start_offset = int(result["start_offset"])
+        self.end_offset = int(result["end_offset"])
+        self._save()
+
+    def resume(self):
+        """Restores the session saved in the checkpoint, if any.
+
+        Returns whether a session was restored. Sessions saved for
+        another file, or for a file that has changed since, are ignored.
+        """
+        state = self.checkpoint.load() if self.checkpoint else None
+        if not state:
+            return False
+        saved = (state["path"], state["file_size"], state["mtime"])
+        if saved != (self.path, self.file_size, self._mtime):
+            return False
+        self.session_id = state["session_id"]
+        self.video_id = state["video_id"]
+        self.start_offset = state["start_offset"]
+        self.end_offset = state["end_offset"]
+        return True
+
+    def start(self):
+        """Opens an upload session."""
+        result = self._post(
+            {"upload_phase": "start", "file_size": self.file_size}
+        )
+        self.session_id = result["upload_session_id"]
+        self.video_id = result.get("video_id")
+        self._update(result)
+
+    def transfer(self):
+        """Sends the chunks requested by Facebook until the file is sent."""
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                while self.start_offset < self.end_offset:
+                    start, end = self.start_offset, self.end_offset
+                    chunk = data[start:end]
+                    self._update(
+                        self._post(
+                            {
+                                "upload_phase": "transfer",
+                                "upload_session_id": self.session_id,
+                                "start_offset": self.start_offset,
+                            },
+                            files={"video_file_chunk": ("chunk", chunk)},
+                        )
+                    )
+
+    def finish(self, **kwargs):
+        """Publishes the video, with the given fields (e.g. title).
+
+        Returns the result of the finish request, with the video_id.
+        """
+        args = {"upload_phase": "finish", "upload_session_id": self.session_id}
+        args.update(kwargs)
+        result = self._post(args)
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+        if self.video_id is not None:
+            result.setdefault("video_id", self.video_id)
+        return result
+
+    def upload(self, **kwargs):
+        """Starts or resumes the upload, then transfers and finishes it.
+
+        Takes the same arguments as finish.
+        """
+        if not self.resume():
+            self.start()
+        self.transfer()
+        return self.finish(**kwargs)
@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 Mobolic
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Receiving Graph API webhooks.
+
+https://developers.facebook.com/docs/graph-api/webhooks
+
+A WebhookReceiver checks the X-Hub-Signature-256 header of every
+notification, drops notifications it has already received (Facebook
+delivers them again until it gets a response), and passes their entries
+to the handlers registered for their object. Entries are queued, and
+each handler is called with a list of them on a pool of worker threads,
+so that the response can be sent straight away:
+
+    receiver = WebhookReceiver(app_secret, verify_token="my token")
+    receiver.on("page", save_page_changes, field="feed")
+    receiver.on("permissions", permission_cache.handle_webhook)
+    app = receiver.wsgi  # or receiver.asgi
+
+The wsgi and asgi methods are applications answering both the
+verification request sent when subscribing (with hub.challenge) and the
+notifications.
+
+"""
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from . import DEFAULT_JSON_LOADS
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_DEDUP_SIZE = 10000
+
+SIGNATURE_HEADER = "X-Hub-Signature-256"
+
+logger = logging.getLogger(__name__)
+
+
+def _has_field(entry, field):
+    """Returns whether a webhook entry reports a change of field."""
+    if field in entry.get("changed_fields", ()):
+        return True
+    changes = entry.get("changes") or ()
+    return any(change.get("field") == field for change in changes)
+
+
+def _param(params, name):
+    value = params.get(name)
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return value
+
+
+class WebhookReceiver(object):
+    """Verifies webhook notifications and dispatches their entries.
+
+    app_secrets - The app secret, or a list of app secrets (e.g. the old
+        and the new one while rotating it), notifications may be signed
+        with.
+    verify_token - The token entered when subscribing to webhooks, which
+        Facebook sends back with the verification request.
+    max_workers - The number of threads handlers are called on.
+    batch_size - Handlers are called as soon as this many entries are
+        queued...
+    window - ...or this many seconds after the first one was.
+    dedup_size - The number of notifications remembered to detect
+        deliveries of the same notification.
+    on_error - A function called with the handler, the entries and the
+        exception when a handler fails. By default, the exception is
+        logged to the "facebook.webhooks" logger.
+    json_loads - The function used to decode JSON; see GraphAPI.
+
+    The HMAC of each secret is keyed once, when the receiver is created,
+    and the signature is checked in constant time before the payload is
+    decoded.
+    """
+
+    def __init__(
+        self,
+        app_secrets,
+        verify_token=None,
+        max_workers=4,
+        batch_size=DEFAULT_BATCH_SIZE,
+        window=0.01,
+        dedup_size=DEFAULT_DEDUP_SIZE,
+        on_error=None,
+        json_loads=None,
+    ):
+        if isinstance(app_secrets, str):
+            app_secrets = [app_secrets]
+        self._hmacs = [
+            hmac.new(secret.encode("ascii"), digestmod=hashlib.sha256)
+            for secret in app_secrets
+        ]
+        self.verify_token = verify_token
+        self.batch_size = batch_size
+        self.window = window
+        self.dedup_size = dedup_size
+        self.on_error = on_error
+        self.json_loads = json_loads or DEFAULT_JSON_LOADS
+        self._handlers = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()
+        self._pending = {}
+        self._size = 0
+        self._timer = None
+
+    def on(self, object, handler, field=None):
+        """Calls handler with the entries of notifications for object.
+
+        object is the type of object subscribed to, e.g. "page", "user"
+        or "permissions". If field is given, only entries with a change
+        of this field are passed. handler is called with a list of
+        entries.
+        """
+        self._handlers.setdefault(object, []).append((handler, field))
+
+    def _digest(self, body, signature):
+        # Returns the digest of a valid signature, or None.
+        if not signature or not signature.startswith("sha256="):
+            return None
+        signature = signature.split("=", 1)[1].lower().encode("utf-8")
+        for key in self._hmacs:
+            mac = key.copy()
+            mac.update(body)
+            digest = mac.hexdigest().encode("ascii")
+            if hmac.compare_digest(digest, signature):
+                return digest
+        return None
+
+    def verify(self, body, signature):
+        """Returns whether signature is valid for body (in bytes)."""
+        return self._digest(body, signature) is not None
+
+    def challenge(self, params):
+        """Answers a verification request.
+
+        params are the query arguments of the request. Returns the
+        challenge to send back, or None if the request is not valid.
+        """
+        if _param(params, "hub.mode") != "subscribe":
+            return None
+        token = _param(params, "hub.verify_token")
+        if self.verify_token is None or token is None:
+            return None
+        if not hmac.compare_digest(
+            token.encode("utf-8"), self.verify_token.encode("utf-8")
+        ):
+            return None
+        return _param(params, "hub.challenge")
+
+    def receive(self, body, signature):
+        """Queues the entries of a notification for its handlers.
+
+        body is the bytes of the notification, and signature the value
+        of its X-Hub-Signature-256 header. Returns False if the
+        signature is not valid. Notifications received before are
+        ignored. Raises ValueError if the payload cannot be decoded.
+        """
+        digest = self._digest(body, signature)
+        if digest is None:
+            return False
+        with self._lock:
+            if digest in self._seen:
+                self._seen.move_to_end(digest)
+                return True
+            self._seen[digest] = None
+            while len(self._seen) > self.dedup_size:
+                self._seen.popitem(last=False)
+        try:
+            payload = self.json_loads(body)
+            if not isinstance(payload, dict):
+                raise ValueError("Notification is not a JSON object")
+        except ValueError:
+            with self._lock:
+                self._seen.pop(digest, None)
+            raise
+        self.dispatch(payload)
+        return True
+
+    def dispatch(self, payload):
+        """Queues the entries of a decoded notification.
+
+        Returns the number of entries queued for handlers.
+        """
+        handlers = self._handlers.get(payload.get("object"), ())
+        queued = 0
+        batches = None
+        with self._lock:
+            for entry in payload.get("entry") or ():
+                for index, (handler, field) in enumerate(handlers):
+                    if field is None or _has_field(entry, field):
+                        key = (payload["object"], index)
+                        self._pending.setdefault(key, []).append(entry)
+                        queued += 1
+            self._size += queued
+            if self._size >= self.batch_size:
+                batches = self._take_pending()
+            elif self._pending and self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batches:
+            self._submit(batches)
+        return queued
+
+    def _take_pending(self):
+        # Must be called with the lock held.
+        pending, self._pending = self._pending, {}
+        self._size = 0
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return pending
+
+    def flush(self):
+        """Passes all queued entries to their handlers now."""
+        with self._lock:
+            batches = self._take_pending()
+        if batches:
+            self._submit(batches)
+
+    def _submit(self, batches):
+        for (object, index), entries in batches.items():
+            handler = self._handlers[object][index][0]
+            self._executor.submit(self._call, handler, entries)
+
+    def _call(self, handler, entries):
+        try:
+            handler(entries)
+        except Exception as e:
+            if self.on_error is None:
+                # Nothing waits for the result, so the error would be
+                # lost if it was raised.
+                logger.exception("Webhook handler %r failed", handler)
+            else:
+                self.on_error(handler, entries, e)
+
+    def close(self):
+        """Passes queued entries to handlers and waits for them."""
+        self.flush()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _respond(self, method, query, body, signature):
+        # Returns the status and body of the response to a request.
+        if method == "GET":
+            challenge = self.challenge(parse_qs(query))
+            if challenge is None:
+                return 403, b""
+            return 200, challenge.encode("utf-8")
+        if method != "POST":
+            return 405, b""
+        try:
+            if not self.receive(body, signature):
+                return 403, b""
+        except ValueError:
+            return 400, b""
+        return 200, b""
+
+    def wsgi(self, environ, start_response):
+        """A WSGI application receiving webhooks."""
+        method = environ["REQUEST_METHOD"]
+        body = b""
+        if method == "POST":
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+            body = environ["wsgi.input"].read(length)
+        status, content = self._respond(
+            method,
+            environ.get("QUERY_STRING", ""),
+            body,
+            environ.get("HTTP_X_HUB_SIGNATURE_256"),
+        )
+        reasons = {
+            200: "OK",
+            400: "Bad Request",
+            403: "Forbidden",
+            405: "Method Not Allowed",
+        }
+        start_response(
+            "{0} {1}".format(status, reasons[status]),
+            [
+                ("Content-Type", "text/plain"),
+                ("Content-Length", str(len(content))),
+            ],
+        )
+        return [content]
+
+    async def asgi(self, scope, receive, send):
+        """An ASGI application receiving webhooks."""
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    # Waiting for the handlers would block the event loop.
+                    loop = asyncio.get_event_loop()
+                    await loop.run_in_executor(None, self.close)
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        signature = None
+        for name, value in scope.get("headers", ()):
+            if name.lower() == SIGNATURE_HEADER.lower().encode("ascii"):
+                signature = value.decode("latin-1")
+        status, content = self._respond(
+            scope["method"],
+            scope.get("query_string", b"").decode("latin-1"),
+            b"".join(chunks),
+            signature,
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"text/plain"),
+                    (b"content-length", str(len(content)).encode("ascii")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": content})
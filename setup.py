@@ -26,5 +26,6 @@ setup(
         'Programming Language :: Python :: 3.8',
     ],
     install_requires=['requests'],
+    extras_require={'aio': ['aiohttp'], 'arrow': ['pyarrow']},
     tests_require=["coverage"],
 )
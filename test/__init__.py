@@ -13,12 +13,36 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import asyncio
+import datetime
+import json
 import os
 import unittest
+from unittest import mock
 
 import facebook
 
 
+def json_response(body, status_code=200, headers=None):
+    """Returns a mock requests response with body encoded as JSON."""
+    response = mock.Mock()
+    response.status_code = status_code
+    response.headers = {"content-type": "application/json"}
+    response.headers.update(headers or {})
+    response.content = json.dumps(body).encode("utf-8")
+    response.elapsed = datetime.timedelta(0)
+    return response
+
+
+def run(coroutine):
+    """Runs coroutine in a new event loop and returns its result."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
 class FacebookTestCase(unittest.TestCase):
     """
     Sets up application ID and secret from environment and initialises an
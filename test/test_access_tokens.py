@@ -1,5 +1,12 @@
+import json
+import time
+import unittest
+from unittest import mock
+
+import requests
+
 import facebook
-from . import FacebookTestCase
+from . import FacebookTestCase, json_response
 
 
 class FacebookAccessTokenTestCase(FacebookTestCase):
@@ -86,3 +93,107 @@ class FacebookAppAccessTokenCase(FacebookTestCase):
             deleted_app_id,
             deleted_secret,
         )
+
+
+class FacebookDebugAccessTokenTestCase(unittest.TestCase):
+    def setUp(self):
+        self.graph = facebook.GraphAPI(version="3.1")
+        self.graph.session.request = mock.Mock()
+        self.cache = facebook.MemoryCache()
+
+    def test_debug_access_token_cache(self):
+        expires_at = int(time.time()) + 60
+        self.graph.session.request.return_value = json_response(
+            {"data": {"is_valid": True, "expires_at": expires_at}}
+        )
+        first = self.graph.debug_access_token(
+            "token", "app", "secret", cache=self.cache
+        )
+        first["data"]["is_valid"] = False
+        second = self.graph.debug_access_token(
+            "token", "app", "secret", cache=self.cache
+        )
+        self.assertTrue(second["data"]["is_valid"])
+        self.assertEqual(self.graph.session.request.call_count, 1)
+
+        # Entries last no longer than the token.
+        key = facebook._debug_token_cache_key("app", "token")
+        self.assertNotIn(":token", key)
+        self.assertAlmostEqual(self.cache._data[key][1], expires_at, 2)
+
+    def test_debug_access_token_negative_cache(self):
+        self.graph.session.request.return_value = json_response(
+            {"data": {"is_valid": False, "error": {"code": 190}}}
+        )
+        for i in range(2):
+            result = self.graph.debug_access_token(
+                "bad", "app", "secret", cache=self.cache, cache_ttl=30
+            )
+            self.assertFalse(result["data"]["is_valid"])
+        self.assertEqual(self.graph.session.request.call_count, 1)
+
+    def test_debug_access_tokens(self):
+        self.graph.access_token = "user_token"
+        self.graph.app_secret_hmac = "user_proof"
+        self.cache.set(
+            facebook._debug_token_cache_key("app", "cached"),
+            {"data": {"is_valid": True}},
+        )
+
+        def respond(method, url, data=None, **kwargs):
+            # Every other token fails.
+            results = []
+            for i, request in enumerate(json.loads(data["batch"])):
+                if i % 2:
+                    results.append({"code": 400, "body": '{"error": {}}'})
+                else:
+                    body = json.dumps({"data": {"n": i}})
+                    results.append({"code": 200, "body": body})
+            return json_response(results)
+
+        self.graph.session.request.side_effect = respond
+        tokens = ["cached"] + ["token{0}".format(i) for i in range(60)]
+        results = self.graph.debug_access_tokens(
+            tokens + ["token0"], "app", "secret", cache=self.cache
+        )
+        self.assertEqual(list(results), tokens)
+        self.assertEqual(results["cached"], {"data": {"is_valid": True}})
+        self.assertEqual(results["token0"], {"data": {"n": 0}})
+        self.assertIsInstance(results["token1"], facebook.GraphAPIError)
+        self.assertEqual(results["token50"], {"data": {"n": 0}})
+
+        calls = self.graph.session.request.call_args_list
+        self.assertEqual(len(calls), 2)
+        data = calls[0][1]["data"]
+        self.assertEqual(data["access_token"], "app|secret")
+        self.assertEqual(
+            data["appsecret_proof"],
+            facebook._appsecret_proof("secret", "app|secret"),
+        )
+        self.assertEqual(
+            json.loads(data["batch"])[0]["relative_url"],
+            "debug_token?input_token=token0",
+        )
+
+        # Successful results were cached, failed ones were not.
+        self.assertIsNotNone(
+            self.cache.get(facebook._debug_token_cache_key("app", "token0"))
+        )
+        self.assertIsNone(
+            self.cache.get(facebook._debug_token_cache_key("app", "token1"))
+        )
+
+    def test_debug_access_tokens_failed_chunk(self):
+        def respond(method, url, data=None, **kwargs):
+            batch = json.loads(data["batch"])
+            if len(batch) < 50:
+                raise requests.ConnectionError("Connection reset")
+            body = json.dumps({"data": {"is_valid": True}})
+            return json_response([{"code": 200, "body": body}] * len(batch))
+
+        self.graph.session.request.side_effect = respond
+        tokens = ["token{0}".format(i) for i in range(60)]
+        results = self.graph.debug_access_tokens(tokens, "app", "secret")
+        self.assertEqual(results["token0"], {"data": {"is_valid": True}})
+        self.assertIsInstance(results["token50"], requests.ConnectionError)
+        self.assertIs(results["token50"], results["token59"])
@@ -0,0 +1,216 @@
+import io
+import json
+import sys
+import types
+import unittest
+from unittest import mock
+
+import facebook
+from facebook.aio import (
+    AiohttpTransport,
+    AsyncGraphAPI,
+    AsyncTransport,
+    TransportResponse,
+)
+from . import run
+
+
+class FakeTransport(AsyncTransport):
+    """Returns canned JSON responses and records the requests made."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+        self.closed = False
+
+    async def request(
+        self, method, url, params=None, data=None, files=None, timeout=None
+    ):
+        self.calls.append((method, url, dict(params or {}), data))
+        body = json.dumps(self.responses.pop(0)).encode("utf-8")
+        return TransportResponse(
+            200, {"Content-Type": "application/json"}, body, url
+        )
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeFormData(object):
+    def __init__(self):
+        self.fields = []
+
+    def add_field(self, name, value):
+        self.fields.append((name, value))
+
+
+class FakeClientResponse(object):
+    def __init__(self, url):
+        self.status = 200
+        self.headers = {"Content-Type": "application/json"}
+        self.url = url
+
+    async def read(self):
+        return b'{"id": "1"}'
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeClientSession(object):
+    """Stands in for aiohttp.ClientSession, recording the requests made."""
+
+    def __init__(self, connector=None):
+        self.connector = connector
+        self.calls = []
+        self.closed = False
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return FakeClientResponse(url)
+
+    async def close(self):
+        self.closed = True
+
+
+def fake_aiohttp():
+    module = types.ModuleType("aiohttp")
+    module.ClientSession = FakeClientSession
+    module.FormData = FakeFormData
+    module.TCPConnector = mock.Mock()
+    module.ClientTimeout = mock.Mock(side_effect=lambda total: total)
+    return module
+
+
+class AsyncGraphAPITestCase(unittest.TestCase):
+    """Tests for the asyncio Graph API client."""
+
+    def test_get_object(self):
+        transport = FakeTransport([{"id": "1", "name": "Foo"}])
+        graph = AsyncGraphAPI("abc123", transport=transport)
+        result = run(graph.get_object("1", fields="name"))
+        self.assertEqual(result, {"id": "1", "name": "Foo"})
+        method, url, params, data = transport.calls[0]
+        self.assertEqual(method, "GET")
+        self.assertEqual(url, "https://graph.facebook.com/v3.1/1")
+        self.assertEqual(params, {"fields": "name", "access_token": "abc123"})
+
+    def test_error_is_raised(self):
+        transport = FakeTransport(
+            [{"error": {"message": "Bad token", "code": 190}}]
+        )
+        graph = AsyncGraphAPI("abc123", transport=transport)
+        with self.assertRaises(facebook.GraphAPIError) as context:
+            run(graph.get_object("me"))
+        self.assertEqual(context.exception.code, 190)
+
+    def test_get_all_connections(self):
+        transport = FakeTransport(
+            [
+                {
+                    "data": [{"id": "1"}, {"id": "2"}],
+                    "paging": {
+                        "next": "https://graph.facebook.com/v3.1/me/feed"
+                        "?access_token=abc123&after=xyz"
+                    },
+                },
+                {"data": [{"id": "3"}], "paging": {}},
+            ]
+        )
+        graph = AsyncGraphAPI("abc123", transport=transport)
+
+        async def collect():
+            items = []
+            async for item in graph.get_all_connections("me", "feed"):
+                items.append(item)
+            return items
+
+        self.assertEqual([x["id"] for x in run(collect())], ["1", "2", "3"])
+        self.assertEqual(transport.calls[1][2]["after"], ["xyz"])
+
+    def test_shared_transport_is_not_closed(self):
+        transport = FakeTransport([])
+        graph = AsyncGraphAPI(transport=transport)
+        run(graph.close())
+        self.assertFalse(transport.closed)
+
+
+class AiohttpTransportTestCase(unittest.TestCase):
+    """Tests for AiohttpTransport, with a fake aiohttp module."""
+
+    def setUp(self):
+        patcher = mock.patch.dict(sys.modules, {"aiohttp": fake_aiohttp()})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.transport = AiohttpTransport(limit=10)
+        self.graph = AsyncGraphAPI(
+            "abc123", timeout=5, transport=self.transport
+        )
+
+    def test_query(self):
+        result = run(
+            self.graph.get_object(
+                "1", after=["xyz"], summary=True, limit=25, fields="id"
+            )
+        )
+        self.assertEqual(result, {"id": "1"})
+        session = self.transport._session
+        method, url, kwargs = session.calls[0]
+        self.assertEqual(method, "GET")
+        self.assertEqual(url, "https://graph.facebook.com/v3.1/1")
+        self.assertEqual(
+            sorted(kwargs["params"]),
+            [
+                ("access_token", "abc123"),
+                ("after", "xyz"),
+                ("fields", "id"),
+                ("limit", "25"),
+                ("summary", "true"),
+            ],
+        )
+        self.assertEqual(kwargs["timeout"], 5)
+        sys.modules["aiohttp"].TCPConnector.assert_called_once_with(
+            limit=10, limit_per_host=0
+        )
+
+    def test_form(self):
+        run(self.graph.put_object("me", "feed", message="Hi", published=False))
+        method, url, kwargs = self.transport._session.calls[0]
+        self.assertEqual(method, "POST")
+        self.assertEqual(
+            kwargs["data"],
+            {"message": "Hi", "published": "false", "access_token": "abc123"},
+        )
+
+    def test_files(self):
+        image = io.BytesIO(b"image")
+        run(self.graph.put_photo(image, message="Hi", no_story=True))
+        form = self.transport._session.calls[0][2]["data"]
+        self.assertIsInstance(form, FakeFormData)
+        self.assertEqual(
+            form.fields,
+            [
+                ("message", "Hi"),
+                ("no_story", "true"),
+                ("access_token", "abc123"),
+                ("source", image),
+            ],
+        )
+
+    def test_none_is_left_out(self):
+        graph = AsyncGraphAPI(transport=self.transport)
+        run(graph.request("v3.1/me", {"fields": None, "limit": 1}))
+        run(graph.request("v3.1/me", post_args={"message": None, "x": 1}))
+        first, second = self.transport._session.calls
+        self.assertEqual(first[2]["params"], [("limit", "1")])
+        self.assertEqual(second[2]["data"], {"x": "1"})
+
+    def test_close(self):
+        run(self.graph.get_object("1"))
+        session = self.transport._session
+        run(self.transport.close())
+        self.assertTrue(session.closed)
+        self.assertIsNone(self.transport._session)
@@ -52,7 +52,7 @@ class FacebookAppSecretProofTestCase(FacebookTestCase):
         )
         mock_response = mock.Mock()
         mock_response.headers = {"content-type": "json"}
-        mock_response.json.return_value = {}
+        mock_response.content = b"{}"
         mock_request.return_value = mock_response
         api.session.request = mock_request
         api.request("some-path")
@@ -78,7 +78,7 @@ class FacebookAppSecretProofTestCase(FacebookTestCase):
         )
         mock_response = mock.Mock()
         mock_response.headers = {"content-type": "json"}
-        mock_response.json.return_value = {}
+        mock_response.content = b"{}"
         mock_request.return_value = mock_response
         api.session.request = mock_request
         api.request("some-path", method="POST")
@@ -101,7 +101,7 @@ class FacebookAppSecretProofTestCase(FacebookTestCase):
         api = facebook.GraphAPI(access_token=self.ACCESS_TOKEN)
         mock_response = mock.Mock()
         mock_response.headers = {"content-type": "json"}
-        mock_response.json.return_value = {}
+        mock_response.content = b"{}"
         mock_request.return_value = mock_response
         api.session.request = mock_request
         api.request("some-path")
@@ -0,0 +1,99 @@
+import json
+import unittest
+from unittest import mock
+
+import facebook
+
+
+def batch_response(*bodies, code=200):
+    """Builds a mocked Batch API response from the given bodies."""
+    response = mock.Mock()
+    response.headers = {"content-type": "application/json"}
+    response.content = json.dumps(
+        [
+            None if body is None else {"code": code, "body": json.dumps(body)}
+            for body in bodies
+        ]
+    ).encode("utf-8")
+    return response
+
+
+class FacebookBatchTestCase(unittest.TestCase):
+    """Tests for the Batch API helpers."""
+
+    def setUp(self):
+        self.graph = facebook.GraphAPI("abc123")
+        self.graph.session.request = mock.Mock()
+
+    def test_execute_batch(self):
+        self.graph.session.request.return_value = batch_response(
+            {"id": "1"}, {"error": {"message": "Unsupported", "code": 100}}
+        )
+        results = self.graph.execute_batch(
+            [
+                {"method": "GET", "relative_url": "1"},
+                {"method": "POST", "relative_url": "2/feed", "body": {"a": 1}},
+            ]
+        )
+        self.assertEqual(results[0], {"id": "1"})
+        self.assertIsInstance(results[1], facebook.GraphAPIError)
+        self.assertEqual(results[1].code, 100)
+
+        args, kwargs = self.graph.session.request.call_args
+        self.assertEqual(args, ("POST", "https://graph.facebook.com/v3.1/"))
+        sent = json.loads(kwargs["data"]["batch"])
+        self.assertEqual(sent[1]["body"], "a=1")
+        self.assertEqual(kwargs["data"]["access_token"], "abc123")
+
+    def test_batch_context_manager(self):
+        self.graph.session.request.return_value = batch_response(
+            {"id": "me"}, None
+        )
+        with self.graph.batch() as batch:
+            me = batch.add("GET", "me", {"fields": "id"}, name="me")
+            feed = batch.add("GET", "me/feed", depends_on="me")
+        self.assertEqual(me.result(), {"id": "me"})
+        self.assertRaises(facebook.GraphAPIError, feed.result)
+
+        sent = json.loads(
+            self.graph.session.request.call_args[1]["data"]["batch"]
+        )
+        self.assertEqual(sent[0]["relative_url"], "me?fields=id")
+        self.assertEqual(sent[0]["name"], "me")
+        self.assertEqual(sent[1]["depends_on"], "me")
+
+    def test_requests_are_chunked(self):
+        self.graph.session.request.side_effect = lambda *a, **kw: (
+            batch_response(
+                *[
+                    {"n": i}
+                    for i in range(len(json.loads(kw["data"]["batch"])))
+                ]
+            )
+        )
+        results = self.graph.execute_batch(
+            [{"method": "GET", "relative_url": str(i)} for i in range(120)],
+            max_workers=1,
+        )
+        self.assertEqual(len(results), 120)
+        self.assertEqual(self.graph.session.request.call_count, 3)
+        self.assertEqual(results[50], {"n": 0})
+
+    def test_dependent_requests_share_a_chunk(self):
+        requests = [{"method": "GET", "relative_url": "x"}] * 49
+        requests = requests + [
+            {"method": "GET", "relative_url": "me/friends", "name": "friends"},
+            {
+                "method": "GET",
+                "relative_url": "?ids={result=friends:$.data.*.id}",
+            },
+        ]
+        chunks = facebook._batch_chunks(requests)
+        self.assertEqual([len(c) for c in chunks], [49, 2])
+
+    def test_unknown_dependency(self):
+        self.assertRaises(
+            facebook.GraphAPIError,
+            facebook._batch_chunks,
+            [{"method": "GET", "relative_url": "x", "depends_on": "nope"}],
+        )
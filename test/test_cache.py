@@ -0,0 +1,97 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import facebook
+from facebook.cache import MemoryCache, ResponseCache, SQLiteCache
+from . import json_response
+
+
+class FacebookResponseCacheTestCase(unittest.TestCase):
+    """Tests for caching the results of GET requests."""
+
+    def test_get_requests_are_cached(self):
+        graph = facebook.GraphAPI("abc123", cache=ResponseCache())
+        graph.session.request = mock.Mock(
+            return_value=json_response({"id": "1"})
+        )
+        self.assertEqual(graph.get_object("1", fields="id"), {"id": "1"})
+        self.assertEqual(graph.get_object("1", fields="id"), {"id": "1"})
+        self.assertEqual(graph.session.request.call_count, 1)
+
+        graph.get_object("1", fields="name")
+        self.assertEqual(graph.session.request.call_count, 2)
+
+    def test_cached_results_are_copies(self):
+        graph = facebook.GraphAPI("abc123", cache=ResponseCache())
+        graph.session.request = mock.Mock(
+            return_value=json_response({"id": "1"})
+        )
+        graph.get_object("1")["id"] = "changed"
+        self.assertEqual(graph.get_object("1"), {"id": "1"})
+
+    def test_tokens_do_not_share_results(self):
+        cache = ResponseCache()
+        self.assertNotEqual(
+            cache.key("v3.1/me", {"access_token": "a"}),
+            cache.key("v3.1/me", {"access_token": "b"}),
+        )
+        self.assertEqual(
+            cache.key("v3.1/me", {"access_token": "a", "appsecret_proof": 1}),
+            cache.key("v3.1/me", {"access_token": "a", "appsecret_proof": 2}),
+        )
+
+    def test_post_requests_are_not_cached(self):
+        graph = facebook.GraphAPI("abc123", cache=ResponseCache())
+        graph.session.request = mock.Mock(
+            return_value=json_response({"id": "1"})
+        )
+        graph.put_object("me", "feed", message="Hello")
+        graph.put_object("me", "feed", message="Hello")
+        self.assertEqual(graph.session.request.call_count, 2)
+
+    def test_etag_revalidation(self):
+        cache = ResponseCache(ttl=300, ttls={r"^/me$": 0.01})
+        graph = facebook.GraphAPI("abc123", cache=cache)
+        graph.session.request = mock.Mock(
+            return_value=json_response({"id": "me"}, headers={"etag": '"v1"'})
+        )
+        graph.get_object("me")
+        later = time.time() + 60
+        with mock.patch("time.time", return_value=later):
+            graph.session.request.return_value = json_response(
+                None, status_code=304
+            )
+            self.assertEqual(graph.get_object("me"), {"id": "me"})
+        headers = graph.session.request.call_args[1]["headers"]
+        self.assertEqual(headers, {"If-None-Match": '"v1"'})
+
+
+class FacebookCacheBackendTestCase(unittest.TestCase):
+    """Tests for the cache backends."""
+
+    def check_backend(self, backend):
+        backend.set("a", {"x": 1})
+        backend.set("b", [1, 2], ttl=-1)
+        self.assertEqual(backend.get("a"), {"x": 1})
+        self.assertIsNone(backend.get("b"))
+        backend.set("c", 3)
+        backend.set("d", 4)
+        # "a" was used most recently, so "c" is evicted first.
+        backend.get("a")
+        backend.set("e", 5)
+        self.assertIsNone(backend.get("c"))
+        self.assertEqual(backend.get("a"), {"x": 1})
+        backend.delete("a")
+        self.assertIsNone(backend.get("a"))
+        backend.clear()
+        self.assertIsNone(backend.get("e"))
+
+    def test_memory_cache(self):
+        self.check_backend(MemoryCache(maxsize=3))
+
+    def test_sqlite_cache(self):
+        path = os.path.join(tempfile.mkdtemp(), "cache.db")
+        self.check_backend(SQLiteCache(path, maxsize=3))
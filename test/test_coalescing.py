@@ -0,0 +1,92 @@
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import facebook
+from . import json_response
+
+
+class FacebookCoalescingTestCase(unittest.TestCase):
+    """Tests for merging concurrent calls into fewer requests."""
+
+    def setUp(self):
+        self.graph = facebook.GraphAPI("abc123", coalesce_window=0.05)
+        self.graph.session.request = mock.Mock()
+
+    def test_get_object_calls_are_merged(self):
+        self.graph.session.request.side_effect = lambda method, url, **kw: (
+            json_response(
+                {
+                    id: {"id": id, "fields": kw["params"]["fields"]}
+                    for id in kw["params"]["ids"].split(",")
+                }
+            )
+        )
+        # The fifth call fills the batch and sends it, however long the
+        # threads take to submit their calls.
+        self.graph.coalescer.window = 60
+        self.graph.coalescer.max_batch = 5
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(
+                executor.map(
+                    lambda id: self.graph.get_object(id, fields="name"),
+                    ["1", "2", "3", "2", "5"],
+                )
+            )
+        self.assertEqual([r["id"] for r in results], ["1", "2", "3", "2", "5"])
+        self.assertEqual(self.graph.session.request.call_count, 1)
+        params = self.graph.session.request.call_args[1]["params"]
+        self.assertEqual(params["ids"], "1,2,3,5")
+
+    def test_list_arguments(self):
+        self.graph.session.request.return_value = json_response(
+            {"1": {"id": "1"}, "2": {"id": "2"}}
+        )
+        coalescer = self.graph.coalescer
+        first = coalescer.submit_object("1", fields=["id", "name"])
+        second = coalescer.submit_object("2", fields=["id", "name"])
+        coalescer.flush()
+        self.assertEqual(first.result(), {"id": "1"})
+        self.assertEqual(second.result(), {"id": "2"})
+        self.assertEqual(self.graph.session.request.call_count, 1)
+        params = self.graph.session.request.call_args[1]["params"]
+        self.assertEqual(params["fields"], ["id", "name"])
+
+    def test_invalid_id_falls_back_to_batch(self):
+        def respond(method, url, **kw):
+            if method == "GET":
+                return json_response(
+                    {"error": {"message": "Invalid ID", "code": 803}}
+                )
+            batch = json.loads(kw["data"]["batch"])
+            return json_response(
+                [
+                    {"code": 200, "body": json.dumps({"id": "1"})},
+                    {
+                        "code": 404,
+                        "body": json.dumps(
+                            {"error": {"message": "Invalid", "code": 803}}
+                        ),
+                    },
+                ][: len(batch)]
+            )
+
+        self.graph.session.request.side_effect = respond
+        coalescer = self.graph.coalescer
+        good = coalescer.submit_object("1")
+        bad = coalescer.submit_object("nope")
+        coalescer.flush()
+        self.assertEqual(good.result(), {"id": "1"})
+        self.assertRaises(facebook.GraphAPIError, bad.result)
+
+    def test_single_call_uses_plain_request(self):
+        self.graph.session.request.return_value = json_response({"id": "me"})
+        self.assertEqual(self.graph.get_object("me"), {"id": "me"})
+        self.assertEqual(
+            self.graph.session.request.call_args[0][1],
+            "https://graph.facebook.com/v3.1/me",
+        )
+
+    def test_coalescing_is_off_by_default(self):
+        self.assertIsNone(facebook.GraphAPI().coalescer)
@@ -0,0 +1,44 @@
+import unittest
+
+import requests
+
+import facebook
+
+
+class FacebookConnectionPoolTestCase(unittest.TestCase):
+    """Tests for connection pool and timeout configuration."""
+
+    def test_default_session(self):
+        graph = facebook.GraphAPI()
+        self.assertIsInstance(graph.session, requests.Session)
+        self.assertIsNone(graph.timeout)
+
+    def test_pool_options(self):
+        graph = facebook.GraphAPI(pool_maxsize=64, pool_block=True)
+        adapter = graph.session.get_adapter(facebook.FACEBOOK_GRAPH_URL)
+        self.assertEqual(adapter._pool_maxsize, 64)
+        self.assertTrue(adapter._pool_block)
+        self.assertEqual(graph.session.headers["Connection"], "keep-alive")
+
+    def test_keep_alive_can_be_disabled(self):
+        graph = facebook.GraphAPI(keep_alive=False)
+        self.assertEqual(graph.session.headers["Connection"], "close")
+
+    def test_given_session_is_used(self):
+        session = requests.Session()
+        graph = facebook.GraphAPI(session=session, pool_maxsize=64)
+        self.assertIs(graph.session, session)
+
+    def test_timeout_split(self):
+        graph = facebook.GraphAPI(connect_timeout=3.05, read_timeout=27)
+        self.assertEqual(graph.timeout, (3.05, 27))
+        graph = facebook.GraphAPI(timeout=10, connect_timeout=2)
+        self.assertEqual(graph.timeout, (2, 10))
+
+    def test_shared_session(self):
+        first = facebook.shared_session(pool_maxsize=32)
+        self.assertIs(first, facebook.shared_session(pool_maxsize=32))
+        self.assertIsNot(first, facebook.shared_session(pool_maxsize=16))
+        graph1 = facebook.GraphAPI("a", session=first)
+        graph2 = facebook.GraphAPI("b", session=first)
+        self.assertIs(graph1.session, graph2.session)
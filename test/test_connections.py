@@ -1,7 +1,11 @@
 import inspect
+import os
+import tempfile
+import unittest
+from unittest import mock
 
 import facebook
-from . import FacebookTestCase
+from . import FacebookTestCase, json_response
 
 
 class FacebookAllConnectionsMethodTestCase(FacebookTestCase):
@@ -39,3 +43,125 @@ class FacebookAllConnectionsMethodTestCase(FacebookTestCase):
     #         self.assertTrue(isinstance(f, dict))
     #         self.assertTrue("name" in f)
     #         self.assertTrue("id" in f)
+
+
+def paged_responses(pages):
+    """Mocks session.request to return the given pages of items in turn."""
+    responses = []
+    for number, items in enumerate(pages):
+        body = {"data": [{"id": i} for i in items], "paging": {}}
+        if number + 1 < len(pages):
+            body["paging"]["next"] = (
+                "https://graph.facebook.com/v3.1/me/feed"
+                "?access_token=abc123&after=page%d" % (number + 1)
+            )
+        responses.append(json_response(body))
+    return mock.Mock(side_effect=responses)
+
+
+class FacebookPrefetchConnectionsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.graph = facebook.GraphAPI("abc123")
+
+    def test_prefetch_yields_all_items(self):
+        self.graph.session.request = paged_responses([[1, 2], [3], [4, 5]])
+        items = self.graph.prefetch_all_connections("me", "feed", prefetch=1)
+        self.assertEqual([x["id"] for x in items], [1, 2, 3, 4, 5])
+        params = self.graph.session.request.call_args[1]["params"]
+        self.assertEqual(params["after"], ["page2"])
+
+    def test_prefetch_raises_errors(self):
+        error = json_response({"error": {"message": "Oops", "code": 1}})
+        self.graph.session.request = mock.Mock(return_value=error)
+        items = self.graph.prefetch_all_connections("me", "feed")
+        self.assertRaises(facebook.GraphAPIError, list, items)
+
+    def test_checkpoint_resumes_pagination(self):
+        directory = tempfile.mkdtemp()
+        checkpoint = facebook.FileCheckpoint(
+            os.path.join(directory, "feed.json")
+        )
+        self.graph.session.request = paged_responses([[1, 2], [3], [4]])
+        items = self.graph.prefetch_all_connections(
+            "me", "feed", checkpoint=checkpoint
+        )
+        self.assertEqual([next(items)["id"], next(items)["id"]], [1, 2])
+        next(items)
+        items.close()
+        self.assertEqual(checkpoint.load(), {"after": ["page1"]})
+
+        self.graph.session.request = paged_responses([[3], [4]])
+        items = self.graph.prefetch_all_connections(
+            "me", "feed", checkpoint=checkpoint
+        )
+        self.assertEqual([x["id"] for x in items], [3, 4])
+        params = self.graph.session.request.call_args_list[0][1]["params"]
+        self.assertEqual(params["after"], ["page1"])
+        self.assertIsNone(checkpoint.load())
+
+
+class FacebookCrawlConnectionsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.graph = facebook.GraphAPI("abc123")
+
+        def respond(method, url, **kwargs):
+            parent = url.split("/")[-2]
+            if parent == "nodata":
+                return json_response({})
+            if parent == "bad":
+                return json_response(
+                    {
+                        "error": {
+                            "message": "Unsupported get request",
+                            "code": 100,
+                        }
+                    }
+                )
+            return json_response(
+                {"data": [{"id": parent + "_1"}, {"id": parent + "_2"}]}
+            )
+
+        self.graph.session.request = mock.Mock(side_effect=respond)
+
+    def test_crawl_connections(self):
+        results = list(
+            self.graph.crawl_connections(["1", "2", "3"], "feed", workers=2)
+        )
+        self.assertEqual(len(results), 6)
+        self.assertIn(("2", {"id": "2_1"}), results)
+        self.assertEqual(
+            [item for parent, item in results if parent == "3"],
+            [{"id": "3_1"}, {"id": "3_2"}],
+        )
+
+    def test_failures_are_isolated(self):
+        errors = []
+        results = list(
+            self.graph.crawl_connections(
+                ["1", "bad", "3"],
+                "feed",
+                on_error=lambda id, e: errors.append((id, e.code)),
+            )
+        )
+        self.assertEqual(len(results), 4)
+        self.assertEqual(errors, [("bad", 100)])
+
+    def test_first_error_is_raised_without_handler(self):
+        crawl = self.graph.crawl_connections(["bad", "1"], "feed", workers=1)
+        self.assertRaises(facebook.GraphAPIError, list, crawl)
+
+    def test_unexpected_errors_are_reported(self):
+        errors = []
+        results = list(
+            self.graph.crawl_connections(
+                ["nodata", "1"],
+                "feed",
+                workers=1,
+                on_error=lambda id, e: errors.append((id, type(e))),
+            )
+        )
+        self.assertEqual(len(results), 2)
+        self.assertEqual(errors, [("nodata", KeyError)])
+
+        crawl = self.graph.crawl_connections(["nodata"], "feed", workers=2)
+        self.assertRaises(KeyError, list, crawl)
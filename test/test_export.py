@@ -0,0 +1,116 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import facebook
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+POSTS = [
+    {"id": "1", "message": "Hello", "from": {"id": "9", "name": "Alice"}},
+    {"id": "2", "from": {"id": "9", "name": "Alice"}, "tags": [1, 2]},
+    {"id": "3", "message": "Bye", "from": None},
+]
+FIELDS = ["id", "message", "from.name", "tags"]
+
+
+class ListSink(facebook.Sink):
+    def __init__(self):
+        self.batches = []
+
+    def write(self, columns):
+        self.batches.append(dict(columns))
+
+
+class FacebookExportTestCase(unittest.TestCase):
+    def test_query_fields(self):
+        self.assertEqual(
+            facebook.query_fields(["id", "from.id", "from.name", "message"]),
+            "id,from{id,name},message",
+        )
+
+    def test_export_items(self):
+        sink = ListSink()
+        count = facebook.export_items(POSTS, FIELDS, sink, batch_size=2)
+        self.assertEqual(count, 3)
+        self.assertEqual(
+            sink.batches,
+            [
+                {
+                    "id": ["1", "2"],
+                    "message": ["Hello", None],
+                    "from.name": ["Alice", "Alice"],
+                    "tags": [None, [1, 2]],
+                },
+                {
+                    "id": ["3"],
+                    "message": ["Bye"],
+                    "from.name": [None],
+                    "tags": [None],
+                },
+            ],
+        )
+
+    def test_csv_sink(self):
+        file = io.StringIO()
+        with facebook.CSVSink(file) as sink:
+            facebook.export_items(POSTS, FIELDS, sink, batch_size=2)
+        self.assertEqual(
+            file.getvalue().splitlines(),
+            [
+                "id,message,from.name,tags",
+                "1,Hello,Alice,",
+                '2,,Alice,"[1, 2]"',
+                "3,Bye,,",
+            ],
+        )
+
+    def test_export_connections(self):
+        graph = facebook.GraphAPI("abc123")
+        response = mock.Mock()
+        response.headers = {"content-type": "application/json"}
+        response.content = json.dumps({"data": POSTS}).encode("utf-8")
+        graph.session.request = mock.Mock(return_value=response)
+
+        sink = ListSink()
+        count = graph.export_connections("me", "posts", FIELDS, sink)
+        self.assertEqual(count, 3)
+        self.assertEqual(
+            sink.batches[0]["from.name"], ["Alice", "Alice", None]
+        )
+        params = graph.session.request.call_args[1]["params"]
+        self.assertEqual(params["fields"], "id,message,from{name},tags")
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class FacebookArrowExportTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "posts")
+
+    def test_parquet_sink(self):
+        import pyarrow.parquet
+
+        with facebook.ParquetSink(self.path) as sink:
+            facebook.export_items(POSTS, ["id", "message"], sink, 2)
+        parquet = pyarrow.parquet.ParquetFile(self.path)
+        self.assertEqual(parquet.metadata.num_row_groups, 2)
+        self.assertEqual(
+            parquet.read().to_pydict(),
+            {"id": ["1", "2", "3"], "message": ["Hello", None, "Bye"]},
+        )
+
+    def test_arrow_sink(self):
+        with facebook.ArrowSink(self.path) as sink:
+            # The message column of the first batch is all null.
+            facebook.export_items(POSTS[1:], ["id", "message"], sink, 1)
+        table = pyarrow.ipc.open_file(self.path).read_all()
+        self.assertEqual(table.to_pydict()["message"], [None, "Bye"])
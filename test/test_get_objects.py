@@ -0,0 +1,69 @@
+import json
+import unittest
+from unittest import mock
+
+import facebook
+
+
+def respond(method, url, **kwargs):
+    """Answers get_objects requests, failing any that include "bad"."""
+    response = mock.Mock()
+    response.headers = {"content-type": "application/json"}
+    if method == "POST":
+        body = []
+        for request in json.loads(kwargs["data"]["batch"]):
+            id = request["relative_url"].split("?")[0]
+            if id == "bad":
+                body.append(
+                    {
+                        "code": 400,
+                        "body": json.dumps(
+                            {"error": {"message": "Bad ID", "code": 803}}
+                        ),
+                    }
+                )
+            else:
+                body.append({"code": 200, "body": json.dumps({"id": id})})
+        response.content = json.dumps(body).encode("utf-8")
+        return response
+    ids = kwargs["params"]["ids"].split(",")
+    if "bad" in ids:
+        response.content = json.dumps(
+            {"error": {"message": "Bad ID", "code": 803}}
+        ).encode("utf-8")
+    else:
+        response.content = json.dumps({id: {"id": id} for id in ids}).encode(
+            "utf-8"
+        )
+    return response
+
+
+class FacebookGetObjectsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.graph = facebook.GraphAPI("abc123")
+        self.graph.session.request = mock.Mock(side_effect=respond)
+
+    def test_ids_are_chunked(self):
+        ids = [str(i) for i in range(120)]
+        objects = self.graph.get_objects(ids, fields="id")
+        self.assertEqual(sorted(objects), sorted(ids))
+        self.assertEqual(self.graph.session.request.call_count, 3)
+        for call in self.graph.session.request.call_args_list:
+            self.assertLessEqual(len(call[1]["params"]["ids"].split(",")), 50)
+            self.assertEqual(call[1]["params"]["fields"], "id")
+
+    def test_chunks_respect_url_length(self):
+        ids = ["x" * 900, "y" * 900, "z" * 900]
+        self.assertEqual([len(c) for c in facebook._chunk_ids(ids)], [2, 1])
+
+    def test_invalid_id_raises(self):
+        self.assertRaises(
+            facebook.GraphAPIError, self.graph.get_objects, ["1", "bad"]
+        )
+
+    def test_return_errors(self):
+        ids = [str(i) for i in range(60)] + ["bad"]
+        objects, errors = self.graph.get_objects(ids, return_errors=True)
+        self.assertEqual(len(objects), 60)
+        self.assertEqual(list(errors), ["bad"])
+        self.assertEqual(errors["bad"].code, 803)
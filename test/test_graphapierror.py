@@ -29,3 +29,8 @@ class FacebookTestCase(unittest.TestCase):
         }
         error = GraphAPIError(result)
         self.assertEqual(error.error_subcode, error_subcode)
+
+    def test_http_status(self):
+        """Verify that the HTTP status is None unless it is given."""
+        self.assertEqual(GraphAPIError(None).http_status, None)
+        self.assertEqual(GraphAPIError("", http_status=500).http_status, 500)
@@ -0,0 +1,31 @@
+import json
+import unittest
+from unittest import mock
+
+import facebook
+
+
+class FacebookJSONDecoderTestCase(unittest.TestCase):
+    def test_stdlib_decoder(self):
+        body = {"message": "héllo ☃"}
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.assertEqual(facebook._stdlib_json_loads(data), body)
+        self.assertEqual(facebook._stdlib_json_loads(data.decode()), body)
+
+    def test_default_decoder(self):
+        self.assertEqual(
+            facebook.DEFAULT_JSON_LOADS(b'{"a": [1]}'), {"a": [1]}
+        )
+        graph = facebook.GraphAPI()
+        self.assertIs(graph.json_loads, facebook.DEFAULT_JSON_LOADS)
+
+    def test_custom_decoder(self):
+        loads = mock.Mock(return_value={"id": "1"})
+        graph = facebook.GraphAPI("abc123", json_loads=loads)
+        response = mock.Mock()
+        response.headers = {"content-type": "application/json"}
+        response.content = b'{"id": "1"}'
+        graph.session.request = mock.Mock(return_value=response)
+
+        self.assertEqual(graph.get_object("1"), {"id": "1"})
+        loads.assert_called_once_with(b'{"id": "1"}')
@@ -0,0 +1,100 @@
+import unittest
+from unittest import mock
+
+import facebook
+from facebook.metrics import endpoint_label
+from . import json_response
+
+
+class FacebookEndpointLabelTestCase(unittest.TestCase):
+    def test_endpoint_label(self):
+        self.assertEqual(endpoint_label("v3.1/1234/comments"), "{id}/comments")
+        self.assertEqual(endpoint_label("v3.1/12_34"), "{id}")
+        self.assertEqual(endpoint_label("v3.1/me/feed"), "me/feed")
+        self.assertEqual(endpoint_label("v3.1/act_123/ads"), "act_{id}/ads")
+        self.assertEqual(endpoint_label("v3.1/"), "/")
+        self.assertEqual(
+            endpoint_label("https://graph-video.facebook.com/v3.1/5/videos"),
+            "{id}/videos",
+        )
+
+
+@mock.patch("time.sleep")
+class FacebookHooksTestCase(unittest.TestCase):
+    def setUp(self):
+        self.graph = facebook.GraphAPI(
+            "abc123", retry=facebook.RetryPolicy(jitter=False)
+        )
+        self.graph.session.request = mock.Mock(
+            side_effect=[
+                json_response({"error": {"message": "", "code": 2}}, 500),
+                json_response({"id": "1", "name": "Page"}),
+            ]
+        )
+
+    def test_hooks(self, sleep):
+        calls = []
+        self.graph.add_hook(
+            "before_request", lambda info: calls.append(("before", info))
+        )
+        self.graph.add_hook(
+            "after_response",
+            lambda info, result: calls.append(("after", info, result)),
+        )
+        self.graph.add_hook(
+            "on_error",
+            lambda info, error: calls.append(("error", info, error)),
+        )
+        self.graph.get_object("1234")
+
+        self.assertEqual(
+            [call[0] for call in calls], ["before", "error", "before", "after"]
+        )
+        failed, succeeded = calls[1][1], calls[3][1]
+        self.assertEqual(failed.attempt, 0)
+        self.assertEqual(failed.status, 500)
+        self.assertIsInstance(failed.error, facebook.GraphAPIError)
+        self.assertEqual(succeeded.attempt, 1)
+        self.assertEqual(succeeded.endpoint, "{id}")
+        self.assertEqual(succeeded.method, "GET")
+        self.assertEqual(succeeded.size, 27)
+        self.assertEqual(
+            sorted(succeeded.timings), ["decode", "download", "total", "ttfb"]
+        )
+        self.assertEqual(calls[3][2], {"id": "1", "name": "Page"})
+
+    def test_invalid_event(self, sleep):
+        self.assertRaises(ValueError, self.graph.add_hook, "other", print)
+
+    def test_prometheus_metrics(self, sleep):
+        metrics = facebook.PrometheusMetrics(buckets=(1, 5))
+        metrics.install(self.graph)
+        self.graph.get_object("1234")
+
+        text = metrics.render()
+        for line in [
+            "# TYPE facebook_graph_requests_total counter",
+            'facebook_graph_requests_total{method="GET",endpoint="{id}",'
+            'status="200"} 1',
+            'facebook_graph_requests_total{method="GET",endpoint="{id}",'
+            'status="500"} 1',
+            'facebook_graph_errors_total{method="GET",endpoint="{id}",'
+            'code="2"} 1',
+            'facebook_graph_request_duration_seconds_bucket{method="GET",'
+            'endpoint="{id}",le="+Inf"} 2',
+            'facebook_graph_request_duration_seconds_count{method="GET",'
+            'endpoint="{id}"} 2',
+        ]:
+            self.assertIn(line, text.splitlines())
+
+    def test_opentelemetry_hooks(self, sleep):
+        tracer = mock.Mock()
+        facebook.OpenTelemetryHooks(tracer).install(self.graph)
+        self.graph.get_object("1234")
+
+        self.assertEqual(tracer.start_span.call_count, 2)
+        self.assertEqual(tracer.start_span.call_args[0][0], "GET {id}")
+        span = tracer.start_span.return_value
+        span.record_exception.assert_called_once()
+        span.set_attribute.assert_any_call("http.status_code", 200)
+        self.assertEqual(span.end.call_count, 2)
@@ -0,0 +1,73 @@
+import pickle
+import unittest
+from unittest import mock
+
+import facebook
+from . import json_response
+
+
+class User(facebook.Model):
+    fields = ("id", "name")
+
+
+class Post(facebook.Model):
+    fields = ("id", "message", ("from", User), ("likes", User))
+
+
+class SharedPost(Post):
+    fields = ("link",)
+
+
+class FacebookModelTestCase(unittest.TestCase):
+    data = {
+        "id": "1_2",
+        "message": "Hello",
+        "from": {"id": "1", "name": "Alice"},
+        "likes": {"data": [{"id": "3", "name": "Bob"}], "paging": {}},
+        "link": "https://example.com/",
+    }
+
+    def test_query_fields(self):
+        self.assertEqual(
+            Post.query_fields(), "id,message,from{id,name},likes{id,name}"
+        )
+        self.assertEqual(
+            SharedPost.query_fields(),
+            "id,message,from{id,name},likes{id,name},link",
+        )
+
+    def test_from_dict(self):
+        post = SharedPost.from_dict(self.data)
+        self.assertEqual(post.message, "Hello")
+        self.assertEqual(post.from_, User(id="1", name="Alice"))
+        self.assertEqual(post.likes, (User(id="3", name="Bob"),))
+        self.assertEqual(post.link, "https://example.com/")
+        self.assertIsNone(Post.from_dict({"id": "1"}).message)
+        self.assertFalse(hasattr(post, "__dict__"))
+        self.assertRaises(AttributeError, setattr, post, "other", 1)
+
+    def test_to_dict(self):
+        post = Post.from_dict(self.data)
+        expected = dict(self.data, likes={"data": self.data["likes"]["data"]})
+        del expected["link"]
+        self.assertEqual(post.to_dict(), expected)
+        self.assertEqual(pickle.loads(pickle.dumps(post)), post)
+
+    def test_iter_all(self):
+        graph = facebook.GraphAPI("abc123")
+        graph.session.request = mock.Mock(
+            return_value=json_response({"data": [self.data], "paging": {}})
+        )
+        posts = list(Post.iter_all(graph, "me", "feed"))
+        self.assertEqual(posts, [Post.from_dict(self.data)])
+        params = graph.session.request.call_args[1]["params"]
+        self.assertEqual(params["fields"], Post.query_fields())
+
+    def test_get(self):
+        graph = facebook.GraphAPI("abc123")
+        graph.session.request = mock.Mock(
+            return_value=json_response({"id": "1", "name": "Alice"})
+        )
+        self.assertEqual(User.get(graph, "1"), User(id="1", name="Alice"))
+        params = graph.session.request.call_args[1]["params"]
+        self.assertEqual(params["fields"], "id,name")
@@ -0,0 +1,104 @@
+import io
+import json
+import unittest
+from email import policy
+from email.parser import BytesParser
+from unittest import mock
+
+import requests
+
+import facebook
+from facebook.multipart import MultipartEncoder
+
+
+def parse(encoder):
+    body = b"".join(encoder)
+    message = BytesParser(policy=policy.HTTP).parsebytes(
+        b"Content-Type: " + encoder.content_type.encode() + b"\r\n\r\n" + body
+    )
+    return body, {
+        part.get_param("name", header="content-disposition"): part
+        for part in message.iter_parts()
+    }
+
+
+class FacebookMultipartEncoderTestCase(unittest.TestCase):
+    def test_encoding(self):
+        image = io.BytesIO(b"xx" + bytes(range(256)) * 10)
+        image.seek(2)
+        encoder = MultipartEncoder(
+            {"message": "héllo", "published": False},
+            {"source": image, "thumb": ("t.png", b"png", "image/png")},
+            chunk_size=100,
+        )
+        body, parts = parse(encoder)
+        self.assertEqual(len(body), len(encoder))
+        self.assertEqual(
+            parts["message"].get_payload(decode=True).decode("utf-8"), "héllo"
+        )
+        self.assertEqual(parts["published"].get_payload(), "False")
+        self.assertEqual(
+            parts["source"].get_payload(decode=True), bytes(range(256)) * 10
+        )
+        self.assertEqual(parts["thumb"].get_filename(), "t.png")
+        self.assertEqual(parts["thumb"].get_content_type(), "image/png")
+
+        # The body can be produced again, e.g. for a retry.
+        self.assertEqual(b"".join(encoder), body)
+
+    def test_chunks(self):
+        data = bytearray(250)
+        chunks = list(MultipartEncoder(files={"source": data}, chunk_size=100))
+        sizes = [len(chunk) for chunk in chunks[1:-2]]
+        self.assertEqual(sizes, [100, 100, 50])
+        # Bytes-like sources are sliced without copying.
+        self.assertIsInstance(chunks[1], memoryview)
+        self.assertIs(chunks[1].obj, data)
+
+
+class FacebookPutPhotoTestCase(unittest.TestCase):
+    def setUp(self):
+        self.graph = facebook.GraphAPI("abc123")
+
+        def respond(method, url, data=None, **kwargs):
+            body, parts = parse(data)
+            source = parts["source"].get_payload(decode=True)
+            response = mock.Mock()
+            response.headers = {"content-type": "application/json"}
+            if source == b"offline":
+                raise requests.ConnectionError("Connection reset")
+            if source == b"bad":
+                result = {"error": {"message": "Invalid image", "code": 324}}
+            else:
+                result = {"id": source.decode()}
+            response.content = json.dumps(result).encode("utf-8")
+            return response
+
+        self.graph.session.request = mock.Mock(side_effect=respond)
+
+    def test_put_photo(self):
+        result = self.graph.put_photo(io.BytesIO(b"1"), message="Hi")
+        self.assertEqual(result, {"id": "1"})
+        kwargs = self.graph.session.request.call_args[1]
+        # The access token is sent in the body rather than in the URL.
+        self.assertEqual(kwargs["params"], {})
+        body, parts = parse(kwargs["data"])
+        self.assertEqual(parts["access_token"].get_payload(), "abc123")
+        self.assertEqual(parts["message"].get_payload(), "Hi")
+        self.assertEqual(
+            kwargs["headers"]["Content-Type"], kwargs["data"].content_type
+        )
+        self.assertIsNone(kwargs["files"])
+
+    def test_put_photos(self):
+        images = (b"%d" % i for i in range(10))
+        results = list(self.graph.put_photos(images, concurrency=3))
+        self.assertEqual(results, [{"id": str(i)} for i in range(10)])
+
+    def test_put_photos_errors(self):
+        images = [b"1", (b"bad", {"message": "Oops"}), b"offline", b"4"]
+        results = list(self.graph.put_photos(images, message="Hi"))
+        self.assertEqual(results[0], {"id": "1"})
+        self.assertIsInstance(results[1], facebook.GraphAPIError)
+        self.assertIsInstance(results[2], requests.ConnectionError)
+        self.assertEqual(results[3], {"id": "4"})
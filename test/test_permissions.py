@@ -1,5 +1,9 @@
+import json
+import unittest
+from unittest import mock
+
 import facebook
-from . import FacebookTestCase
+from . import FacebookTestCase, json_response
 
 
 class FacebookUserPermissionsTestCase(FacebookTestCase):
@@ -30,3 +34,100 @@ class FacebookUserPermissionsTestCase(FacebookTestCase):
         )
         with self.assertRaises(facebook.GraphAPIError):
             facebook.GraphAPI(token).get_permissions(1)
+
+
+def permissions_body(*granted):
+    data = [{"permission": p, "status": "granted"} for p in granted]
+    data.append({"permission": "email", "status": "declined"})
+    return {"data": data}
+
+
+class FacebookPermissionCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache = facebook.PermissionCache()
+        self.graph = facebook.GraphAPI(
+            "token", version="3.1", permissions_cache=self.cache
+        )
+        self.graph.session.request = mock.Mock(
+            return_value=json_response(permissions_body("public_profile"))
+        )
+
+    def test_get_permissions(self):
+        for i in range(2):
+            self.assertEqual(self.graph.get_permissions(1), {"public_profile"})
+        self.assertEqual(self.graph.session.request.call_count, 1)
+        self.assertEqual(self.cache.get(1), frozenset(["public_profile"]))
+
+    def test_me(self):
+        body = {"id": "7", "permissions": permissions_body("public_profile")}
+        self.graph.session.request.return_value = json_response(body)
+        self.assertEqual(self.graph.get_permissions("me"), {"public_profile"})
+        params = self.graph.session.request.call_args[1]["params"]
+        self.assertEqual(params["fields"], "id,permissions")
+
+        # The permissions are stored under the ID of the user.
+        self.assertEqual(self.cache.get("7"), frozenset(["public_profile"]))
+        self.assertEqual(
+            self.cache.get("me", "token"), frozenset(["public_profile"])
+        )
+        self.assertIsNone(self.cache.get("me", "other"))
+        self.graph.get_permissions("me")
+        self.assertEqual(self.graph.session.request.call_count, 1)
+
+        self.cache.handle_webhook([{"uid": "7", "id": "7"}])
+        self.assertIsNone(self.cache.get("me", "token"))
+
+    def test_permission_error_invalidates(self):
+        self.graph.get_permissions(1)
+        self.cache.set_user("token", "7")
+        self.cache.set("me", {"public_profile"}, "token")
+        self.graph.session.request.return_value = json_response(
+            {"error": {"code": 200, "message": "Permissions error"}}
+        )
+        with self.assertRaises(facebook.GraphAPIError):
+            self.graph.put_object("me", "feed", message="Hi")
+        self.assertIsNone(self.cache.get(1))
+        self.assertIsNone(self.cache.get("me", "token"))
+
+    def test_other_error_keeps_permissions(self):
+        self.graph.get_permissions(1)
+        self.graph.session.request.return_value = json_response(
+            {"error": {"code": 100, "message": "Invalid parameter"}}
+        )
+        with self.assertRaises(facebook.GraphAPIError):
+            self.graph.get_object("1")
+        self.assertIsNotNone(self.cache.get(1))
+
+    def test_handle_webhook(self):
+        self.graph.get_permissions(1)
+        self.graph.get_permissions(2)
+        self.cache.handle_webhook(
+            [{"uid": "1", "id": "1", "changed_fields": ["permissions"]}]
+        )
+        self.assertIsNone(self.cache.get(1))
+        self.assertIsNotNone(self.cache.get(2))
+
+    def test_get_users_permissions(self):
+        self.graph.get_permissions(1)
+
+        def respond(method, url, data=None, **kwargs):
+            results = []
+            for request in json.loads(data["batch"]):
+                if request["relative_url"].startswith("3/"):
+                    body = {"error": {"code": 100, "message": "No user"}}
+                    results.append({"code": 400, "body": json.dumps(body)})
+                else:
+                    body = permissions_body("public_profile", "user_posts")
+                    results.append({"code": 200, "body": json.dumps(body)})
+            return json_response(results)
+
+        self.graph.session.request.side_effect = respond
+        results = self.graph.get_users_permissions([1, "2", 3])
+        self.assertEqual(list(results), ["1", "2", "3"])
+        self.assertEqual(results["1"], frozenset(["public_profile"]))
+        self.assertEqual(
+            results["2"], frozenset(["public_profile", "user_posts"])
+        )
+        self.assertIsInstance(results["3"], facebook.GraphAPIError)
+        self.assertEqual(self.graph.session.request.call_count, 2)
+        self.assertIsNotNone(self.cache.get(2))
@@ -0,0 +1,101 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import facebook
+from facebook.pool import GraphAPIPool
+from . import json_response
+
+
+class FacebookGraphAPIPoolTestCase(unittest.TestCase):
+    def test_clients(self):
+        pool = GraphAPIPool("secret", max_clients=2, rate=5, version="3.1")
+        first = pool.client("token1")
+        self.assertIs(pool.client("token1"), first)
+        self.assertEqual(first.version, "v3.1")
+        self.assertEqual(
+            first.app_secret_hmac,
+            facebook._appsecret_proof("secret", "token1"),
+        )
+
+        second = pool.client("token2")
+        self.assertIs(second.session, first.session)
+        self.assertIsNot(second.rate_limiter, first.rate_limiter)
+
+        # The least recently used client is dropped.
+        pool.client("token3")
+        self.assertEqual(len(pool), 2)
+        self.assertIsNot(pool.client("token1"), first)
+
+    def test_without_app_secret(self):
+        pool = GraphAPIPool()
+        self.assertIsNone(pool.client("token").app_secret_hmac)
+
+    def test_request(self):
+        pool = GraphAPIPool("secret", rate=5)
+        pool.session.request = mock.Mock(return_value=json_response({}))
+        pool.request("token", "v3.1/me")
+        params = pool.session.request.call_args[1]["params"]
+        self.assertEqual(params["access_token"], "token")
+        self.assertEqual(
+            params["appsecret_proof"],
+            facebook._appsecret_proof("secret", "token"),
+        )
+        self.assertEqual(pool.client("token").rate_limiter.rate, 5)
+
+    def test_concurrency(self):
+        pool = GraphAPIPool(concurrency=2)
+        lock = threading.Lock()
+        active = []
+        peak = [0]
+
+        def respond(*args, **kwargs):
+            with lock:
+                active.append(1)
+                peak[0] = max(peak[0], len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+            return json_response({})
+
+        pool.session.request = mock.Mock(side_effect=respond)
+        threads = [
+            threading.Thread(target=pool.request, args=("token", "me"))
+            for i in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(pool.session.request.call_count, 6)
+        self.assertEqual(peak[0], 2)
+
+    def test_requests_between_streamed_items(self):
+        pool = GraphAPIPool(concurrency=1)
+        client = pool.client("token")
+        held = []
+
+        def respond(method, url, **kwargs):
+            # The slot is held while the request is sent.
+            held.append(not client._semaphore.acquire(blocking=False))
+            if kwargs.get("stream"):
+                response = json_response({"data": [{"id": "1"}, {"id": "2"}]})
+                response.iter_content.return_value = [response.content]
+                return response
+            return json_response({"id": url.split("/")[-1]})
+
+        pool.session.request = mock.Mock(side_effect=respond)
+        results = []
+
+        def crawl():
+            for post in client.stream_all_connections("me", "feed"):
+                results.append(client.get_object(post["id"]))
+
+        thread = threading.Thread(target=crawl)
+        thread.daemon = True
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(results, [{"id": "1"}, {"id": "2"}])
+        self.assertEqual(held, [True] * 3)
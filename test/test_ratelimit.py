@@ -0,0 +1,99 @@
+import json
+import time
+import unittest
+from unittest import mock
+
+import facebook
+from facebook.ratelimit import RateLimiter, UsageStats
+
+APP_USAGE = {"call_count": 28, "total_time": 25, "total_cputime": 12}
+BUSINESS_USAGE = {
+    "1234": [
+        {
+            "type": "pages",
+            "call_count": 98,
+            "total_cputime": 10,
+            "total_time": 10,
+            "estimated_time_to_regain_access": 0,
+        }
+    ]
+}
+
+
+class FacebookUsageStatsTestCase(unittest.TestCase):
+    """Tests for recording the rate limit usage headers."""
+
+    def test_usage_headers_are_recorded(self):
+        graph = facebook.GraphAPI("abc123")
+        response = mock.Mock()
+        response.headers = {
+            "content-type": "application/json",
+            "x-app-usage": json.dumps(APP_USAGE),
+            "x-business-use-case-usage": json.dumps(BUSINESS_USAGE),
+        }
+        response.content = json.dumps({"id": "1"}).encode("utf-8")
+        graph.session.request = mock.Mock(return_value=response)
+        graph.get_object("1")
+
+        self.assertEqual(graph.usage.app, APP_USAGE)
+        self.assertEqual(graph.usage.business, BUSINESS_USAGE)
+        self.assertIsNone(graph.usage.page)
+        self.assertEqual(graph.usage.max_usage(), 98)
+
+    def test_ad_account_usage(self):
+        usage = UsageStats()
+        usage.update(
+            {
+                "x-ad-account-usage": json.dumps(
+                    {
+                        "acc_id_util_pct": 9.67,
+                        "reset_time_duration": 100,
+                        "ads_api_access_tier": "standard_access",
+                    }
+                )
+            }
+        )
+        # reset_time_duration is in seconds, not a percentage.
+        self.assertEqual(usage.max_usage(), 9.67)
+        limiter = RateLimiter(rate=10, burst=1)
+        self.assertEqual(limiter.try_acquire(usage), 0)
+
+    def test_no_usage(self):
+        usage = UsageStats()
+        self.assertFalse(usage.update({"content-type": "text/plain"}))
+        self.assertEqual(usage.max_usage(), 0)
+        self.assertIsNone(usage.updated)
+
+
+class FacebookRateLimiterTestCase(unittest.TestCase):
+    """Tests for the usage-aware token bucket."""
+
+    def test_burst_then_wait(self):
+        limiter = RateLimiter(rate=10, burst=2)
+        self.assertEqual(limiter.try_acquire(), 0)
+        self.assertEqual(limiter.try_acquire(), 0)
+        self.assertAlmostEqual(limiter.try_acquire(), 0.1, places=2)
+
+    def test_rate_slows_down_near_limit(self):
+        limiter = RateLimiter(rate=100, threshold=80)
+        usage = UsageStats()
+        usage.update({"x-app-usage": json.dumps({"call_count": 50})})
+        self.assertEqual(limiter.current_rate(usage), 100)
+        usage.update({"x-app-usage": json.dumps({"call_count": 90})})
+        self.assertAlmostEqual(limiter.current_rate(usage), 50)
+        usage.update({"x-app-usage": json.dumps({"call_count": 100})})
+        self.assertAlmostEqual(limiter.current_rate(usage), 5)
+
+    def test_pause_at_full_usage(self):
+        limiter = RateLimiter(rate=100, pause=30)
+        usage = UsageStats()
+        usage.update({"x-app-usage": json.dumps({"call_count": 100})})
+        self.assertGreater(limiter.try_acquire(usage), 29)
+
+        usage.business = {
+            "1": [{"call_count": 100, "estimated_time_to_regain_access": 5}]
+        }
+        self.assertGreater(limiter.try_acquire(usage), 299)
+
+        usage.updated = time.time() - 301
+        self.assertEqual(limiter.try_acquire(usage), 0)
@@ -0,0 +1,123 @@
+import unittest
+from unittest import mock
+
+import requests
+
+import facebook
+from facebook.retry import FATAL, RETRYABLE, THROTTLED, RetryPolicy, classify
+from . import json_response
+
+
+def error_response(code, status_code=400):
+    return json_response(
+        {"error": {"message": "Error", "code": code}}, status_code
+    )
+
+
+class FacebookRetryClassificationTestCase(unittest.TestCase):
+    def test_classify(self):
+        def error(code, **extra):
+            result = {"error": dict({"message": "", "code": code}, **extra)}
+            return facebook.GraphAPIError(result)
+
+        self.assertEqual(classify(error(2)), RETRYABLE)
+        self.assertEqual(classify(error(17)), THROTTLED)
+        self.assertEqual(classify(error(80001)), THROTTLED)
+        self.assertEqual(classify(error(190)), FATAL)
+        self.assertEqual(classify(error(100, is_transient=True)), RETRYABLE)
+        self.assertEqual(
+            classify(facebook.GraphAPIError("Oops", http_status=503)),
+            RETRYABLE,
+        )
+        self.assertEqual(classify(requests.ConnectionError()), RETRYABLE)
+        self.assertEqual(classify(requests.TooManyRedirects()), FATAL)
+
+
+@mock.patch("time.sleep")
+class FacebookRetryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.policy = RetryPolicy(max_retries=2, jitter=False)
+        self.graph = facebook.GraphAPI("abc123", retry=self.policy)
+        self.graph.session.request = mock.Mock()
+
+    def test_transient_errors_are_retried(self, sleep):
+        self.graph.session.request.side_effect = [
+            error_response(2, 500),
+            requests.ConnectionError(),
+            json_response({"id": "1"}),
+        ]
+        self.assertEqual(self.graph.get_object("1"), {"id": "1"})
+        self.assertEqual(
+            [call[0][0] for call in sleep.call_args_list], [0.5, 1.0]
+        )
+        self.assertEqual(self.policy.stats, {RETRYABLE: 2, THROTTLED: 0})
+
+    def test_retries_are_limited(self, sleep):
+        self.graph.session.request.return_value = error_response(4)
+        self.assertRaises(facebook.GraphAPIError, self.graph.get_object, "1")
+        self.assertEqual(self.graph.session.request.call_count, 3)
+        self.assertEqual(self.policy.stats[THROTTLED], 2)
+        self.assertEqual(sleep.call_args_list[0][0][0], 5)
+
+    def test_fatal_errors_are_not_retried(self, sleep):
+        self.graph.session.request.return_value = error_response(190)
+        self.assertRaises(facebook.GraphAPIError, self.graph.get_object, "1")
+        self.assertEqual(self.graph.session.request.call_count, 1)
+
+    def test_writes_are_not_retried_by_default(self, sleep):
+        self.graph.session.request.return_value = error_response(2, 500)
+        self.assertRaises(facebook.GraphAPIError, self.graph.put_like, "1_2")
+        self.assertEqual(self.graph.session.request.call_count, 1)
+
+        self.policy.retry_writes = True
+        self.graph.session.request.reset_mock()
+        self.assertRaises(facebook.GraphAPIError, self.graph.put_like, "1_2")
+        self.assertEqual(self.graph.session.request.call_count, 3)
+
+    def test_deadline(self, sleep):
+        self.policy.deadline = 0.1
+        self.graph.session.request.return_value = error_response(1)
+        self.assertRaises(facebook.GraphAPIError, self.graph.get_object, "1")
+        self.assertEqual(self.graph.session.request.call_count, 1)
+
+    def test_batched_reads_are_retried(self, sleep):
+        body = [{"code": 200, "body": "{}"}] * 2
+        self.graph.session.request.side_effect = [
+            requests.ConnectionError(),
+            json_response(body),
+        ]
+        reads = [{"method": "GET", "relative_url": "me"}] * 2
+        self.assertEqual(self.graph.execute_batch(reads), [{}, {}])
+        self.assertEqual(self.graph.session.request.call_count, 2)
+
+        self.graph.session.request.side_effect = [requests.ConnectionError()]
+        writes = [{"method": "POST", "relative_url": "me/feed"}] + reads
+        self.assertRaises(
+            requests.ConnectionError, self.graph.execute_batch, writes
+        )
+
+    def test_coalesced_calls_are_retried(self, sleep):
+        graph = facebook.GraphAPI(
+            "abc123", retry=self.policy, coalesce_window=60
+        )
+        graph.session.request = mock.Mock(
+            side_effect=[
+                requests.ConnectionError(),
+                json_response({"data": []}),
+                requests.ConnectionError(),
+                json_response([{"code": 200, "body": '{"data": []}'}] * 2),
+            ]
+        )
+        coalescer = graph.coalescer
+
+        # A single call is sent as a GET request.
+        feed = coalescer.submit_connections("1", "feed")
+        coalescer.flush()
+        self.assertEqual(feed.result(), {"data": []})
+        self.assertEqual(graph.session.request.call_args[0][0], "GET")
+
+        feeds = [coalescer.submit_connections(id, "feed") for id in "12"]
+        coalescer.flush()
+        self.assertEqual([f.result() for f in feeds], [{"data": []}] * 2)
+        self.assertEqual(graph.session.request.call_args[0][0], "POST")
+        self.assertEqual(graph.session.request.call_count, 4)
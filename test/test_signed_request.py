@@ -1,7 +1,23 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+import unittest
+from unittest import mock
+
 import facebook
 from . import FacebookTestCase
 
 
+def sign(data, secret):
+    payload = base64.urlsafe_b64encode(json.dumps(data).encode("ascii"))
+    payload = payload.rstrip(b"=")
+    sig = hmac.new(secret.encode("ascii"), payload, hashlib.sha256).digest()
+    sig = base64.urlsafe_b64encode(sig).rstrip(b"=")
+    return (sig + b"." + payload).decode("ascii")
+
+
 class FacebookParseSignedRequestTestCase(FacebookTestCase):
     cookie = (
         "Z6pnNcY-TePEBA7IfKta6ipLgrig53M7DRGisKSybBQ."
@@ -33,3 +49,84 @@ class FacebookParseSignedRequestTestCase(FacebookTestCase):
         self.assertTrue("code" in result)
         self.assertTrue("user_id" in result)
         self.assertTrue("algorithm" in result)
+
+
+class FacebookSignedRequestVerifierTestCase(unittest.TestCase):
+    data = {"algorithm": "HMAC-SHA256", "user_id": "123", "issued_at": 1}
+
+    def test_verify(self):
+        verifier = facebook.SignedRequestVerifier("secret")
+        self.assertEqual(verifier.verify(sign(self.data, "secret")), self.data)
+        self.assertEqual(
+            verifier.verify(sign(self.data, "secret").encode("ascii")),
+            self.data,
+        )
+        self.assertFalse(verifier.verify(sign(self.data, "other")))
+        for invalid in ["", "abc", "a.b.c", "é.é", None, "...."]:
+            self.assertFalse(verifier.verify(invalid))
+
+    def test_algorithm_is_checked(self):
+        data = dict(self.data, algorithm="HMAC-MD5")
+        verifier = facebook.SignedRequestVerifier("secret")
+        self.assertFalse(verifier.verify(sign(data, "secret")))
+        self.assertFalse(verifier.verify(sign([1], "secret")))
+
+    def test_rotating_secrets(self):
+        verifier = facebook.SignedRequestVerifier(["new", "old"])
+        self.assertEqual(verifier.verify(sign(self.data, "old")), self.data)
+        self.assertEqual(verifier.verify(sign(self.data, "new")), self.data)
+        self.assertFalse(verifier.verify(sign(self.data, "other")))
+
+    def test_verify_many(self):
+        verifier = facebook.SignedRequestVerifier("secret")
+        valid = sign(self.data, "secret")
+        results = verifier.verify_many([valid, "bad", valid])
+        self.assertEqual(results, [self.data, False, self.data])
+
+    def test_parse_signed_request(self):
+        signed_request = sign(self.data, "secret")
+        self.assertEqual(
+            facebook.parse_signed_request(signed_request, "secret"), self.data
+        )
+        self.assertFalse(facebook.parse_signed_request(signed_request, "x"))
+
+
+class FacebookUserFromCookieTestCase(unittest.TestCase):
+    def setUp(self):
+        data = {"algorithm": "HMAC-SHA256", "code": "c0de", "user_id": "123"}
+        self.cookies = {"fbsr_42": sign(data, "secret")}
+        response = mock.Mock()
+        response.headers = {"content-type": "application/json"}
+        response.content = b'{"access_token": "token", "expires_in": 60}'
+        patcher = mock.patch("requests.Session.request", return_value=response)
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_user_from_cookie(self):
+        result = facebook.get_user_from_cookie(self.cookies, "42", "secret")
+        self.assertEqual(
+            result, {"access_token": "token", "expires_in": 60, "uid": "123"}
+        )
+        self.assertEqual(self.request.call_args[1]["params"]["code"], "c0de")
+        self.assertIsNone(facebook.get_user_from_cookie({}, "42", "secret"))
+        self.assertIsNone(
+            facebook.get_user_from_cookie(self.cookies, "42", "other")
+        )
+
+    def test_cache(self):
+        cache = facebook.MemoryCache()
+        for i in range(3):
+            result = facebook.get_user_from_cookie(
+                self.cookies, "42", "secret", cache=cache
+            )
+            self.assertEqual(result["access_token"], "token")
+            result["access_token"] = "changed"
+        self.assertEqual(self.request.call_count, 1)
+        self.assertNotIn("c0de", "".join(cache._data))
+
+        # Entries expire with the access token.
+        with mock.patch("time.time", return_value=time.time() + 61):
+            facebook.get_user_from_cookie(
+                self.cookies, "42", "secret", cache=cache
+            )
+        self.assertEqual(self.request.call_count, 2)
@@ -0,0 +1,156 @@
+import json
+import unittest
+from unittest import mock
+
+import facebook
+from facebook.streaming import StreamingPage
+
+
+def chunked(data, size):
+    chunks = []
+    while data:
+        chunks.append(data[:size])
+        data = data[size:]
+    return chunks
+
+
+def streamed_response(body, status_code=200):
+    data = json.dumps(body).encode("utf-8")
+    response = mock.Mock()
+    response.status_code = status_code
+    response.headers = {"content-type": "application/json"}
+    response.iter_content.side_effect = lambda size: iter(chunked(data, size))
+    response.content = json.dumps(body).encode("utf-8")
+    return response
+
+
+class FacebookStreamingPageTestCase(unittest.TestCase):
+    page = {
+        "before": {"nested": [1, 2, {"x": "}"}]},
+        "data": [
+            {"id": "1", "message": "héllo ☃ [,]"},
+            12345,
+            "text",
+            None,
+            {"id": "2", "likes": {"data": [{"id": "3"}]}},
+        ],
+        "paging": {"cursors": {"after": "abc"}, "next": "https://x/?a=1"},
+    }
+
+    def test_items_and_fields(self):
+        data = json.dumps(self.page, indent=2).encode("utf-8")
+        for size in (1, 2, 7, 1024):
+            page = StreamingPage(chunked(data, size))
+            self.assertEqual(list(page), self.page["data"])
+            self.assertEqual(page.fields["paging"], self.page["paging"])
+            self.assertEqual(page.fields["before"], self.page["before"])
+
+    def test_split_numbers(self):
+        for chunks, data in (
+            ([b'{"data":[1.', b"5]}"], [1.5]),
+            ([b'{"data":[1e', b"5]}"], [1e5]),
+            ([b'{"data":[-2.5E', b"-", b"3, 7]}"], [-2.5e-3, 7]),
+            ([b'{"data":[1', b"2", b"]}"], [12]),
+        ):
+            self.assertEqual(list(StreamingPage(chunks)), data)
+
+        values = [0, -1, 3.25, 1e-7, -6.02e23, 1234567.0625, True, None]
+        data = json.dumps({"data": values * 4}).encode("utf-8")
+        for size in range(1, 12):
+            self.assertEqual(
+                list(StreamingPage(chunked(data, size))), values * 4
+            )
+
+    def test_empty_data(self):
+        page = StreamingPage([b'{"data": [ ], "paging": {}}'])
+        self.assertEqual(list(page), [])
+        self.assertEqual(page.fields, {"paging": {}})
+        self.assertEqual(list(StreamingPage([b"{}"])), [])
+
+    def test_invalid_json(self):
+        self.assertRaises(ValueError, list, StreamingPage([b'{"data": [1,']))
+        self.assertRaises(ValueError, list, StreamingPage([b"[1, 2]"]))
+
+
+class FacebookStreamAllConnectionsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.graph = facebook.GraphAPI("abc123")
+
+    def test_stream_all_connections(self):
+        self.graph.session.request = mock.Mock(
+            side_effect=[
+                streamed_response(
+                    {
+                        "data": [{"id": "1"}, {"id": "2"}],
+                        "paging": {
+                            "next": "https://graph.facebook.com/v3.1/me/feed"
+                            "?access_token=abc123&after=xyz"
+                        },
+                    }
+                ),
+                streamed_response({"data": [{"id": "3"}], "paging": {}}),
+            ]
+        )
+        items = self.graph.stream_all_connections("me", "feed", limit=2)
+        self.assertEqual([x["id"] for x in items], ["1", "2", "3"])
+
+        first, second = self.graph.session.request.call_args_list
+        self.assertTrue(first[1]["stream"])
+        self.assertEqual(
+            first[1]["params"], {"limit": 2, "access_token": "abc123"}
+        )
+        self.assertEqual(second[1]["params"]["after"], ["xyz"])
+
+    def test_hooks(self):
+        events = []
+        for event in facebook.HOOK_EVENTS:
+            self.graph.add_hook(
+                event,
+                lambda info, *args, event=event: events.append(
+                    (event, info.status, args)
+                ),
+            )
+        self.graph.session.request = mock.Mock(
+            side_effect=[
+                streamed_response(
+                    {
+                        "data": [{"id": "1"}],
+                        "paging": {
+                            "next": "https://graph.facebook.com/v3.1/me/feed"
+                            "?after=xyz"
+                        },
+                    }
+                ),
+                streamed_response({"data": [{"id": "2"}], "paging": {}}),
+            ]
+        )
+        items = self.graph.stream_all_connections("me", "feed")
+        self.assertEqual(next(items), {"id": "1"})
+        self.assertEqual(events, [("before_request", None, ())])
+        self.assertEqual(list(items), [{"id": "2"}])
+        self.assertEqual(
+            [event for event, status, args in events],
+            ["before_request", "after_response"] * 2,
+        )
+        self.assertEqual(
+            events[-1], ("after_response", 200, ({"paging": {}},))
+        )
+
+        del events[:]
+        self.graph.session.request = mock.Mock(
+            return_value=streamed_response(
+                {"error": {"message": "Invalid", "code": 100}}, 400
+            )
+        )
+        items = self.graph.stream_all_connections("me", "feed")
+        self.assertRaises(facebook.GraphAPIError, list, items)
+        self.assertEqual(events[1][:2], ("on_error", 400))
+
+    def test_errors_are_raised(self):
+        self.graph.session.request = mock.Mock(
+            return_value=streamed_response(
+                {"error": {"message": "Invalid", "code": 100}}, 400
+            )
+        )
+        items = self.graph.stream_all_connections("me", "feed")
+        self.assertRaises(facebook.GraphAPIError, list, items)
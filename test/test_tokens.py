@@ -0,0 +1,178 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import facebook
+from facebook.tokens import TokenManager
+from . import json_response
+
+
+class FacebookTokenManagerTestCase(unittest.TestCase):
+    def manager(self, responses, **kwargs):
+        manager = TokenManager("app", "secret", version="3.1", **kwargs)
+        manager.session = manager.options["session"]
+        manager.session.request = mock.Mock(side_effect=responses)
+        return manager
+
+    def test_update(self):
+        manager = self.manager([])
+        manager.update({"access_token": "token", "expires_in": 3600})
+        self.assertEqual(manager.access_token, "token")
+        self.assertAlmostEqual(manager.expires_at, time.time() + 3600, -1)
+
+        manager.update({"data": {"is_valid": True, "expires_at": 1234}})
+        self.assertEqual(manager.access_token, "token")
+        self.assertEqual(manager.expires_at, 1234)
+
+        # Tokens that do not expire have an expires_at of 0.
+        manager.update({"data": {"is_valid": True, "expires_at": 0}})
+        self.assertIsNone(manager.expires_at)
+
+        with self.assertRaises(facebook.GraphAPIError) as context:
+            manager.update(
+                {
+                    "data": {
+                        "is_valid": False,
+                        "error": {"code": 190, "message": "Expired"},
+                    }
+                }
+            )
+        self.assertEqual(context.exception.code, 190)
+
+        # There is no current token whose expiry could be updated.
+        manager = self.manager([])
+        with self.assertRaises(facebook.GraphAPIError):
+            manager.update({"data": {"is_valid": True, "expires_at": 1234}})
+        self.assertIsNone(manager.access_token)
+
+    def test_inspect(self):
+        manager = self.manager(
+            [json_response({"data": {"is_valid": True, "expires_at": 99}})],
+            access_token="token",
+        )
+        manager.inspect()
+        self.assertEqual(manager.expires_at, 99)
+        params = manager.session.request.call_args[1]["params"]
+        self.assertEqual(params["input_token"], "token")
+
+    def test_client_refreshes_due_token(self):
+        manager = self.manager(
+            [
+                json_response({"access_token": "new", "expires_in": 5184000}),
+                json_response({"id": "1"}),
+            ],
+            access_token="old",
+            expires_at=time.time() + 60,
+        )
+        refreshed = []
+        manager.on_refresh = refreshed.append
+        graph = manager.client()
+        graph.get_object("me")
+
+        calls = manager.session.request.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[0][1]["params"]["fb_exchange_token"], "old")
+        params = calls[1][1]["params"]
+        self.assertEqual(params["access_token"], "new")
+        self.assertEqual(
+            params["appsecret_proof"],
+            facebook._appsecret_proof("secret", "new"),
+        )
+        self.assertEqual(refreshed[0]["access_token"], "new")
+        self.assertEqual(graph.access_token, "new")
+
+    def test_client_keeps_token_that_is_not_due(self):
+        manager = self.manager(
+            [json_response({"id": "1"})],
+            access_token="token",
+            expires_at=time.time() + 5184000,
+        )
+        manager.client().get_object("me")
+        self.assertEqual(manager.session.request.call_count, 1)
+
+    def test_failed_refresh(self):
+        error = json_response(
+            {"error": {"code": 1, "message": "An unknown error occurred"}}
+        )
+        manager = self.manager(
+            [error, json_response({"id": "1"})],
+            access_token="token",
+            expires_at=time.time() + 60,
+        )
+        # The token is still valid, so it is used.
+        manager.client().get_object("me")
+        self.assertEqual(manager.access_token, "token")
+        self.assertEqual(manager.session.request.call_count, 2)
+
+        manager.set("token", time.time() - 1)
+        manager._refreshed_at = None
+        manager.session.request.side_effect = [error]
+        with self.assertRaises(facebook.GraphAPIError):
+            manager.get()
+
+    def test_single_flight(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def respond(*args, **kwargs):
+            started.set()
+            release.wait()
+            return json_response({"access_token": "new", "expires_in": 100})
+
+        manager = self.manager(respond, access_token="old")
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(manager.refresh()))
+            for i in range(5)
+        ]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["new"] * 5)
+        self.assertEqual(manager.session.request.call_count, 1)
+
+    def test_background_refresh(self):
+        refreshed = threading.Event()
+        manager = self.manager(
+            [json_response({"access_token": "new", "expires_in": 5184000})],
+            access_token="old",
+            on_refresh=lambda result: refreshed.set(),
+            refresh_margin=10,
+        )
+        with manager:
+            self.assertTrue(manager.running)
+            # Nothing is due until the expiry is known.
+            manager.update({"data": {"is_valid": True, "expires_at": 1}})
+            self.assertTrue(refreshed.wait(5))
+        self.assertFalse(manager.running)
+        self.assertEqual(manager.access_token, "new")
+        self.assertEqual(manager.session.request.call_count, 1)
+
+    def test_background_refresh_survives_errors(self):
+        refreshed = threading.Event()
+        manager = self.manager(
+            [
+                json_response({"expires_in": 100}),
+                json_response({"access_token": "new", "expires_in": 5184000}),
+            ],
+            access_token="old",
+            expires_at=1,
+            on_refresh=lambda result: refreshed.set(),
+            retry_interval=0.01,
+        )
+        with self.assertLogs("facebook.tokens") as logs:
+            with manager:
+                self.assertTrue(refreshed.wait(5))
+        self.assertIn("KeyError", logs.output[0])
+        self.assertEqual(manager.access_token, "new")
+        self.assertEqual(manager.session.request.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import facebook
+from facebook.upload import ResumableUpload
+from . import json_response
+
+
+class FacebookResumableUploadTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "video.mp4")
+        with open(self.path, "wb") as f:
+            f.write(b"0123456789")
+        self.checkpoint = facebook.FileCheckpoint(
+            os.path.join(directory.name, "upload.json")
+        )
+        self.graph = facebook.GraphAPI("abc123", version="3.1")
+        self.chunks = []
+
+        def respond(method, url, data=None, files=None, **kwargs):
+            self.assertEqual(
+                url, "https://graph-video.facebook.com/v3.1/me/videos"
+            )
+            phase = data["upload_phase"]
+            if phase == "start":
+                self.assertEqual(data["file_size"], 10)
+                return json_response(
+                    {
+                        "upload_session_id": "s1",
+                        "video_id": "v1",
+                        "start_offset": "0",
+                        "end_offset": "4",
+                    }
+                )
+            if phase == "transfer":
+                self.assertEqual(data["upload_session_id"], "s1")
+                start = data["start_offset"]
+                chunk = files["video_file_chunk"][1]
+                self.chunks.append((start, chunk))
+                end = start + len(chunk)
+                return json_response(
+                    {
+                        "start_offset": str(end),
+                        "end_offset": str(min(end + 4, 10)),
+                    }
+                )
+            return json_response({"success": True})
+
+        self.graph.session.request = mock.Mock(side_effect=respond)
+
+    def test_upload(self):
+        result = self.graph.put_video(self.path, title="Video")
+        self.assertEqual(result, {"success": True, "video_id": "v1"})
+        self.assertEqual(self.chunks, [(0, b"0123"), (4, b"4567"), (8, b"89")])
+        data = self.graph.session.request.call_args[1]["data"]
+        self.assertEqual(data["title"], "Video")
+        self.assertEqual(data["access_token"], "abc123")
+
+    def test_resume(self):
+        upload = ResumableUpload(
+            self.graph, self.path, checkpoint=self.checkpoint
+        )
+        upload.start()
+        self.assertEqual(self.checkpoint.load()["end_offset"], 4)
+
+        # A new upload of the same file continues the saved session.
+        upload = ResumableUpload(
+            self.graph, self.path, checkpoint=self.checkpoint
+        )
+        self.graph.session.request.reset_mock()
+        upload.upload()
+        phases = [
+            call[1]["data"]["upload_phase"]
+            for call in self.graph.session.request.call_args_list
+        ]
+        self.assertEqual(phases, ["transfer"] * 3 + ["finish"])
+        self.assertIsNone(self.checkpoint.load())
+
+    def test_changed_file_is_not_resumed(self):
+        upload = ResumableUpload(
+            self.graph, self.path, checkpoint=self.checkpoint
+        )
+        upload.start()
+        with open(self.path, "ab") as f:
+            f.write(b"!")
+        upload = ResumableUpload(
+            self.graph, self.path, checkpoint=self.checkpoint
+        )
+        self.assertFalse(upload.resume())
+
+    @mock.patch("time.sleep")
+    def test_failed_chunks_are_retried(self, sleep):
+        respond = self.graph.session.request.side_effect
+        failures = [json_response({"error": {"message": "", "code": 2}}, 500)]
+
+        def flaky(method, url, **kwargs):
+            if kwargs["data"]["upload_phase"] == "transfer" and failures:
+                return failures.pop()
+            return respond(method, url, **kwargs)
+
+        self.graph.session.request.side_effect = flaky
+        self.graph.put_video(self.path)
+        self.assertEqual([start for start, _ in self.chunks], [0, 4, 8])
+        self.assertEqual(sleep.call_count, 1)
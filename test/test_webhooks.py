@@ -0,0 +1,273 @@
+import hashlib
+import hmac
+import io
+import json
+import threading
+import unittest
+
+import facebook
+from facebook.webhooks import WebhookReceiver
+from . import run
+
+
+def sign(body, secret="secret"):
+    return (
+        "sha256="
+        + hmac.new(secret.encode("ascii"), body, hashlib.sha256).hexdigest()
+    )
+
+
+def notification(object="page", entries=1, field="feed", start=0):
+    return json.dumps(
+        {
+            "object": object,
+            "entry": [
+                {
+                    "id": str(start + i),
+                    "time": 1500000000,
+                    "changes": [{"field": field, "value": {"item": "post"}}],
+                }
+                for i in range(entries)
+            ],
+        }
+    ).encode("utf-8")
+
+
+class Recorder(object):
+    def __init__(self, expected):
+        self.batches = []
+        self.expected = expected
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, entries):
+        with self._lock:
+            self.batches.append(entries)
+            if sum(len(b) for b in self.batches) >= self.expected:
+                self.done.set()
+
+    @property
+    def ids(self):
+        return sorted(int(e["id"]) for b in self.batches for e in b)
+
+
+class FacebookWebhookReceiverTestCase(unittest.TestCase):
+    def setUp(self):
+        self.receiver = WebhookReceiver(
+            ["old", "secret"], verify_token="token", window=0.01
+        )
+
+    def tearDown(self):
+        self.receiver.close()
+
+    def test_verify(self):
+        body = notification()
+        self.assertTrue(self.receiver.verify(body, sign(body)))
+        self.assertTrue(self.receiver.verify(body, sign(body, "old")))
+        signature = "sha256=" + sign(body).split("=")[1].upper()
+        self.assertTrue(self.receiver.verify(body, signature))
+        self.assertFalse(self.receiver.verify(body, sign(body, "other")))
+        self.assertFalse(self.receiver.verify(body + b" ", sign(body)))
+        self.assertFalse(self.receiver.verify(body, None))
+        self.assertFalse(self.receiver.verify(body, "sha1=abc"))
+
+    def test_challenge(self):
+        params = {
+            "hub.mode": "subscribe",
+            "hub.verify_token": "token",
+            "hub.challenge": "1158201444",
+        }
+        self.assertEqual(self.receiver.challenge(params), "1158201444")
+        params["hub.verify_token"] = "wrong"
+        self.assertIsNone(self.receiver.challenge(params))
+
+    def test_receive(self):
+        recorder = Recorder(3)
+        self.receiver.on("page", recorder)
+        body = notification(entries=3)
+        self.assertFalse(self.receiver.receive(body, sign(body, "other")))
+        self.assertTrue(self.receiver.receive(body, sign(body)))
+        # Facebook sends notifications again until they are acknowledged.
+        self.assertTrue(self.receiver.receive(body, sign(body)))
+        self.assertTrue(recorder.done.wait(5))
+        self.receiver.close()
+        self.assertEqual(recorder.batches, [json.loads(body)["entry"]])
+
+    def test_receive_invalid_json(self):
+        body = b"not json"
+        with self.assertRaises(ValueError):
+            self.receiver.receive(body, sign(body))
+
+    def test_dedup_window(self):
+        receiver = WebhookReceiver("secret", dedup_size=2)
+        recorder = Recorder(4)
+        receiver.on("page", recorder)
+        bodies = [notification(start=i) for i in range(3)]
+        for body in bodies + [bodies[0]]:
+            receiver.receive(body, sign(body))
+        receiver.close()
+        # The first notification was forgotten, so it is handled again.
+        self.assertEqual(recorder.ids, [0, 0, 1, 2])
+
+    def test_batching(self):
+        receiver = WebhookReceiver("secret", batch_size=10, window=60)
+        recorder = Recorder(20)
+        receiver.on("page", recorder)
+        for i in range(25):
+            body = notification(start=i)
+            receiver.receive(body, sign(body))
+        # Two full batches were dispatched without waiting for the window.
+        self.assertTrue(recorder.done.wait(5))
+        self.assertEqual([len(b) for b in recorder.batches], [10, 10])
+        receiver.close()
+        self.assertEqual(recorder.ids, list(range(25)))
+
+    def test_fields(self):
+        feed = Recorder(1)
+        everything = Recorder(2)
+        self.receiver.on("page", feed, field="feed")
+        self.receiver.on("page", everything)
+        self.receiver.on("user", Recorder(0))
+        self.assertEqual(self.receiver.dispatch(json.loads(notification())), 2)
+        self.assertEqual(
+            self.receiver.dispatch(json.loads(notification(field="ratings"))),
+            1,
+        )
+        self.receiver.close()
+        self.assertEqual(len(feed.ids), 1)
+        self.assertEqual(len(everything.ids), 2)
+
+    def test_permission_cache(self):
+        cache = facebook.PermissionCache()
+        cache.set("1", {"email"})
+        self.receiver.on("permissions", cache.handle_webhook)
+        body = notification("permissions", field="email", start=1)
+        self.receiver.receive(body, sign(body))
+        self.receiver.close()
+        self.assertIsNone(cache.get("1"))
+
+    def test_on_error(self):
+        errors = []
+
+        def fail(entries):
+            raise KeyError("id")
+
+        receiver = WebhookReceiver(
+            "secret", on_error=lambda *args: errors.append(args)
+        )
+        receiver.on("page", fail)
+        receiver.dispatch(json.loads(notification()))
+        receiver.close()
+        self.assertEqual(errors[0][0], fail)
+        self.assertIsInstance(errors[0][2], KeyError)
+
+    def test_errors_are_logged(self):
+        def fail(entries):
+            raise KeyError("id")
+
+        receiver = WebhookReceiver("secret")
+        receiver.on("page", fail)
+        with self.assertLogs("facebook.webhooks") as logs:
+            receiver.dispatch(json.loads(notification()))
+            receiver.close()
+        self.assertIn("KeyError", logs.output[0])
+
+    def test_asgi_lifespan(self):
+        recorder = Recorder(1)
+        self.receiver.on("page", recorder)
+        self.receiver.window = 60
+        self.receiver.dispatch(json.loads(notification()))
+        messages = [
+            {"type": "lifespan.startup"},
+            {"type": "lifespan.shutdown"},
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        run(self.receiver.asgi({"type": "lifespan"}, receive, send))
+        self.assertEqual(
+            sent,
+            ["lifespan.startup.complete", "lifespan.shutdown.complete"],
+        )
+        # Queued entries were handled before shutting down.
+        self.assertEqual(recorder.ids, [0])
+
+    def test_wsgi(self):
+        recorder = Recorder(1)
+        self.receiver.on("page", recorder)
+        responses = []
+
+        def request(method, query="", body=b"", signature=None):
+            environ = {
+                "REQUEST_METHOD": method,
+                "QUERY_STRING": query,
+                "CONTENT_LENGTH": str(len(body)),
+                "wsgi.input": io.BytesIO(body),
+            }
+            if signature:
+                environ["HTTP_X_HUB_SIGNATURE_256"] = signature
+            content = b"".join(
+                self.receiver.wsgi(
+                    environ, lambda status, headers: responses.append(status)
+                )
+            )
+            return responses[-1], content
+
+        self.assertEqual(
+            request(
+                "GET",
+                "hub.mode=subscribe&hub.challenge=42&hub.verify_token=token",
+            ),
+            ("200 OK", b"42"),
+        )
+        self.assertEqual(request("GET", "hub.mode=subscribe")[0][:3], "403")
+        body = notification()
+        self.assertEqual(request("POST", body=body)[0][:3], "403")
+        self.assertEqual(
+            request("POST", body=body, signature=sign(body)), ("200 OK", b"")
+        )
+        self.assertEqual(request("PUT")[0][:3], "405")
+        self.assertTrue(recorder.done.wait(5))
+
+    def test_asgi(self):
+        recorder = Recorder(1)
+        self.receiver.on("page", recorder)
+        body = notification()
+
+        async def request(method, query=b"", headers=()):
+            messages = [
+                {"type": "http.request", "body": body[:10], "more_body": True},
+                {"type": "http.request", "body": body[10:]},
+            ]
+            sent = []
+
+            async def receive():
+                return messages.pop(0)
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {
+                "type": "http",
+                "method": method,
+                "query_string": query,
+                "headers": list(headers),
+            }
+            await self.receiver.asgi(scope, receive, send)
+            return sent[0]["status"], sent[1]["body"]
+
+        query = b"hub.mode=subscribe&hub.challenge=42&hub.verify_token=token"
+        self.assertEqual(run(request("GET", query)), (200, b"42"))
+        self.assertEqual(run(request("POST"))[0], 403)
+        headers = [(b"x-hub-signature-256", sign(body).encode("ascii"))]
+        self.assertEqual(run(request("POST", headers=headers)), (200, b""))
+        self.assertTrue(recorder.done.wait(5))
+
+
+if __name__ == "__main__":
+    unittest.main()